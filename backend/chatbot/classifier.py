@@ -0,0 +1,362 @@
+"""
+Local intent classifier - hashed bag-of-words with a linear softmax model
+
+Messages are turned into hashed unigram/bigram TF-IDF vectors and scored
+against a NumPy weight matrix, so a whole batch of messages is classified
+with one (sparse) matrix multiply. Training runs offline (manage.py
+train_intent_classifier); the artifacts are plain .npy files that are
+memory-mapped on load, so every worker process on a host shares the same
+pages instead of holding its own copy.
+
+Mapped files must never change under a running worker, so save() writes
+each model to a new directory in <path>.versions/ and then atomically
+repoints the <path> symlink at it. Workers keep the version they loaded
+until they reload.
+
+NumPy is an optional dependency (`pip install numpy`); without it, or
+without a trained model, intents.detect_intents() falls back to the keyword
+rules.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .intents import _SEPARATORS, match_keywords, resolve_intent
+
+ARTIFACT_VERSION = 1
+DEFAULT_FEATURES = 2 ** 14
+
+
+def tokenize(message: str) -> List[str]:
+    """Split a message into lower-case words the same way as the keyword matcher"""
+    return message.lower().translate(_SEPARATORS).split()
+
+
+def hash_features(message: str, n_features: int) -> np.ndarray:
+    """
+    Hash a message's unigrams and bigrams into feature buckets
+
+    crc32 is used instead of hash() because string hashing is randomized per
+    process, and the buckets must match between training and every worker.
+
+    Args:
+        message: Message text
+        n_features: Number of hash buckets
+
+    Returns:
+        Bucket index per token (with repeats)
+    """
+    tokens = tokenize(message)
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return np.fromiter(
+        (zlib.crc32(gram.encode()) % n_features for gram in grams),
+        dtype=np.int64,
+        count=len(grams)
+    )
+
+
+class _SparseBatch:
+    """
+    L2-normalized TF-IDF rows in coordinate form
+
+    Messages are short, so only their non-zero buckets are kept; products
+    with the weight matrix gather the matching weight rows instead of
+    materializing a dense (messages x features) matrix.
+    """
+
+    def __init__(self, buckets: Sequence[np.ndarray], idf: np.ndarray):
+        rows, columns, counts = [], [], []
+        for row, indices in enumerate(buckets):
+            unique, frequency = np.unique(indices, return_counts=True)
+            rows.append(np.full(len(unique), row, dtype=np.int64))
+            columns.append(unique)
+            counts.append(frequency)
+
+        self.n_rows = len(buckets)
+        self.rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+        self.columns = np.concatenate(columns) if columns else np.zeros(0, dtype=np.int64)
+        # Sublinear term frequency times IDF
+        values = np.log1p(np.concatenate(counts) if counts else np.zeros(0)) * idf[self.columns]
+        norms = np.sqrt(np.bincount(self.rows, weights=values ** 2, minlength=self.n_rows))
+        self.values = (values / norms[self.rows]).astype(np.float32)
+
+    def dot(self, weights: np.ndarray) -> np.ndarray:
+        """(n_rows, n_features) @ (n_features, k) -> (n_rows, k)"""
+        contributions = weights[self.columns] * self.values[:, None]
+        return np.stack(
+            [np.bincount(self.rows, weights=column, minlength=self.n_rows) for column in contributions.T],
+            axis=1
+        ).astype(np.float32)
+
+    def transpose_dot(self, matrix: np.ndarray, n_features: int) -> np.ndarray:
+        """(n_features, n_rows) @ (n_rows, k) -> (n_features, k)"""
+        result = np.zeros((n_features, matrix.shape[1]), dtype=np.float32)
+        np.add.at(result, self.columns, matrix[self.rows] * self.values[:, None])
+        return result
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=1, keepdims=True)
+    np.exp(scores, out=scores)
+    scores /= scores.sum(axis=1, keepdims=True)
+    return scores
+
+
+class IntentClassifier:
+    """
+    Linear softmax classifier over hashed TF-IDF features
+
+    Attributes:
+        labels: Intent name per output column
+        weights: (n_features, n_labels) weight matrix
+        bias: (n_labels,) bias vector
+        idf: (n_features,) inverse document frequencies
+    """
+
+    WEIGHTS_FILE = 'weights.npy'
+    BIAS_FILE = 'bias.npy'
+    IDF_FILE = 'idf.npy'
+    META_FILE = 'meta.json'
+
+    def __init__(self, labels: List[str], weights: np.ndarray, bias: np.ndarray, idf: np.ndarray):
+        self.labels = labels
+        self.weights = weights
+        self.bias = bias
+        self.idf = idf
+
+    @property
+    def n_features(self) -> int:
+        return self.idf.shape[0]
+
+    def predict_proba(self, messages: Sequence[str]) -> np.ndarray:
+        """
+        Class probabilities for a batch of messages
+
+        Args:
+            messages: Message texts
+
+        Returns:
+            (len(messages), n_labels) probability matrix
+        """
+        if not messages:
+            return np.zeros((0, len(self.labels)), dtype=np.float32)
+        features = _SparseBatch([hash_features(m, self.n_features) for m in messages], self.idf)
+        return _softmax(features.dot(self.weights) + self.bias)
+
+    def predict(self, messages: Sequence[str]) -> List[Tuple[str, float]]:
+        """
+        Most likely intent and its probability for each message
+
+        Args:
+            messages: Message texts
+
+        Returns:
+            List of (intent, confidence) tuples in input order
+        """
+        probabilities = self.predict_proba(messages)
+        best = probabilities.argmax(axis=1)
+        confidence = probabilities[np.arange(len(best)), best]
+        return [(self.labels[i], float(c)) for i, c in zip(best, confidence)]
+
+    @classmethod
+    def train(
+        cls,
+        texts: Sequence[str],
+        labels: Sequence[str],
+        n_features: int = DEFAULT_FEATURES,
+        epochs: int = 30,
+        learning_rate: float = 2.0,
+        l2: float = 1e-5,
+        batch_size: int = 256,
+        seed: int = 0
+    ) -> 'IntentClassifier':
+        """
+        Fit the model with mini-batch gradient descent on the softmax loss
+
+        Args:
+            texts: Training messages
+            labels: Intent per message
+            n_features: Number of hash buckets
+            epochs: Passes over the training set
+            learning_rate: Gradient step size
+            l2: Weight decay
+            batch_size: Messages per gradient step
+            seed: Shuffle seed
+
+        Returns:
+            Trained classifier
+        """
+        if len(texts) != len(labels):
+            raise ValueError("texts and labels must have the same length")
+        if not texts:
+            raise ValueError("No training data")
+
+        label_names = sorted(set(labels))
+        label_index = {name: i for i, name in enumerate(label_names)}
+        targets = np.array([label_index[label] for label in labels], dtype=np.int64)
+
+        buckets = [hash_features(text, n_features) for text in texts]
+        document_frequency = np.zeros(n_features, dtype=np.float64)
+        for indices in buckets:
+            document_frequency[np.unique(indices)] += 1
+        idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        weights = np.zeros((n_features, len(label_names)), dtype=np.float32)
+        bias = np.zeros(len(label_names), dtype=np.float32)
+        rng = np.random.default_rng(seed)
+
+        for _ in range(epochs):
+            order = rng.permutation(len(texts))
+            for start in range(0, len(order), batch_size):
+                rows = order[start:start + batch_size]
+                features = _SparseBatch([buckets[i] for i in rows], idf)
+                error = _softmax(features.dot(weights) + bias)
+                error[np.arange(len(rows)), targets[rows]] -= 1
+                error /= len(rows)
+                weights -= learning_rate * (features.transpose_dot(error, n_features) + l2 * weights)
+                bias -= learning_rate * error.sum(axis=0)
+
+        return cls(label_names, weights, bias, idf)
+
+    def save(self, path: Path, keep: int = 3) -> Path:
+        """
+        Write the model as a new version and make path point to it
+
+        The files are written to a fresh directory in <path>.versions/,
+        then the path symlink is swapped with os.replace(), so a reader sees
+        either the old model or the new one, and files other workers have
+        mapped are never rewritten.
+
+        Args:
+            path: Model path (a symlink managed here; a directory left by
+                an older version is moved into the versions)
+            keep: Versions to keep, the new one included; older ones are
+                deleted (mapped files stay readable until unmapped)
+
+        Returns:
+            Directory of the new version
+        """
+        path = Path(path)
+        versions = path.with_name(path.name + '.versions')
+        versions.mkdir(parents=True, exist_ok=True)
+
+        staging = Path(tempfile.mkdtemp(prefix='.staging-', dir=versions))
+        np.save(staging / self.WEIGHTS_FILE, np.ascontiguousarray(self.weights, dtype=np.float32))
+        np.save(staging / self.BIAS_FILE, np.asarray(self.bias, dtype=np.float32))
+        np.save(staging / self.IDF_FILE, np.asarray(self.idf, dtype=np.float32))
+        (staging / self.META_FILE).write_text(json.dumps({
+            'version': ARTIFACT_VERSION,
+            'labels': self.labels,
+            'n_features': self.n_features,
+        }))
+        # Names sort by age
+        now = time.time_ns()
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.gmtime(now // 10 ** 9))
+        target = versions / f"{stamp}.{now % 10 ** 9:09d}-{staging.name.removeprefix('.staging-')}"
+        os.rename(staging, target)
+
+        if path.is_dir() and not path.is_symlink():
+            os.rename(path, versions / f"00000000-000000-{target.name}")
+
+        link = versions / f".link-{target.name}"
+        os.symlink(os.path.relpath(target, path.parent), link)
+        os.replace(link, path)
+
+        older = sorted(version for version in versions.iterdir() if not version.name.startswith('.'))[:-keep]
+        for version in older:
+            if version != target:
+                shutil.rmtree(version, ignore_errors=True)
+        return target
+
+    @classmethod
+    def load(cls, directory: Path) -> 'IntentClassifier':
+        """
+        Load model artifacts, memory-mapping the arrays read-only
+
+        Args:
+            directory: Path written by save() (or a version directory)
+
+        Returns:
+            Classifier backed by the mapped files
+        """
+        # One version throughout, even if save() swaps the link meanwhile
+        directory = Path(directory).resolve()
+        meta = json.loads((directory / cls.META_FILE).read_text())
+        if meta.get('version') != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported intent model version: {meta.get('version')}")
+
+        classifier = cls(
+            meta['labels'],
+            np.load(directory / cls.WEIGHTS_FILE, mmap_mode='r'),
+            np.load(directory / cls.BIAS_FILE, mmap_mode='r'),
+            np.load(directory / cls.IDF_FILE, mmap_mode='r'),
+        )
+        if classifier.weights.shape != (meta['n_features'], len(meta['labels'])):
+            raise ValueError("Intent model weights do not match its metadata")
+        return classifier
+
+
+_model: Optional[IntentClassifier] = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+
+def get_classifier() -> Optional[IntentClassifier]:
+    """
+    Process-wide classifier loaded from CHATBOT_INTENT_MODEL['PATH']
+
+    Returns:
+        The classifier, or None when the model is disabled or not trained
+    """
+    global _model, _model_loaded
+    if _model_loaded:
+        return _model
+
+    with _model_lock:
+        if not _model_loaded:
+            options = getattr(settings, 'CHATBOT_INTENT_MODEL', {})
+            path = options.get('PATH')
+            if options.get('ENABLED', True) and path and (Path(path) / IntentClassifier.META_FILE).exists():
+                _model = IntentClassifier.load(path)
+            _model_loaded = True
+    return _model
+
+
+def reset_classifier() -> None:
+    """Forget the loaded model so the next call reloads it from disk"""
+    global _model, _model_loaded
+    with _model_lock:
+        _model = None
+        _model_loaded = False
+
+
+def training_examples(messages: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """
+    Weakly label stored messages with the keyword rules
+
+    A model trained on these labels alone mostly relearns KeywordStage;
+    hand-labelled examples (train_intent_classifier --labels) are what
+    teach it the messages the rules miss.
+
+    Args:
+        messages: Message texts
+
+    Returns:
+        (texts, intents) lists
+    """
+    texts, labels = [], []
+    for text in messages:
+        text = text.strip()
+        if text:
+            texts.append(text)
+            labels.append(resolve_intent(match_keywords(text)))
+    return texts, labels
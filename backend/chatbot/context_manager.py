@@ -1,13 +1,280 @@
 """
 Context manager for handling conversation state
 """
-from typing import Optional
-from .models import Conversation, ConversationContext
+import atexit
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from .models import Conversation, ConversationContext, Message
+
+logger = logging.getLogger(__name__)
+
+
+class StaleContextError(Exception):
+    """Raised when a turn started from a context another worker has since changed"""
+
+
+def _context_attnames() -> List[str]:
+    """Column attribute names of ConversationManager.CONTEXT_FIELDS"""
+    return [
+        ConversationContext._meta.get_field(name).attname
+        for name in ConversationManager.CONTEXT_FIELDS
+    ]
+
+
+def _update_context(context_id: int, version: int, values: Dict[str, Any]) -> bool:
+    """
+    Write context values if the row is still at the given version
+
+    Returns:
+        True if the row was updated, False if it changed or was deleted
+    """
+    updated = ConversationContext.objects.filter(pk=context_id, version=version).update(
+        version=version + 1,
+        **values
+    )
+    return updated == 1
+
+
+class ContextCache:
+    """
+    Write-behind cache of conversation state keyed by conversation id
+
+    Holds snapshots of the Conversation and ConversationContext rows so a
+    turn can skip its load query. Entries live in an in-process LRU with an
+    idle TTL, or in a Django cache (cache_alias) shared by all workers.
+
+    Writes are guarded by ConversationContext.version: a turn that started
+    from an outdated snapshot fails its conditional UPDATE and is retried
+    from the database. With flush_interval > 0, context writes are deferred
+    and flushed in batches; this needs the in-process store, and when two
+    workers serve the same conversation the database copy wins.
+    """
+
+    KEY_PREFIX = 'chatbot:context:'
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        idle_ttl: float = 900,
+        cache_alias: Optional[str] = None,
+        flush_interval: float = 0
+    ):
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        self.cache_alias = cache_alias
+        # Dirty state cannot be tracked across workers, so a shared store is
+        # always written through
+        self.flush_interval = 0 if cache_alias else flush_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.RLock()
+        self._last_flush = time.monotonic()
+
+    @property
+    def write_behind(self) -> bool:
+        """True if context writes are deferred to flush()"""
+        return self.flush_interval > 0
+
+    def get(self, conversation_id) -> Optional[Tuple[Conversation, ConversationContext]]:
+        """
+        Get fresh model instances for a cached conversation
+
+        Args:
+            conversation_id: Conversation id
+
+        Returns:
+            (Conversation, ConversationContext) tuple, or None on a miss
+        """
+        key = str(conversation_id)
+
+        if self.cache_alias:
+            entry = caches[self.cache_alias].get(self.KEY_PREFIX + key)
+        else:
+            with self._lock:
+                entry = self._entries.get(key)
+                # Dirty entries never expire; flush() writes them first
+                if entry and not entry['dirty'] and time.monotonic() - entry['touched'] > self.idle_ttl:
+                    del self._entries[key]
+                    entry = None
+                if entry:
+                    entry['touched'] = time.monotonic()
+                    self._entries.move_to_end(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        conversation = self._restore(Conversation, entry['conversation'])
+        context = self._restore(ConversationContext, entry['context'])
+        context.conversation = conversation
+        return conversation, context
+
+    def put(self, conversation: Conversation, context: ConversationContext, dirty: bool = False) -> None:
+        """
+        Cache the state of a turn once its transaction commits
+
+        A rolled-back turn therefore never reaches the cache.
+
+        Args:
+            conversation: Conversation instance
+            context: ConversationContext instance
+            dirty: True if the context still has to be written to the database
+        """
+        entry = {
+            'conversation': self._snapshot(conversation),
+            'context': self._snapshot(context),
+            'dirty': dirty,
+        }
+        transaction.on_commit(lambda: self._store(str(conversation.pk), entry))
+
+    def invalidate(self, conversation_id) -> None:
+        """Drop a conversation from the cache, discarding unflushed changes"""
+        key = str(conversation_id)
+        if self.cache_alias:
+            caches[self.cache_alias].delete(self.KEY_PREFIX + key)
+        else:
+            with self._lock:
+                self._entries.pop(key, None)
+
+    def flush(self) -> int:
+        """
+        Write every dirty context to the database in one transaction
+
+        Returns:
+            Number of contexts written
+        """
+        with self._lock:
+            self._last_flush = time.monotonic()
+            dirty = [(key, entry) for key, entry in self._entries.items() if entry['dirty']]
+
+        if not dirty:
+            return 0
+
+        written = []
+        with transaction.atomic():
+            for key, entry in dirty:
+                if self._write(entry):
+                    written.append((key, entry))
+                else:
+                    logger.warning("Discarding cached context for conversation %s: changed in the database", key)
+                    self.invalidate(key)
+
+        with self._lock:
+            for key, entry in written:
+                version = entry['context']['version']
+                current = self._entries.get(key)
+                if current is entry:
+                    entry['dirty'] = False
+                # A turn cached a newer snapshot meanwhile; it is based on the
+                # same row, so it stays dirty on top of the new version
+                if current is not None and current['context']['version'] == version:
+                    current['context']['version'] = version + 1
+
+        return len(written)
+
+    def flush_due(self) -> None:
+        """Flush dirty contexts if flush_interval has passed since the last flush"""
+        if self.write_behind and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _store(self, key: str, entry: Dict[str, Any]) -> None:
+        """Store an entry, evicting least recently used ones past max_entries"""
+        if self.cache_alias:
+            caches[self.cache_alias].set(self.KEY_PREFIX + key, entry, timeout=self.idle_ttl)
+            return
+
+        evicted = []
+        with self._lock:
+            entry['touched'] = time.monotonic()
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[1])
+
+        for old in evicted:
+            if old['dirty'] and not self._write(old):
+                logger.warning("Discarding evicted context %s: changed in the database", old['context']['id'])
+
+        self.flush_due()
+
+    @staticmethod
+    def _write(entry: Dict[str, Any]) -> bool:
+        """Write a dirty entry back with a version check"""
+        state = entry['context']
+        values = {attname: state[attname] for attname in _context_attnames()}
+        return _update_context(state['id'], state['version'], values)
+
+    @staticmethod
+    def _snapshot(instance) -> Dict[str, Any]:
+        """Copy the concrete field values of a model instance"""
+        return {
+            field.attname: copy.deepcopy(getattr(instance, field.attname))
+            for field in instance._meta.concrete_fields
+        }
+
+    @staticmethod
+    def _restore(model, state: Dict[str, Any]):
+        """Build a model instance from a snapshot as if loaded from the database"""
+        fields = list(state)
+        return model.from_db('default', fields, [copy.deepcopy(state[name]) for name in fields])
+
+
+def _build_context_cache() -> Optional[ContextCache]:
+    """Create the process-wide context cache from CHATBOT_CONTEXT_CACHE"""
+    options = getattr(settings, 'CHATBOT_CONTEXT_CACHE', {})
+    if not options.get('ENABLED', True):
+        return None
+
+    cache = ContextCache(
+        max_entries=options.get('MAX_ENTRIES', 10000),
+        idle_ttl=options.get('IDLE_TTL', 900),
+        cache_alias=options.get('CACHE_ALIAS'),
+        flush_interval=options.get('FLUSH_INTERVAL', 0)
+    )
+    if cache.write_behind:
+        atexit.register(cache.flush)
+    return cache
+
+
+context_cache = _build_context_cache()
+
+
+@receiver(post_delete, sender=Conversation)
+@receiver(post_save, sender=ConversationContext)
+def _invalidate_cached_context(sender, instance, **kwargs):
+    """Keep the cache from serving rows deleted or edited outside a chat turn"""
+    if context_cache is not None:
+        conversation_id = instance.pk if sender is Conversation else instance.conversation_id
+        context_cache.invalidate(conversation_id)
 
 
 class ConversationManager:
     """Manages conversation context and state"""
 
+    # Context columns a turn may change; written with a single UPDATE
+    CONTEXT_FIELDS = [
+        'intent',
+        'collected_data',
+        'required_fields',
+        'next_field',
+        'change_request',
+    ]
+
     @staticmethod
     def get_or_create_context(conversation: Conversation) -> ConversationContext:
         """
@@ -28,11 +295,198 @@ class ConversationManager:
         )
         return context
 
+    @staticmethod
+    def load_turn(
+        conversation_id: Optional[str] = None,
+        use_cache: bool = True
+    ) -> Tuple[Conversation, ConversationContext]:
+        """
+        Load the conversation and its context for one chat turn
+
+        A cached conversation costs no query. Otherwise it is fetched together
+        with its context in a single query (row-locked where the database
+        supports it, so concurrent turns on the same conversation are
+        serialized). A new conversation and a missing context are only built
+        in memory and are inserted by save_turn(). Must be called inside
+        transaction.atomic().
+
+        Args:
+            conversation_id: Existing conversation id, or None to start one
+            use_cache: False to bypass the context cache
+
+        Returns:
+            (Conversation, ConversationContext) tuple
+        """
+        if conversation_id and use_cache and context_cache is not None:
+            cached = context_cache.get(conversation_id)
+            if cached is not None:
+                return cached
+
+        if conversation_id:
+            queryset = (
+                Conversation.objects
+                .select_related('context')
+                .select_for_update(of=('self',))
+            )
+            conversation = get_object_or_404(queryset, id=conversation_id)
+            try:
+                return conversation, conversation.context
+            except ConversationContext.DoesNotExist:
+                pass
+        else:
+            conversation = Conversation(status='active')
+
+        context = ConversationContext(
+            conversation=conversation,
+            collected_data={},
+            required_fields=[]
+        )
+        return conversation, context
+
+    @staticmethod
+    def save_turn(
+        conversation: Conversation,
+        context: ConversationContext,
+        user_message: str,
+        result: Dict[str, Any]
+    ) -> None:
+        """
+        Persist the outcome of one chat turn
+
+        Writes the conversation and the context once each and the user/bot
+        message pair in one INSERT, so a turn costs at most four statements
+        (SELECT, two UPDATEs and the message INSERT) on top of whatever the
+        handler itself queries; a cached turn skips the SELECT, and in
+        write-behind mode the context UPDATE is deferred to a batched flush.
+        Must be called inside the same transaction.atomic() block as
+        load_turn().
+
+        Args:
+            conversation: Conversation instance
+            context: ConversationContext changed in memory by the handler
+            user_message: User's message text
+            result: Handler result with bot_message and optional change_request
+
+        Raises:
+            StaleContextError: The conversation or its context changed since
+                it was loaded; the turn should be retried without the cache
+        """
+        if result.get('is_complete'):
+            conversation.status = 'completed'
+        if conversation._state.adding:
+            conversation.save()
+        else:
+            now = timezone.now()
+            updated = Conversation.objects.filter(pk=conversation.pk).update(
+                status=conversation.status,
+                updated_at=now
+            )
+            if not updated:
+                raise StaleContextError(f"Conversation {conversation.pk} no longer exists")
+            conversation.updated_at = now
+
+        write_behind = context_cache is not None and context_cache.write_behind
+        dirty = False
+        if context._state.adding:
+            context.save()
+        elif write_behind:
+            dirty = True
+        else:
+            values = {attname: getattr(context, attname) for attname in _context_attnames()}
+            if not _update_context(context.pk, context.version, values):
+                raise StaleContextError(f"Context for conversation {conversation.pk} changed")
+            context.version += 1
+
+        Message.objects.bulk_create([
+            Message(conversation=conversation, sender='user', text=user_message),
+            Message(
+                conversation=conversation,
+                sender='bot',
+                text=result['bot_message'],
+                metadata=result.get('change_request')
+            ),
+        ])
+
+        if context_cache is not None:
+            context_cache.put(conversation, context, dirty=dirty)
+
+    @staticmethod
+    def invalidate(conversation_id) -> None:
+        """
+        Drop a conversation from the context cache
+
+        Args:
+            conversation_id: Conversation id
+        """
+        if context_cache is not None:
+            context_cache.invalidate(conversation_id)
+
+    @staticmethod
+    async def aload_turn(
+        conversation_id: Optional[str] = None,
+        use_cache: bool = True
+    ) -> Tuple[Conversation, ConversationContext]:
+        """
+        Async variant of load_turn() for the ASGI chat endpoint
+
+        The async ORM cannot hold a transaction open across awaits, so the
+        row is read without a lock; asave_turn() writes the turn atomically.
+
+        Args:
+            conversation_id: Existing conversation id, or None to start one
+            use_cache: False to bypass the context cache
+
+        Returns:
+            (Conversation, ConversationContext) tuple
+        """
+        if conversation_id and use_cache and context_cache is not None:
+            cached = context_cache.get(conversation_id)
+            if cached is not None:
+                return cached
+
+        if conversation_id:
+            try:
+                conversation = await Conversation.objects.select_related('context').aget(id=conversation_id)
+            except Conversation.DoesNotExist:
+                raise Http404('No Conversation matches the given query.')
+            try:
+                return conversation, conversation.context
+            except ConversationContext.DoesNotExist:
+                pass
+        else:
+            conversation = Conversation(status='active')
+
+        context = ConversationContext(
+            conversation=conversation,
+            collected_data={},
+            required_fields=[]
+        )
+        return conversation, context
+
+    @staticmethod
+    async def asave_turn(
+        conversation: Conversation,
+        context: ConversationContext,
+        user_message: str,
+        result: Dict[str, Any]
+    ) -> None:
+        """
+        Async variant of save_turn()
+
+        Transactions do not work in async mode, so the writes run as one
+        atomic block on the ORM's sync thread.
+        """
+        await sync_to_async(transaction.atomic(ConversationManager.save_turn))(
+            conversation, context, user_message, result
+        )
+
     @staticmethod
     def reset_context(context: ConversationContext) -> None:
         """
         Reset conversation context for a new intent
 
+        Only the in-memory state is reset; the turn pipeline persists it.
+
         Args:
             context: ConversationContext to reset
         """
@@ -41,7 +495,6 @@ class ConversationManager:
         context.required_fields = []
         context.next_field = None
         context.change_request = None
-        context.save()
 
     @staticmethod
     def is_context_active(context: ConversationContext) -> bool:
@@ -55,3 +508,144 @@ class ConversationManager:
             True if context has an active intent
         """
         return context.intent is not None and len(context.required_fields) > 0
+
+
+class TurnBatch:
+    """
+    Runs many chat turns in one transaction with their writes grouped
+
+    Existing conversations are loaded once (those not cached in a single
+    query), turns change them in memory, and flush() writes every touched
+    conversation and context once and all messages in one INSERT. A turn
+    that fails is rolled back on its own; the others still commit. Must be
+    used inside transaction.atomic().
+    """
+
+    def __init__(self, conversation_ids: List[str], use_cache: bool = True):
+        """
+        Args:
+            conversation_ids: Existing conversations the batch refers to
+            use_cache: False to bypass the context cache
+        """
+        self._conversations: Dict[str, Tuple[Conversation, ConversationContext]] = {}
+        self._touched: Dict[str, Tuple[Conversation, ConversationContext]] = {}
+        self._messages: List[Message] = []
+
+        missing = []
+        for conversation_id in {str(conversation_id) for conversation_id in conversation_ids}:
+            cached = context_cache.get(conversation_id) if use_cache and context_cache is not None else None
+            if cached is not None:
+                self._conversations[conversation_id] = cached
+            else:
+                missing.append(conversation_id)
+
+        if missing:
+            queryset = (
+                Conversation.objects
+                .select_related('context')
+                .select_for_update(of=('self',))
+                .filter(id__in=missing)
+            )
+            for conversation in queryset:
+                try:
+                    context = conversation.context
+                except ConversationContext.DoesNotExist:
+                    context = ConversationContext(conversation=conversation, collected_data={}, required_fields=[])
+                self._conversations[str(conversation.id)] = (conversation, context)
+
+    def run_turn(
+        self,
+        user_message: str,
+        turn: Callable[[ConversationContext], Dict[str, Any]],
+        conversation_id: Optional[str] = None,
+        conversation_ref: Optional[str] = None
+    ) -> Tuple[Conversation, ConversationContext, Dict[str, Any]]:
+        """
+        Run one turn of the batch
+
+        Args:
+            user_message: User's message text
+            turn: Routes the message and returns the handler result
+            conversation_id: Existing conversation id
+            conversation_ref: Client label; turns with the same label share
+                one new conversation
+
+        Returns:
+            (Conversation, ConversationContext, result) tuple
+
+        Raises:
+            Http404: conversation_id does not exist
+        """
+        if conversation_id:
+            key = str(conversation_id)
+            if key not in self._conversations:
+                raise Http404('No Conversation matches the given query.')
+        else:
+            key = f'ref:{conversation_ref}' if conversation_ref else None
+
+        if key in self._conversations:
+            conversation, context = self._conversations[key]
+        else:
+            conversation = Conversation(status='active')
+            context = ConversationContext(conversation=conversation, collected_data={}, required_fields=[])
+
+        status_before = conversation.status
+        context_before = {attname: copy.deepcopy(getattr(context, attname)) for attname in _context_attnames()}
+
+        try:
+            with transaction.atomic():
+                result = turn(context)
+        except Exception:
+            conversation.status = status_before
+            for attname, value in context_before.items():
+                setattr(context, attname, value)
+            raise
+
+        if result.get('is_complete'):
+            conversation.status = 'completed'
+        if key is not None:
+            self._conversations[key] = (conversation, context)
+        self._touched[str(conversation.pk)] = (conversation, context)
+        self._messages += [
+            Message(conversation=conversation, sender='user', text=user_message),
+            Message(
+                conversation=conversation,
+                sender='bot',
+                text=result['bot_message'],
+                metadata=result.get('change_request')
+            ),
+        ]
+
+        return conversation, context, result
+
+    def flush(self) -> None:
+        """
+        Write everything the batch changed
+
+        Raises:
+            StaleContextError: A cached context changed since it was loaded
+        """
+        touched = list(self._touched.values())
+        now = timezone.now()
+
+        new_conversations = [conversation for conversation, _ in touched if conversation._state.adding]
+        existing_conversations = [conversation for conversation, _ in touched if not conversation._state.adding]
+        Conversation.objects.bulk_create(new_conversations)
+        for conversation in existing_conversations:
+            conversation.updated_at = now
+        Conversation.objects.bulk_update(existing_conversations, ['status', 'updated_at'])
+
+        new_contexts = [context for _, context in touched if context._state.adding]
+        existing_contexts = [(conversation, context) for conversation, context in touched if not context._state.adding]
+        ConversationContext.objects.bulk_create(new_contexts)
+        for conversation, context in existing_contexts:
+            values = {attname: getattr(context, attname) for attname in _context_attnames()}
+            if not _update_context(context.pk, context.version, values):
+                raise StaleContextError(f"Context for conversation {conversation.pk} changed")
+            context.version += 1
+
+        Message.objects.bulk_create(self._messages)
+
+        if context_cache is not None:
+            for conversation, context in touched:
+                context_cache.put(conversation, context)
@@ -0,0 +1,139 @@
+"""
+Entity extraction - pulls change request fields out of free text
+
+"create a P2 change to patch nginx from 2026-11-01 to 2026-11-02" yields the
+priority, both planned dates and a short description in one regex scan, so
+handlers only need to ask for what is still missing.
+"""
+import re
+from datetime import date
+from typing import Dict, List, Optional
+
+PRIORITY_WORDS = {
+    'critical': '1',
+    'urgent': '1',
+    'high': '2',
+    'medium': '3',
+    'normal': '3',
+    'low': '4',
+}
+
+# Words that make a lone date the end date ("done by 2026-11-02")
+END_DATE_CUES = ('by', 'until', 'till', 'before', 'due', 'end', 'ending')
+
+_DATE = r'\d{4}-\d{2}-\d{2}'
+_PRIORITY_WORD = '|'.join(PRIORITY_WORDS)
+
+# ServiceNow numbers (CHG) and local numbers (LCHG) of changes not in
+# ServiceNow yet
+_CHANGE_NUMBER = re.compile(r'(L?CHG)(\d+)')
+
+# One alternation, scanned once with finditer(); the first alternative that
+# matches at a position wins
+_ENTITY_PATTERN = re.compile(
+    rf"""
+    \b(?P<change_number>l?chg\d{{1,10}})\b
+    | \bp(?P<priority_code>[1-4])\b
+    | \bpriority\s*(?:of\s+|is\s+|to\s+|[:=]\s*)?(?P<priority_value>[1-4]|{_PRIORITY_WORD})\b
+    | \b(?P<priority_word>{_PRIORITY_WORD})[\s-]+priority\b
+    | (?:\b(?P<date_cue>{'|'.join(END_DATE_CUES)})\s+)?\b(?P<date>{_DATE})\b
+    | \b(?:change|request|ticket|cr)\s+(?:to|for)\s+
+      (?P<summary>.+?)
+      (?=\s+(?:from|on|between|starting|by|until|till|before|with|priority|p[1-4])\b
+         |\s+{_DATE}|\s*[.,;!?]|\s*$)
+    | \bsummary\s*(?:[:=]|\s+to\b)\s*(?P<summary_label>[^.;\n]+)
+    | \bdescription\s*(?:[:=]|\s+to\b)\s*(?P<description_label>[^\n]+)
+    """,
+    re.IGNORECASE | re.VERBOSE
+)
+
+
+def normalize_change_number(value: str) -> str:
+    """
+    Canonical change number: upper case with a seven digit sequence
+
+    Args:
+        value: e.g. "chg12", "CHG0000012" or a local "lchg7"
+
+    Returns:
+        e.g. "CHG0000012" or "LCHG0000007"
+    """
+    match = _CHANGE_NUMBER.fullmatch(value.upper())
+    return f"{match.group(1)}{int(match.group(2)):07d}" if match else value.upper()
+
+
+def normalize_priority(value: str) -> Optional[str]:
+    """
+    Priority code ('1'-'4') for "2", "P2" or "high"
+
+    Returns:
+        The code, or None when the value is not a priority
+    """
+    value = value.strip().lower()
+    if value.startswith('p'):
+        value = value[1:]
+    if value in ('1', '2', '3', '4'):
+        return value
+    return PRIORITY_WORDS.get(value)
+
+
+def _valid_date(value: str) -> bool:
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def extract_entities(message: str) -> Dict[str, str]:
+    """
+    Extract change request fields from a message
+
+    The first date is the planned start and the second the planned end; a
+    single date preceded by "by", "until" etc. is the planned end. A
+    description ("description: ...") runs to the end of the line.
+
+    Args:
+        message: User's message text
+
+    Returns:
+        Dict with any of change_number, priority, planned_start_date,
+        planned_end_date, short_description and description
+    """
+    entities: Dict[str, str] = {}
+    dates: List[str] = []
+    end_date: Optional[str] = None
+
+    for match in _ENTITY_PATTERN.finditer(message):
+        kind = match.lastgroup
+        if kind == 'change_number':
+            entities.setdefault('change_number', normalize_change_number(match.group(kind)))
+        elif kind in ('priority_code', 'priority_value', 'priority_word'):
+            priority = normalize_priority(match.group(kind))
+            if priority:
+                entities.setdefault('priority', priority)
+        elif kind == 'date':
+            value = match.group('date')
+            if not _valid_date(value):
+                continue
+            if match.group('date_cue') and end_date is None:
+                end_date = value
+            else:
+                dates.append(value)
+        elif kind in ('summary', 'summary_label'):
+            summary = match.group(kind).strip()
+            if summary:
+                entities.setdefault('short_description', summary)
+        elif kind == 'description_label':
+            description = match.group(kind).strip()
+            if description:
+                entities.setdefault('description', description)
+
+    if dates:
+        entities['planned_start_date'] = dates[0]
+    if end_date:
+        entities['planned_end_date'] = end_date
+    elif len(dates) > 1:
+        entities['planned_end_date'] = dates[1]
+
+    return entities
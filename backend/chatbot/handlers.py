@@ -1,13 +1,54 @@
 """
 Intent handlers for processing different user intents
 """
-from typing import Dict, Any
+import re
+import uuid
+from contextvars import ContextVar
+from datetime import date, datetime
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
+from django.db import transaction
+from django.db.models import Q
 from .models import ConversationContext
+from .entities import extract_entities, normalize_priority
 from integrations.models import ChangeRequest
+from integrations.fanout import creation_payload
+from integrations.jobs import enqueue, schedule_change_update
+from integrations.numbering import change_number_allocator
+from integrations.status_cache import change_status_cache
+
+
+# Receives progress events of the turn running in the current thread or task;
+# set by the streaming chat endpoint
+progress_listener: ContextVar[Optional[Callable[[str, Dict[str, Any]], None]]] = ContextVar(
+    'progress_listener',
+    default=None
+)
+
+
+def report_progress(event: str, **data) -> None:
+    """
+    Report turn progress to the streaming endpoint, if one is listening
+
+    Args:
+        event: Event name (e.g. 'intent', 'progress')
+        **data: JSON-serializable event payload
+    """
+    listener = progress_listener.get()
+    if listener is not None:
+        listener(event, data)
 
 
 class BaseHandler:
-    """Base class for all intent handlers"""
+    """
+    Base class for all intent handlers
+
+    Handlers only change the context in memory; the chat turn pipeline
+    (ConversationManager.save_turn) persists it once at the end of the turn.
+    """
+
+    # Handlers that never touch the database or a remote service set this
+    # to False so prepare() can call handle() directly on the event loop
+    performs_io = True
 
     def handle(self, context: ConversationContext, message: str) -> Dict[str, Any]:
         """
@@ -22,209 +63,715 @@ class BaseHandler:
         """
         raise NotImplementedError("Subclasses must implement handle()")
 
+    def continues(self, context: ConversationContext, message: str) -> bool:
+        """
+        Whether a message carries on this handler's ongoing intent
 
-class CreateChangeRequestHandler(BaseHandler):
-    """Handler for creating a new change request"""
+        By default every message does (switch words still leave it); a
+        handler returns False for messages that should be routed afresh.
+        """
+        return True
 
-    REQUIRED_FIELDS = [
-        'short_description',
-        'description',
-        'priority',
-        'planned_start_date',
-        'planned_end_date'
-    ]
+    def prepare(self, context: ConversationContext, message: str) -> Optional[Dict[str, Any]]:
+        """
+        The part of handle() that needs no I/O (ASGI chat endpoint)
 
-    FIELD_PROMPTS = {
-        'short_description': "What's a brief summary of the change?",
-        'description': "Please provide a detailed description of the change.",
-        'priority': "What's the priority? (1-Critical, 2-High, 3-Medium, 4-Low)",
-        'planned_start_date': "When do you plan to start? (YYYY-MM-DD)",
-        'planned_end_date': "When should this be completed? (YYYY-MM-DD)"
-    }
+        Runs on the event loop. When it returns None, the endpoint calls
+        finish() on the ORM's thread, in the transaction that saves the turn.
 
-    def handle(self, context: ConversationContext, message: str) -> Dict[str, Any]:
-        """Handle create_change_request intent"""
+        Returns:
+            The handler result, or None if finish() has to run
+        """
+        if not self.performs_io:
+            return self.handle(context, message)
+        return None
+
+    def finish(self, context: ConversationContext, message: str) -> Dict[str, Any]:
+        """The rest of handle() after prepare() returned None"""
+        return self.handle(context, message)
+
+
+def _text(value: str) -> Optional[str]:
+    """Any non-empty answer"""
+    value = value.strip()
+    return value or None
+
+
+def _priority(value: str) -> Optional[str]:
+    return normalize_priority(value) or extract_entities(value).get('priority')
+
+
+def _date(value: str) -> Optional[str]:
+    value = value.strip()
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return None
+    return value
+
+
+def _change_number(value: str) -> Optional[str]:
+    """A CHG/LCHG number in the answer; anything else is asked again"""
+    return extract_entities(value).get('change_number')
+
+
+class Slot:
+    """
+    One field of a slot-filling flow
+
+    Attributes:
+        name: Key in context.collected_data
+        prompt: Question asked when the field is next
+        label: Name used in replies ("I've noted the ...")
+        validate: Returns the cleaned value, or None if the text is not valid
+        error: Reply when an answer does not validate
+        answers: Extracted entities (chatbot/entities.py) that can answer the
+            question, in order of preference; the whole message is tried last
+    """
+
+    def __init__(
+        self,
+        name: str,
+        prompt: str,
+        label: Optional[str] = None,
+        validate: Callable[[str], Optional[str]] = _text,
+        error: Optional[str] = None,
+        answers: Optional[Tuple[str, ...]] = None
+    ):
+        self.name = name
+        self.prompt = prompt
+        self.label = label or name.replace('_', ' ')
+        self.validate = validate
+        self.error = error or prompt
+        self.answers = answers if answers is not None else (name,)
+
+
+class Flow:
+    """
+    Declarative slot-filling flow for one intent, compiled once
+
+    step() runs one turn: it answers the question that was asked, fills any
+    other open slot from entities found in the same message, and picks the
+    next question. Open slots are tracked as a set during the turn and
+    written back to context.required_fields (in spec order) once; the turn
+    pipeline persists the context.
+    """
+
+    def __init__(self, intent: str, slots: List[Slot], intro: str = ''):
+        self.intent = intent
+        self.slots = tuple(slots)
+        self.intro = intro
+        self.labels = {slot.name: slot.label for slot in self.slots}
+        self._slots = {slot.name: slot for slot in self.slots}
+        self._order = {slot.name: index for index, slot in enumerate(self.slots)}
+
+    def step(self, context: ConversationContext, message: str) -> Optional[Dict[str, Any]]:
+        """
+        Apply one message to the flow
 
-        # Initialize context if new intent
-        if not context.intent or context.intent != 'create_change_request':
-            context.intent = 'create_change_request'
-            context.required_fields = self.REQUIRED_FIELDS.copy()
+        A context of another intent, or one whose flow already finished,
+        starts over.
+
+        Returns:
+            The reply (next question or validation error), or None once
+            every slot is filled
+        """
+        entities = extract_entities(message)
+        starting = context.intent != self.intent or context.next_field is None
+
+        if starting:
+            context.intent = self.intent
             context.collected_data = {}
-            context.next_field = self.REQUIRED_FIELDS[0]
-            context.save()
+            remaining = set(self._order)
+        else:
+            remaining = set(context.required_fields)
+            slot = self._slots[context.next_field]
+            value = self._answer(slot, message, entities)
+            if value is None:
+                return {'bot_message': slot.error, 'is_complete': False}
+            context.collected_data[slot.name] = value
+            remaining.discard(slot.name)
+
+        noted = self._prefill(context, remaining, entities)
+        self._store(context, remaining)
+
+        if not remaining:
+            return None
+
+        prompt = self._slots[context.next_field].prompt
+        if starting:
+            intro = self.intro
+            if noted:
+                intro += f" I've noted the {', '.join(noted)}."
+            prompt = f"{intro} {prompt}".strip()
+        return {'bot_message': prompt, 'is_complete': False}
+
+    def reopen(self, context: ConversationContext, name: str) -> None:
+        """Ask for a slot again (e.g. when the completion action rejects it)"""
+        remaining = set(context.required_fields)
+        remaining.add(name)
+        context.collected_data.pop(name, None)
+        self._store(context, remaining)
+
+    @staticmethod
+    def _answer(slot: Slot, message: str, entities: Dict[str, str]) -> Optional[str]:
+        """The value answering slot's question; consumes the entity used"""
+        for name in slot.answers:
+            if name in entities:
+                value = slot.validate(entities[name])
+                if value is not None:
+                    del entities[name]
+                    return value
+        return slot.validate(message)
+
+    def _prefill(self, context: ConversationContext, remaining: Set[str], entities: Dict[str, str]) -> List[str]:
+        """Fill open slots from entities; returns the labels filled"""
+        noted = []
+        for name in sorted(remaining.intersection(entities), key=self._order.__getitem__):
+            value = self._slots[name].validate(entities[name])
+            if value is not None:
+                context.collected_data[name] = value
+                remaining.discard(name)
+                noted.append(self._slots[name].label)
+        return noted
+
+    def _store(self, context: ConversationContext, remaining: Set[str]) -> None:
+        context.required_fields = sorted(remaining, key=self._order.__getitem__)
+        context.next_field = context.required_fields[0] if context.required_fields else None
+
+
+class FlowHandler(BaseHandler):
+    """
+    Handler driven by a Flow
+
+    Subclasses declare flow and implement complete(), which runs once every
+    slot is filled.
+    """
+
+    flow: Flow
 
-            return {
-                'bot_message': f"I'll help you create a change request. {self.FIELD_PROMPTS[context.next_field]}",
-                'is_complete': False
-            }
+    def handle(self, context: ConversationContext, message: str) -> Dict[str, Any]:
+        result = self.flow.step(context, message)
+        if result is not None:
+            return result
+        return self.complete(context, context.collected_data)
 
-        # Collect current field value
-        current_field = context.next_field
+    def prepare(self, context: ConversationContext, message: str) -> Optional[Dict[str, Any]]:
+        # step() only parses text, so it runs on the event loop
+        return self.flow.step(context, message)
 
-        # Validate priority field
-        if current_field == 'priority':
-            message = message.strip()
-            if message not in ['1', '2', '3', '4']:
-                return {
-                    'bot_message': "Please enter a valid priority: 1 (Critical), 2 (High), 3 (Medium), or 4 (Low)",
-                    'is_complete': False
-                }
+    def finish(self, context: ConversationContext, message: str) -> Dict[str, Any]:
+        return self.complete(context, context.collected_data)
 
-        context.collected_data[current_field] = message
-        if current_field in context.required_fields:
-            context.required_fields.remove(current_field)
+    def complete(self, context: ConversationContext, data: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Completion action
 
-        # Check if more fields needed
-        if context.required_fields:
-            context.next_field = context.required_fields[0]
-            context.save()
+        Args:
+            context: Conversation context (all slots filled)
+            data: Collected slot values
 
-            return {
-                'bot_message': self.FIELD_PROMPTS[context.next_field],
-                'is_complete': False
+        Returns:
+            Handler result
+        """
+        raise NotImplementedError("Subclasses must implement complete()")
+
+
+class CreateChangeRequestHandler(FlowHandler):
+    """Handler for creating a new change request"""
+
+    flow = Flow(
+        'create_change_request',
+        [
+            Slot(
+                'short_description',
+                "What's a brief summary of the change?",
+                label='summary'
+            ),
+            Slot(
+                'description',
+                "Please provide a detailed description of the change."
+            ),
+            Slot(
+                'priority',
+                "What's the priority? (1-Critical, 2-High, 3-Medium, 4-Low)",
+                validate=_priority,
+                error="Please enter a valid priority: 1 (Critical), 2 (High), 3 (Medium), or 4 (Low)"
+            ),
+            # A single date answers the question that was asked
+            Slot(
+                'planned_start_date',
+                "When do you plan to start? (YYYY-MM-DD)",
+                label='start date',
+                validate=_date,
+                error="Please enter the start date as YYYY-MM-DD.",
+                answers=('planned_start_date', 'planned_end_date')
+            ),
+            Slot(
+                'planned_end_date',
+                "When should this be completed? (YYYY-MM-DD)",
+                label='end date',
+                validate=_date,
+                error="Please enter the end date as YYYY-MM-DD.",
+                answers=('planned_end_date', 'planned_start_date')
+            ),
+        ],
+        intro="I'll help you create a change request."
+    )
+
+    def complete(self, context: ConversationContext, data: Dict[str, str]) -> Dict[str, Any]:
+        """Create the change request from the collected fields"""
+        try:
+            # Savepoint, so a failed insert leaves the turn's transaction usable
+            with transaction.atomic():
+                change_request, targets = self._create_change_request(data)
+        except Exception as e:
+            return self._error_result(e)
+
+        return self._created_result(context, change_request, targets)
+
+    TARGET_LABELS = {
+        'servicenow': 'ServiceNow change',
+        'jira': 'Jira issue',
+        'github': 'GitHub pull request'
+    }
+
+    def _created_result(self, context: ConversationContext, change_request: ChangeRequest,
+                        targets: List[str]) -> Dict[str, Any]:
+        """Link the new change request to the context and build the reply"""
+        context.change_request = change_request
+
+        return {
+            'bot_message': f"✓ Change request {change_request.number} created successfully!\n\n"
+                         f"Summary: {change_request.short_description}\n"
+                         f"Priority: {change_request.priority}\n"
+                         f"Status: {change_request.state}\n"
+                         f"Creating: {', '.join(self.TARGET_LABELS[target] for target in targets)}",
+            'is_complete': True,
+            'change_request': {
+                'number': change_request.number,
+                'sys_id': change_request.servicenow_sys_id,
+                'id': change_request.id
             }
+        }
+
+    def _error_result(self, error: Exception) -> Dict[str, Any]:
+        """Build the reply for a failed create"""
+        return {
+            'bot_message': f"Sorry, I encountered an error creating the change request: {str(error)}",
+            'is_complete': False
+        }
+
+    def _create_change_request(self, data: Dict[str, str]) -> Tuple[ChangeRequest, List[str]]:
+        """
+        Save the change request locally and queue its remote creation
+
+        The reply does not wait: run_integration_worker creates the
+        ServiceNow change, Jira issue and GitHub PR concurrently and fills
+        in the links.
+
+        Returns:
+            (change request, remote targets queued) tuple
+        """
+        number = change_number_allocator.allocate()
+        change_request = ChangeRequest.objects.create(**self._pending_fields(data, number))
+        payload = creation_payload(number, data)
+        enqueue('change_request.fan_out', payload, change_request=change_request, priority=int(data['priority']))
+        self._report_queued(payload)
+        return change_request, list(payload)
+
+    def _report_queued(self, payload: Dict[str, Any]) -> None:
+        report_progress('progress', stage='servicenow', status='queued',
+                        message=f"Queued: {', '.join(self.TARGET_LABELS[target] for target in payload)}")
+
+    @staticmethod
+    def _pending_fields(data: Dict[str, str], number: str) -> Dict[str, str]:
+        """Fields for the local record until ServiceNow has created the change"""
+        mock_sys_id = str(uuid.uuid4()).replace('-', '')[:32]
 
-        # All fields collected - create change request
+        return {
+            'servicenow_sys_id': mock_sys_id,
+            'number': number,
+            'short_description': data['short_description'],
+            'description': data['description'],
+            'priority': data['priority'],
+            'state': 'Pending'
+        }
+
+
+class CheckStatusHandler(FlowHandler):
+    """Handler for checking change request status"""
+
+    # "check status of CHG0000012" answers right away
+    flow = Flow(
+        'check_status',
+        [
+            Slot(
+                'change_number',
+                "What's the change request number you want to check? (e.g., CHG0001234)",
+                label='change number',
+                validate=_change_number
+            ),
+        ]
+    )
+
+    def complete(self, context: ConversationContext, data: Dict[str, str]) -> Dict[str, Any]:
+        """Reply with the status of the requested change"""
+        change_number = data['change_number']
+
+        # Try to find the change request (cached; never waits on ServiceNow)
         try:
-            change_request = self._create_change_request(context.collected_data)
-            context.change_request = change_request
-            context.next_field = None
-            context.save()
+            change_request = change_status_cache.get(number=change_number)
+
+            if not change_request:
+                self.flow.reopen(context, 'change_number')
+                return {
+                    'bot_message': f"I couldn't find a change request with number {change_number}. "
+                                 "Please check the number and try again.",
+                    'is_complete': False
+                }
+
+            context.change_request_id = change_request['id']
+
+            links = ""
+            if change_request['jira_issue_key']:
+                links += f"\nJira: {change_request['jira_issue_key']}"
+            if change_request['github_pr_number']:
+                links += f"\nGitHub PR: {change_request['github_repo']}#{change_request['github_pr_number']}"
 
             return {
-                'bot_message': f"✓ Change request {change_request.number} created successfully!\n\n"
-                             f"Summary: {change_request.short_description}\n"
-                             f"Priority: {change_request.priority}\n"
-                             f"Status: {change_request.state}",
+                'bot_message': f"Change Request: {change_request['number']}\n\n"
+                             f"Summary: {change_request['short_description']}\n"
+                             f"Description: {change_request['description']}\n"
+                             f"Status: {change_request['state']}\n"
+                             f"Priority: {change_request['priority']}\n"
+                             f"Created: {change_request['created_at'].strftime('%Y-%m-%d %H:%M')}"
+                             f"{links}",
                 'is_complete': True,
                 'change_request': {
-                    'number': change_request.number,
-                    'sys_id': change_request.servicenow_sys_id,
-                    'id': change_request.id
+                    'number': change_request['number'],
+                    'sys_id': change_request['servicenow_sys_id'],
+                    'id': change_request['id']
                 }
             }
         except Exception as e:
+            self.flow.reopen(context, 'change_number')
             return {
-                'bot_message': f"Sorry, I encountered an error creating the change request: {str(e)}",
+                'bot_message': f"Sorry, I encountered an error: {str(e)}",
                 'is_complete': False
             }
 
-    def _create_change_request(self, data: Dict[str, str]) -> ChangeRequest:
-        """
-        Call ServiceNow API to create change request
-        For now, this is a placeholder that creates a local record
-        """
-        from integrations.services import ServiceNowService
 
-        # Try to use the service, but fall back to creating a local record if not configured
-        try:
-            service = ServiceNowService()
-            snow_response = service.create_change_request(
-                short_description=data['short_description'],
-                description=data['description'],
-                priority=data['priority'],
-                planned_start_date=data['planned_start_date'],
-                planned_end_date=data['planned_end_date']
-            )
+class UpdateChangeRequestHandler(FlowHandler):
+    """
+    Handler for editing an existing change request
 
-            # Create local record from ServiceNow response
-            change_request = ChangeRequest.objects.create(
-                servicenow_sys_id=snow_response['sys_id'],
-                number=snow_response['number'],
-                short_description=data['short_description'],
-                description=data['description'],
-                priority=data['priority'],
-                state=snow_response.get('state', 'New')
-            )
-        except Exception:
-            # Fallback: Create a placeholder record locally
-            # Generate a mock CHG number
-            import uuid
-            mock_sys_id = str(uuid.uuid4()).replace('-', '')[:32]
-            last_cr = ChangeRequest.objects.all().order_by('-id').first()
-            next_number = 1 if not last_cr else int(last_cr.number.replace('CHG', '')) + 1
-            mock_number = f"CHG{next_number:07d}"
-
-            change_request = ChangeRequest.objects.create(
-                servicenow_sys_id=mock_sys_id,
-                number=mock_number,
-                short_description=data['short_description'],
-                description=data['description'],
-                priority=data['priority'],
-                state='New'
-            )
+    The flow asks for the change number; once it matches a change request,
+    edits are collected over as many turns as the user likes and applied
+    when a message is just "done": only fields whose value actually differs
+    from the stored change request are saved, and ServiceNow receives one
+    PATCH with just those fields (see integrations.jobs.schedule_change_update).
+    """
 
-        return change_request
+    EDITABLE_FIELDS = ['short_description', 'description', 'priority']
 
+    FIELD_LABELS = CreateChangeRequestHandler.flow.labels
 
-class CheckStatusHandler(BaseHandler):
-    """Handler for checking change request status"""
+    # The whole message, so "save the summary: ..." is an edit, not a commit
+    DONE_PATTERN = re.compile(r"\s*(done|save|submit|that's all|that is all)[\s.!]*", re.IGNORECASE)
 
-    def handle(self, context: ConversationContext, message: str) -> Dict[str, Any]:
-        """Handle check_status intent"""
+    EDIT_PROMPT = (
+        "What would you like to change? For example \"priority P1\", "
+        "\"summary: Patch nginx\" or \"description: ...\". Say 'done' to save."
+    )
 
-        # Initialize context if new intent
-        if not context.intent or context.intent != 'check_status':
-            context.intent = 'check_status'
-            context.required_fields = ['change_number']
-            context.collected_data = {}
-            context.next_field = 'change_number'
-            context.save()
+    # context.next_field while edits are being collected
+    EDITING = 'edits'
+
+    flow = Flow(
+        'update_change_request',
+        [
+            Slot(
+                'change_number',
+                "Which change request do you want to update? (e.g., CHG0001234)",
+                label='change number',
+                validate=_change_number
+            ),
+        ]
+    )
 
+    def handle(self, context: ConversationContext, message: str) -> Dict[str, Any]:
+        """Handle update_change_request intent"""
+        result = self.prepare(context, message)
+        if result is not None:
+            return result
+        return self.finish(context, message)
+
+    def prepare(self, context: ConversationContext, message: str) -> Optional[Dict[str, Any]]:
+        if self._editing(context):
+            return None
+        return self.flow.step(context, message)
+
+    def finish(self, context: ConversationContext, message: str) -> Dict[str, Any]:
+        if not self._editing(context):
+            result = self.complete(context, context.collected_data)
+            if result is not None:
+                return result
+        return self._edit(context, message)
+
+    def complete(self, context: ConversationContext, data: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """
+        Select the change request to edit
+
+        Returns:
+            The reply if no change request has that number, or None once
+            edits are being collected (from the same message onwards)
+        """
+        change_number = data['change_number']
+        change_request = ChangeRequest.objects.filter(number=change_number).only('id').first()
+        if change_request is None:
+            self.flow.reopen(context, 'change_number')
             return {
-                'bot_message': "What's the change request number you want to check? (e.g., CHG0001234)",
+                'bot_message': f"I couldn't find a change request with number {change_number}. "
+                             "Please check the number and try again.",
                 'is_complete': False
             }
 
-        # Extract change number from message
-        change_number = message.strip().upper()
+        context.change_request_id = change_request.id
+        context.collected_data['edits'] = {}
+        context.next_field = self.EDITING
+        return None
+
+    def _editing(self, context: ConversationContext) -> bool:
+        return context.intent == self.flow.intent and context.next_field == self.EDITING
+
+    def _edit(self, context: ConversationContext, message: str) -> Dict[str, Any]:
+        """Note the edits in one message, or save them all on a bare "done"."""
+        entities = extract_entities(message)
+        edits = context.collected_data['edits']
+        noted = {field: entities[field] for field in self.EDITABLE_FIELDS if field in entities}
+        edits.update(noted)
+
+        if not self.DONE_PATTERN.fullmatch(message):
+            if noted:
+                listed = ', '.join(f"{self.FIELD_LABELS[field]} \"{value}\"" for field, value in noted.items())
+                bot_message = f"Noted the new {listed}. Anything else? Say 'done' to save."
+            else:
+                bot_message = f"Updating {context.collected_data['change_number']}. {self.EDIT_PROMPT}"
+            return {'bot_message': bot_message, 'is_complete': False}
+
+        if not edits:
+            return {
+                'bot_message': f"There's nothing to save yet. {self.EDIT_PROMPT}",
+                'is_complete': False
+            }
 
-        # Try to find the change request
         try:
-            change_request = ChangeRequest.objects.filter(number=change_number).first()
+            with transaction.atomic():
+                change_request, changes = self._apply_edits(context.change_request_id, edits)
+        except Exception as e:
+            return {
+                'bot_message': f"Sorry, I encountered an error updating the change request: {str(e)}",
+                'is_complete': False
+            }
 
-            if not change_request:
-                return {
-                    'bot_message': f"I couldn't find a change request with number {change_number}. "
-                                 "Please check the number and try again.",
-                    'is_complete': False
-                }
+        context.next_field = None
+        return self._updated_result(change_request, changes)
 
-            context.change_request = change_request
-            context.required_fields = []
-            context.next_field = None
-            context.save()
+    def _apply_edits(self, change_request_id: int, edits: Dict[str, str]):
+        """
+        Save the fields that changed and queue them for ServiceNow
 
-            return {
-                'bot_message': f"Change Request: {change_request.number}\n\n"
-                             f"Summary: {change_request.short_description}\n"
-                             f"Description: {change_request.description}\n"
-                             f"Status: {change_request.state}\n"
-                             f"Priority: {change_request.priority}\n"
-                             f"Created: {change_request.created_at.strftime('%Y-%m-%d %H:%M')}",
-                'is_complete': True,
-                'change_request': {
-                    'number': change_request.number,
-                    'sys_id': change_request.servicenow_sys_id,
-                    'id': change_request.id
-                }
+        Args:
+            change_request_id: Change request being edited
+            edits: Collected field values
+
+        Returns:
+            (change request, {field: (old value, new value)}) tuple
+        """
+        change_request = ChangeRequest.objects.select_for_update().get(id=change_request_id)
+        changes = {
+            field: (getattr(change_request, field), value)
+            for field, value in edits.items()
+            if getattr(change_request, field) != value
+        }
+        if not changes:
+            return change_request, changes
+
+        for field, (_, value) in changes.items():
+            setattr(change_request, field, value)
+        change_request.save(update_fields=[*changes, 'updated_at'])
+        schedule_change_update(change_request, {field: value for field, (_, value) in changes.items()})
+        report_progress('progress', stage='servicenow', status='queued',
+                        message="Queued the update for ServiceNow")
+        return change_request, changes
+
+    def _updated_result(self, change_request: ChangeRequest, changes: Dict[str, tuple]) -> Dict[str, Any]:
+        if changes:
+            lines = [f"✓ Change request {change_request.number} updated:", ""]
+            lines += [
+                f"{self.FIELD_LABELS[field].capitalize()}: {old} → {new}"
+                for field, (old, new) in changes.items()
+            ]
+            bot_message = "\n".join(lines)
+        else:
+            bot_message = f"{change_request.number} already has those values; nothing was changed."
+
+        return {
+            'bot_message': bot_message,
+            'is_complete': True,
+            'change_request': {
+                'number': change_request.number,
+                'sys_id': change_request.servicenow_sys_id,
+                'id': change_request.id
             }
+        }
+
+
+class ListChangesHandler(BaseHandler):
+    """
+    Handler for listing change requests, newest first, a page at a time
+
+    Pages are fetched with keyset pagination on (created_at, id), so "more"
+    costs the same at any depth. The cursor and filters live in
+    context.collected_data between turns.
+    """
+
+    PAGE_SIZE = 10
+
+    # ServiceNow change states plus the local ones set by the job queue
+    STATES = [
+        'New', 'Pending', 'Assess', 'Authorize', 'Scheduled', 'Implement',
+        'Review', 'Closed', 'Canceled', 'Sync Failed'
+    ]
+    STATE_PATTERN = re.compile(
+        r'\b(' + '|'.join(re.escape(state) for state in sorted(STATES, key=len, reverse=True)) + r')\b',
+        re.IGNORECASE
+    )
+    MORE_PATTERN = re.compile(r'\b(more|next|continue)\b', re.IGNORECASE)
+
+    # Only the columns the reply renders
+    COLUMNS = ('id', 'number', 'short_description', 'state', 'priority', 'created_at')
+
+    def continues(self, context: ConversationContext, message: str) -> bool:
+        """Only "more" pages through a listing; anything else is routed afresh"""
+        return bool(self.MORE_PATTERN.search(message))
+
+    def handle(self, context: ConversationContext, message: str) -> Dict[str, Any]:
+        """Handle list_changes intent"""
+
+        listing = context.collected_data if context.intent == 'list_changes' else {}
+        wants_more = self.continues(context, message)
+
+        if wants_more and 'filters' in listing:
+            if not listing.get('cursor'):
+                return {
+                    'bot_message': "There are no more change requests. Say 'list all' to start over.",
+                    'is_complete': True
+                }
+            filters = listing['filters']
+            cursor = listing['cursor']
+            page = listing.get('page', 1) + 1
+        else:
+            filters = self._parse_filters(message)
+            cursor = None
+            page = 1
+
+        try:
+            rows = self._fetch_page(filters, cursor)
         except Exception as e:
             return {
                 'bot_message': f"Sorry, I encountered an error: {str(e)}",
                 'is_complete': False
             }
 
+        has_more = len(rows) > self.PAGE_SIZE
+        rows = rows[:self.PAGE_SIZE]
+
+        context.intent = 'list_changes'
+        context.required_fields = []
+        context.next_field = None
+        context.collected_data = {
+            'filters': filters,
+            'cursor': [rows[-1]['created_at'].isoformat(), rows[-1]['id']] if has_more else None,
+            'page': page,
+        }
+
+        return {
+            'bot_message': self._render(rows, filters, page, has_more),
+            'is_complete': not has_more,
+            'change_requests': [
+                {'number': row['number'], 'state': row['state'], 'priority': row['priority'], 'id': row['id']}
+                for row in rows
+            ]
+        }
+
+    def _parse_filters(self, message: str) -> Dict[str, str]:
+        """State and priority filters mentioned in the message"""
+        filters = {}
+        state = self.STATE_PATTERN.search(message)
+        if state:
+            filters['state'] = next(name for name in self.STATES if name.lower() == state.group(1).lower())
+        priority = extract_entities(message).get('priority')
+        if priority:
+            filters['priority'] = priority
+        return filters
+
+    def _fetch_page(self, filters: Dict[str, str], cursor: Optional[list]) -> list:
+        """
+        One page plus one row (to tell whether there is a next page)
+
+        Args:
+            filters: Equality filters on indexed columns
+            cursor: [created_at ISO string, id] of the last row shown
+
+        Returns:
+            List of dicts with COLUMNS
+        """
+        queryset = ChangeRequest.objects.filter(**filters)
+        if cursor:
+            created_at = datetime.fromisoformat(cursor[0])
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=cursor[1])
+            )
+        return list(
+            queryset.order_by('-created_at', '-id').values(*self.COLUMNS)[:self.PAGE_SIZE + 1]
+        )
+
+    def _render(self, rows: list, filters: Dict[str, str], page: int, has_more: bool) -> str:
+        described = []
+        if 'state' in filters:
+            described.append(f"state {filters['state']}")
+        if 'priority' in filters:
+            described.append(f"priority {filters['priority']}")
+        scope = f" with {' and '.join(described)}" if described else ""
+
+        if not rows:
+            return f"I couldn't find any change requests{scope}."
+
+        lines = [f"Change requests{scope} (page {page}):", ""]
+        for row in rows:
+            lines.append(
+                f"• {row['number']} - {row['short_description']} "
+                f"[{row['state']}, P{row['priority']}, {row['created_at'].strftime('%Y-%m-%d')}]"
+            )
+        if has_more:
+            lines.extend(["", "Say 'more' to see the next page."])
+        return "\n".join(lines)
+
 
 class HelpHandler(BaseHandler):
     """Handler for help requests"""
 
+    performs_io = False
+
     def handle(self, context: ConversationContext, message: str) -> Dict[str, Any]:
         """Handle help intent"""
 
         help_text = """I can help you with the following:
 
 • Create a change request - Say "create a change request" or "new change"
+  (or all at once: "create a P2 change to patch nginx from 2026-11-01 to 2026-11-02")
 • Check status - Say "check status of CHG0001234"
 • List changes - Say "show all my changes"
 
@@ -239,6 +786,8 @@ What would you like to do?"""
 class GreetingHandler(BaseHandler):
     """Handler for greetings"""
 
+    performs_io = False
+
     def handle(self, context: ConversationContext, message: str) -> Dict[str, Any]:
         """Handle greeting intent"""
 
@@ -253,6 +802,8 @@ class GreetingHandler(BaseHandler):
 class UnknownHandler(BaseHandler):
     """Handler for unknown intents"""
 
+    performs_io = False
+
     def handle(self, context: ConversationContext, message: str) -> Dict[str, Any]:
         """Handle unknown intent"""
 
@@ -267,6 +818,8 @@ class UnknownHandler(BaseHandler):
 HANDLERS = {
     'create_change_request': CreateChangeRequestHandler(),
     'check_status': CheckStatusHandler(),
+    'update_change_request': UpdateChangeRequestHandler(),
+    'list_changes': ListChangesHandler(),
     'help': HelpHandler(),
     'greeting': GreetingHandler(),
     'unknown': UnknownHandler(),
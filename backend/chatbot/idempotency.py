@@ -0,0 +1,369 @@
+"""
+Idempotency-Key support for chat endpoints
+
+A client that retries a POST with the same Idempotency-Key header gets the
+stored response of the first attempt; the handler and the database are not
+touched again. Duplicates that arrive while the first attempt is still
+running wait for its result instead of running the turn a second time.
+
+The store is per process unless CHATBOT_IDEMPOTENCY['CACHE_ALIAS'] names a
+cache shared by all workers; without it, duplicates that reach different
+workers both run.
+"""
+import contextlib
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+NEW = 'new'
+REPLAY = 'replay'
+MISMATCH = 'mismatch'
+IN_FLIGHT = 'in_flight'
+
+
+class IdempotencyStore:
+    """
+    Bounded, TTL-evicted store of responses keyed by idempotency key
+
+    Entries live in an in-process LRU, or in a Django cache (cache_alias)
+    shared by all workers, in which case the cache bounds the size. A
+    shared claim lives for claim_ttl, the longest a turn may run, and is
+    renewed while the turn is held (see hold()); it only lapses if the
+    worker that took it dies. wait_timeout only bounds how long a duplicate
+    waits for the result.
+    """
+
+    KEY_PREFIX = 'chatbot:idempotency:'
+    POLL_INTERVAL = 0.05
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl: float = 86400,
+        wait_timeout: float = 30,
+        claim_ttl: float = 300,
+        cache_alias: Optional[str] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.claim_ttl = claim_ttl
+        self.cache_alias = cache_alias
+        self._entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def begin(self, key: str, fingerprint: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Claim a key, or wait for the attempt that already claimed it
+
+        Args:
+            key: Idempotency key (scoped to the endpoint)
+            fingerprint: Hash of the request body
+
+        Returns:
+            (outcome, entry) tuple; outcome is NEW (caller must complete()
+            or abandon() the key), REPLAY (entry holds the stored response),
+            MISMATCH (key reused with another body) or IN_FLIGHT (the first
+            attempt did not finish within wait_timeout)
+        """
+        deadline = time.monotonic() + self.wait_timeout
+
+        while True:
+            if self.cache_alias:
+                outcome, entry = self._begin_shared(key, fingerprint)
+            else:
+                outcome, entry = self._begin_local(key, fingerprint)
+
+            if outcome != IN_FLIGHT:
+                return outcome, entry
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return IN_FLIGHT, None
+            if self.cache_alias:
+                time.sleep(min(self.POLL_INTERVAL, remaining))
+            else:
+                entry['done'].wait(remaining)
+
+    @contextlib.contextmanager
+    def hold(self, key: str) -> Iterator[None]:
+        """
+        Keep a claimed key from expiring while the turn runs
+
+        Renews the shared claim every claim_ttl / 3 until the block exits.
+        In-process claims never expire while in flight, so there is nothing
+        to renew.
+
+        Args:
+            key: Key claimed by begin()
+        """
+        if not self.cache_alias:
+            yield
+            return
+
+        stopped = threading.Event()
+
+        def renew():
+            while not stopped.wait(self.claim_ttl / 3):
+                caches[self.cache_alias].touch(self.KEY_PREFIX + key, timeout=self.claim_ttl)
+
+        heartbeat = threading.Thread(target=renew, name='idempotency-claim', daemon=True)
+        heartbeat.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            heartbeat.join()
+
+    def complete(self, key: str, fingerprint: str, status_code: int, data: Any) -> None:
+        """Store the response of a claimed key and release waiting duplicates"""
+        if self.cache_alias:
+            caches[self.cache_alias].set(
+                self.KEY_PREFIX + key,
+                {'fingerprint': fingerprint, 'status': status_code, 'data': data},
+                timeout=self.ttl
+            )
+            return
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.update(status=status_code, data=data, expires=time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            self._evict()
+        entry['done'].set()
+
+    def abandon(self, key: str) -> None:
+        """Release a claimed key without a response, so a retry runs again"""
+        if self.cache_alias:
+            caches[self.cache_alias].delete(self.KEY_PREFIX + key)
+            return
+
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry['done'].set()
+
+    def _begin_local(self, key: str, fingerprint: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['expires'] < time.monotonic():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self._entries[key] = {
+                    'fingerprint': fingerprint,
+                    'status': None,
+                    'data': None,
+                    'done': threading.Event(),
+                    # In-flight entries are never evicted by size
+                    'expires': float('inf'),
+                }
+                return NEW, None
+
+            if entry['fingerprint'] != fingerprint:
+                return MISMATCH, None
+            if entry['status'] is not None:
+                self._entries.move_to_end(key)
+                return REPLAY, entry
+            return IN_FLIGHT, entry
+
+    def _begin_shared(self, key: str, fingerprint: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        cache = caches[self.cache_alias]
+        claim = {'fingerprint': fingerprint, 'status': None, 'data': None}
+        # The claim expires on its own if this worker dies mid-turn
+        if cache.add(self.KEY_PREFIX + key, claim, timeout=self.claim_ttl):
+            return NEW, None
+
+        entry = cache.get(self.KEY_PREFIX + key)
+        if entry is None:
+            return IN_FLIGHT, None
+        if entry['fingerprint'] != fingerprint:
+            return MISMATCH, None
+        if entry['status'] is not None:
+            return REPLAY, entry
+        return IN_FLIGHT, entry
+
+    def _evict(self) -> None:
+        """Drop expired and least recently used completed entries"""
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if entry['expires'] < now]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            oldest = next(
+                (key for key, entry in self._entries.items() if entry['status'] is not None),
+                None
+            )
+            if oldest is None:
+                break
+            del self._entries[oldest]
+
+
+def _build_store() -> IdempotencyStore:
+    """Create the process-wide store from CHATBOT_IDEMPOTENCY"""
+    options = getattr(settings, 'CHATBOT_IDEMPOTENCY', {})
+    return IdempotencyStore(
+        max_entries=options.get('MAX_ENTRIES', 10000),
+        ttl=options.get('TTL', 86400),
+        wait_timeout=options.get('WAIT_TIMEOUT', 30),
+        claim_ttl=options.get('CLAIM_TTL', 300),
+        cache_alias=options.get('CACHE_ALIAS')
+    )
+
+
+idempotency_store = _build_store()
+
+
+class IdempotencyClaim:
+    """
+    A claimed key of a request that is running
+
+    The caller runs the request under hold() and then calls finish() with
+    its response, or abandon() if it raised.
+    """
+
+    def __init__(self, key: str, fingerprint: str, store: IdempotencyStore):
+        self.key = key
+        self.fingerprint = fingerprint
+        self.store = store
+
+    def hold(self):
+        return self.store.hold(self.key)
+
+    def finish(self, status_code: int, data: Any) -> None:
+        """Store a response below 500; a server error releases the key so the client can retry"""
+        if status_code < 500:
+            self.store.complete(self.key, self.fingerprint, status_code, data)
+        else:
+            self.store.abandon(self.key)
+
+    def abandon(self) -> None:
+        self.store.abandon(self.key)
+
+
+def claim(path: str, key: str, data: Any) -> Tuple[Optional[Tuple[int, Any, bool]], Optional[IdempotencyClaim]]:
+    """
+    Claim an Idempotency-Key for a request, or answer it without running it
+
+    Blocks while a duplicate is in flight (up to WAIT_TIMEOUT).
+
+    Args:
+        path: Request path; keys are scoped to the endpoint
+        key: Idempotency-Key header value
+        data: Parsed request body
+
+    Returns:
+        (reply, claim) tuple. reply is (status, body, replayed) when the
+        request must not run: the stored response of the first attempt,
+        or an error for a key that is too long, reused with another body
+        or still being processed. Otherwise claim holds the key.
+    """
+    def refuse(status_code: int, detail: str):
+        return (status_code, {'detail': detail}, False), None
+
+    if len(key) > MAX_KEY_LENGTH:
+        return refuse(status.HTTP_400_BAD_REQUEST, f"{HEADER} must be at most {MAX_KEY_LENGTH} characters.")
+
+    scoped_key = f"{path}:{key}"
+    body = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+    fingerprint = hashlib.sha256(body.encode()).hexdigest()
+
+    outcome, entry = idempotency_store.begin(scoped_key, fingerprint)
+    if outcome == REPLAY:
+        return (entry['status'], entry['data'], True), None
+    if outcome == MISMATCH:
+        return refuse(status.HTTP_422_UNPROCESSABLE_ENTITY, f"{HEADER} was already used with a different request body.")
+    if outcome == IN_FLIGHT:
+        return refuse(status.HTTP_409_CONFLICT, f"A request with this {HEADER} is still being processed.")
+    return None, IdempotencyClaim(scoped_key, fingerprint, idempotency_store)
+
+
+def idempotent(view_method):
+    """
+    Make a DRF view method honour the Idempotency-Key header
+
+    Responses below 500 are stored; a server error releases the key so the
+    client can retry.
+    """
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+
+        reply, key_claim = claim(request.path, key, request.data)
+        if reply is not None:
+            status_code, data, replayed = reply
+            response = Response(data, status=status_code)
+            if replayed:
+                response[REPLAYED_HEADER] = 'true'
+            return response
+
+        try:
+            with key_claim.hold():
+                response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            key_claim.abandon()
+            raise
+
+        key_claim.finish(response.status_code, response.data)
+        return response
+
+    return wrapper
+
+
+def aidempotent(view_method):
+    """
+    idempotent() for the async method of a plain Django view returning JsonResponse
+
+    A body that is not JSON goes to the view unclaimed (it answers 400).
+    """
+
+    @functools.wraps(view_method)
+    async def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return await view_method(self, request, *args, **kwargs)
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return await view_method(self, request, *args, **kwargs)
+
+        # Waiting for a duplicate blocks, so it runs off the event loop
+        reply, key_claim = await sync_to_async(claim, thread_sensitive=False)(request.path, key, data)
+        if reply is not None:
+            status_code, body, replayed = reply
+            response = JsonResponse(body, status=status_code, safe=False)
+            if replayed:
+                response[REPLAYED_HEADER] = 'true'
+            return response
+
+        try:
+            with key_claim.hold():
+                response = await view_method(self, request, *args, **kwargs)
+        except Exception:
+            key_claim.abandon()
+            raise
+
+        key_claim.finish(response.status_code, json.loads(response.content))
+        return response
+
+    return wrapper
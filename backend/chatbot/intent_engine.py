@@ -0,0 +1,258 @@
+"""
+Cascading intent engine
+
+Intent stages are configured in settings.CHATBOT_INTENT_ENGINE and run in
+order. Each stage scores the messages that are still undecided; answers at or
+above the stage's threshold are final, the rest fall through to the next
+(more expensive) stage. A message no stage is confident about is 'unknown':
+a guess below its stage's threshold never wins.
+
+The keyword matcher runs first, so most messages never reach the local
+classifier. Further stages (e.g. an external NLU service) subclass
+IntentStage and are added to the settings.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .intents import match_keywords, matching_intents
+
+logger = logging.getLogger(__name__)
+
+Prediction = Tuple[str, float]
+
+
+class IntentStage:
+    """
+    Base class for a cascade stage
+
+    Subclasses implement classify(), scoring a batch of messages with
+    confidences between 0 and 1.
+    """
+
+    name = 'stage'
+
+    def __init__(self, threshold: float = 0.5, name: Optional[str] = None):
+        self.threshold = threshold
+        if name:
+            self.name = name
+        self._lock = threading.Lock()
+        self._messages = 0
+        self._answered = 0
+        self._errors = 0
+        self._seconds = 0.0
+
+    def classify(self, messages: Sequence[str]) -> List[Prediction]:
+        """
+        Score a batch of messages
+
+        Args:
+            messages: Message texts
+
+        Returns:
+            List of (intent, confidence) tuples in input order
+        """
+        raise NotImplementedError("Subclasses must implement classify()")
+
+    def record(self, messages: int, answered: int, seconds: float, error: bool = False) -> None:
+        """Add one classify() call to the stage's counters"""
+        with self._lock:
+            self._messages += messages
+            self._answered += answered
+            self._seconds += seconds
+            self._errors += int(error)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Counters since start-up (per process)
+
+        Returns:
+            Dict with messages seen, answers accepted, hit rate, errors and
+            mean latency per message in microseconds
+        """
+        with self._lock:
+            return {
+                'stage': self.name,
+                'threshold': self.threshold,
+                'messages': self._messages,
+                'answered': self._answered,
+                'hit_rate': self._answered / self._messages if self._messages else 0.0,
+                'errors': self._errors,
+                'mean_latency_us': self._seconds / self._messages * 1e6 if self._messages else 0.0,
+            }
+
+
+class KeywordStage(IntentStage):
+    """
+    Rule-based keyword matcher (chatbot/intents.py)
+
+    Confidence is 1.0 when exactly one rule matches, 0.5 when several rules
+    match and the priority order decided, and 0.0 for no match.
+    """
+
+    name = 'keywords'
+
+    def classify(self, messages: Sequence[str]) -> List[Prediction]:
+        results = []
+        for message in messages:
+            matches = matching_intents(match_keywords(message))
+            if not matches:
+                results.append(('unknown', 0.0))
+            else:
+                results.append((matches[0], 1.0 if len(matches) == 1 else 0.5))
+        return results
+
+
+class ClassifierStage(IntentStage):
+    """
+    Local hashed TF-IDF classifier (chatbot/classifier.py)
+
+    Answers 'unknown' with confidence 0.0 when NumPy or a trained model is
+    missing, so the cascade carries on without it.
+    """
+
+    name = 'classifier'
+
+    def __init__(self, threshold: float = 0.5, name: Optional[str] = None):
+        super().__init__(threshold, name)
+        # Import NumPy at start-up rather than on the first ambiguous message
+        try:
+            from .classifier import get_classifier
+        except ImportError:
+            get_classifier = None
+        self._get_classifier = get_classifier
+
+    def classify(self, messages: Sequence[str]) -> List[Prediction]:
+        classifier = self._get_classifier() if self._get_classifier else None
+        if classifier is None:
+            return [('unknown', 0.0)] * len(messages)
+        return classifier.predict(messages)
+
+
+class IntentEngine:
+    """Ordered cascade of intent stages"""
+
+    def __init__(self, stages: List[IntentStage]):
+        if not stages:
+            raise ValueError("IntentEngine needs at least one stage")
+        self.stages = stages
+
+    def detect(self, message: str, current_intent: Optional[str] = None) -> str:
+        """
+        Detect the intent of one message, keeping the current flow's intent
+
+        Args:
+            message: User's message text
+            current_intent: Current intent in conversation (if any)
+
+        Returns:
+            Detected intent string
+        """
+        return self.detect_many([message], [current_intent])[0]
+
+    def detect_many(
+        self,
+        messages: Sequence[str],
+        current_intents: Optional[Sequence[Optional[str]]] = None
+    ) -> List[str]:
+        """
+        Detect intents for a batch of messages
+
+        A message in an ongoing flow keeps its current intent unless the user
+        explicitly wants to do something else; no stage runs for it.
+
+        Args:
+            messages: Message texts
+            current_intents: Current intent per message (or None)
+
+        Returns:
+            Intent per message in input order
+        """
+        if current_intents is None:
+            current_intents = [None] * len(messages)
+
+        intents: List[Optional[str]] = [None] * len(messages)
+        pending = []
+        for index, (message, current_intent) in enumerate(zip(messages, current_intents)):
+            if current_intent and 'switch' not in match_keywords(message):
+                intents[index] = current_intent
+            else:
+                pending.append(index)
+
+        for index, (intent, _) in zip(pending, self.classify([messages[i] for i in pending])):
+            intents[index] = intent
+        return intents
+
+    def classify(self, messages: Sequence[str]) -> List[Prediction]:
+        """
+        Run the cascade over messages without conversation state
+
+        Args:
+            messages: Message texts
+
+        Returns:
+            List of (intent, confidence) tuples in input order;
+            ('unknown', 0.0) where no stage reached its threshold
+        """
+        best: List[Prediction] = [('unknown', 0.0)] * len(messages)
+        pending = list(range(len(messages)))
+
+        for stage in self.stages:
+            if not pending:
+                break
+
+            started = time.perf_counter()
+            try:
+                predictions = stage.classify([messages[i] for i in pending])
+            except Exception:
+                stage.record(len(pending), 0, time.perf_counter() - started, error=True)
+                logger.exception("Intent stage %s failed", stage.name)
+                continue
+
+            undecided = []
+            for index, (intent, confidence) in zip(pending, predictions):
+                if confidence >= stage.threshold:
+                    best[index] = (intent, confidence)
+                else:
+                    undecided.append(index)
+            stage.record(len(pending), len(pending) - len(undecided), time.perf_counter() - started)
+            pending = undecided
+
+        return best
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-stage counters, in cascade order"""
+        return [stage.stats() for stage in self.stages]
+
+
+DEFAULT_STAGES = [
+    {'BACKEND': 'chatbot.intent_engine.KeywordStage', 'THRESHOLD': 0.5},
+]
+
+
+def build_engine(stage_settings: Optional[List[Dict[str, Any]]] = None) -> IntentEngine:
+    """
+    Create an engine from stage settings
+
+    Args:
+        stage_settings: List of dicts with BACKEND (dotted path), THRESHOLD
+            and optional OPTIONS passed to the stage constructor; defaults to
+            CHATBOT_INTENT_ENGINE['STAGES']
+
+    Returns:
+        IntentEngine
+    """
+    if stage_settings is None:
+        stage_settings = getattr(settings, 'CHATBOT_INTENT_ENGINE', {}).get('STAGES', DEFAULT_STAGES)
+
+    stages = []
+    for stage in stage_settings:
+        stage_class = import_string(stage['BACKEND'])
+        stages.append(stage_class(threshold=stage.get('THRESHOLD', 0.5), **stage.get('OPTIONS', {})))
+    return IntentEngine(stages)
+
+
+intent_engine = build_engine()
@@ -2,6 +2,137 @@
 Intent detection module - Phase 1: Rule-based keyword matching
 This will be replaced with AI/NLU in Phase 2
 """
+import string
+from typing import Dict, FrozenSet, List, Tuple
+
+# Keyword groups. Keywords are matched case-insensitively as whole words or
+# phrases, so "cr" does not match inside "describe" nor "hi" inside "this".
+# Digits and punctuation separate words ("chg" matches "CHG0001234").
+KEYWORDS: Dict[str, List[str]] = {
+    'create_verb': ['create', 'new', 'make', 'add', 'start'],
+    'create_object': ['change', 'ticket', 'request', 'cr'],
+    'status_verb': ['status', 'check', 'show', 'find', 'lookup', 'search'],
+    'status_object': ['change', 'ticket', 'request', 'chg', 'lchg'],
+    'update_verb': ['update', 'modify', 'edit', 'change'],
+    'update_object': ['change', 'ticket', 'request'],
+    'list': ['list', 'all', 'show all', 'my changes'],
+    'help': ['help', 'what can you do', 'commands', 'how to'],
+    'greeting': ['hello', 'hi', 'hey', 'good morning', 'good afternoon'],
+    # User wants to leave the current flow
+    'switch': [
+        'cancel',
+        'stop',
+        'nevermind',
+        'never mind',
+        'forget it',
+        'start over',
+        'restart',
+        'i want to',
+        'instead',
+    ],
+}
+
+# Intents in priority order with the keyword groups that must all be present
+INTENT_RULES: List[Tuple[str, Tuple[str, ...]]] = [
+    ('create_change_request', ('create_verb', 'create_object')),
+    ('check_status', ('status_verb', 'status_object')),
+    ('update_change_request', ('update_verb', 'update_object')),
+    ('list_changes', ('list',)),
+    ('help', ('help',)),
+    ('greeting', ('greeting',)),
+]
+
+
+def _compile_keywords(keywords: Dict[str, List[str]]):
+    """
+    Compile the keyword tables into lookup structures for match_keywords()
+
+    Returns:
+        (groups by single-word keyword, phrases by first word) tuple; a
+        phrase entry is (padded phrase, groups)
+    """
+    groups: Dict[str, set] = {}
+    for group, words in keywords.items():
+        for word in words:
+            groups.setdefault(word, set()).add(group)
+
+    words = {}
+    phrases = {}
+    for word, names in groups.items():
+        if ' ' in word:
+            phrases.setdefault(word.split()[0], []).append((f" {word} ", frozenset(names)))
+        else:
+            words[word] = frozenset(names)
+    return words, phrases
+
+
+_WORD_GROUPS, _PHRASES_BY_FIRST_WORD = _compile_keywords(KEYWORDS)
+# Words worth looking at: single-word keywords and first words of phrases
+_INDEX = frozenset(_WORD_GROUPS) | frozenset(_PHRASES_BY_FIRST_WORD)
+_SEPARATORS = str.maketrans({char: ' ' for char in string.punctuation + string.digits})
+
+
+def match_keywords(message: str) -> FrozenSet[str]:
+    """
+    Find every keyword group present in a message in a single pass
+
+    The message is split into words once and intersected with the keyword
+    index; only phrases whose first word occurs are tested against the
+    normalized text. All per-character work happens in C.
+
+    Args:
+        message: User's message text
+
+    Returns:
+        Names of the keyword groups that matched
+    """
+    tokens = message.lower().translate(_SEPARATORS).split()
+
+    hits = set()
+    text = None
+    for word in _INDEX.intersection(tokens):
+        if word in _WORD_GROUPS:
+            hits |= _WORD_GROUPS[word]
+        for phrase, groups in _PHRASES_BY_FIRST_WORD.get(word, ()):
+            if text is None:
+                text = f" {' '.join(tokens)} "
+            if phrase in text:
+                hits |= groups
+
+    return frozenset(hits)
+
+
+def resolve_intent(hits: FrozenSet[str]) -> str:
+    """
+    Pick the intent for a set of keyword group hits
+
+    Args:
+        hits: Result of match_keywords()
+
+    Returns:
+        Intent string
+    """
+    matches = matching_intents(hits)
+    return matches[0] if matches else 'unknown'
+
+
+def matching_intents(hits: FrozenSet[str]) -> List[str]:
+    """
+    Every intent whose rule is satisfied by a set of keyword group hits
+
+    More than one match means the priority order in INTENT_RULES decided,
+    e.g. "change" counts both as an object and as an update verb.
+
+    Args:
+        hits: Result of match_keywords()
+
+    Returns:
+        Intents in priority order
+    """
+    return [
+        intent for intent, required in INTENT_RULES
+        if all(group in hits for group in required)
+    ]
 
 
 def detect_intent(message: str, current_intent: str = None) -> str:
@@ -15,42 +146,46 @@ def detect_intent(message: str, current_intent: str = None) -> str:
     Returns:
         Detected intent string
     """
+    hits = match_keywords(message)
+
     # If we're already in a conversation flow, maintain that intent
     # unless the user explicitly wants to do something else
-    if current_intent and not _wants_to_change_intent(message):
+    if current_intent and 'switch' not in hits:
         return current_intent
 
-    message_lower = message.lower()
+    return resolve_intent(hits)
 
-    # Create change request
-    if any(word in message_lower for word in ['create', 'new', 'make', 'add', 'start']):
-        if any(word in message_lower for word in ['change', 'ticket', 'request', 'cr']):
-            return 'create_change_request'
 
-    # Check status
-    if any(word in message_lower for word in ['status', 'check', 'show', 'find', 'lookup', 'search']):
-        if any(word in message_lower for word in ['change', 'ticket', 'request', 'chg']):
-            return 'check_status'
+def detect_intents(messages: List[str]) -> List[Tuple[str, float]]:
+    """
+    Classify a batch of messages, without conversation state
 
-    # Update change request
-    if any(word in message_lower for word in ['update', 'modify', 'edit', 'change']):
-        if any(word in message_lower for word in ['change', 'ticket', 'request']):
-            return 'update_change_request'
+    Uses the trained local classifier (chatbot/classifier.py) when NumPy is
+    installed and a model exists, scoring the whole batch at once; otherwise
+    falls back to the keyword rules with confidence 1.0 for a match and 0.0
+    for 'unknown'.
 
-    # List changes
-    if any(word in message_lower for word in ['list', 'all', 'show all', 'my changes']):
-        return 'list_changes'
+    Args:
+        messages: Message texts
 
-    # Help
-    if any(word in message_lower for word in ['help', 'what can you do', 'commands', 'how to']):
-        return 'help'
+    Returns:
+        List of (intent, confidence) tuples in input order
+    """
+    try:
+        from .classifier import get_classifier
+    except ImportError:
+        classifier = None
+    else:
+        classifier = get_classifier()
 
-    # Greeting
-    if any(word in message_lower for word in ['hello', 'hi', 'hey', 'good morning', 'good afternoon']):
-        return 'greeting'
+    if classifier is not None:
+        return classifier.predict(messages)
 
-    # Default
-    return 'unknown'
+    results = []
+    for message in messages:
+        intent = resolve_intent(match_keywords(message))
+        results.append((intent, 0.0 if intent == 'unknown' else 1.0))
+    return results
 
 
 def _wants_to_change_intent(message: str) -> bool:
@@ -63,22 +198,7 @@ def _wants_to_change_intent(message: str) -> bool:
     Returns:
         True if user wants to change intent
     """
-    message_lower = message.lower()
-
-    # Check for explicit intent change keywords
-    change_keywords = [
-        'cancel',
-        'stop',
-        'nevermind',
-        'never mind',
-        'forget it',
-        'start over',
-        'restart',
-        'i want to',
-        'instead',
-    ]
-
-    return any(keyword in message_lower for keyword in change_keywords)
+    return 'switch' in match_keywords(message)
 
 
 def get_intent_description(intent: str) -> str:
@@ -0,0 +1,114 @@
+"""
+Compare the WSGI and ASGI chat endpoints on the final create turn
+"""
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from chatbot.models import Conversation, ConversationContext
+from integrations.models import ChangeRequest
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark POST /api/chat/message/ (WSGI) against "
+        "/api/chat/message/async/ (ASGI) on the final create turn, which "
+        "saves the change request and queues the ServiceNow call. "
+        "Writes to the configured database and removes its rows afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turns', type=int, default=200, help='Turns per endpoint')
+        parser.add_argument('--concurrency', type=int, default=50, help='Turns in flight at once')
+        parser.add_argument('--wsgi-threads', type=int, default=4, help='Worker threads serving the WSGI path')
+
+    def handle(self, *args, **options):
+        # The test clients send requests for host 'testserver'
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            wsgi = self._run_wsgi(self._prepare(options['turns']), options)
+            asgi = self._run_asgi(self._prepare(options['turns']), options)
+
+        self._cleanup()
+        self._report('WSGI', wsgi)
+        self._report('ASGI', asgi)
+
+    def _prepare(self, turns):
+        """Create conversations that are one answer away from creating a CR"""
+        conversations = Conversation.objects.bulk_create(
+            [Conversation(status='active') for _ in range(turns)]
+        )
+        ConversationContext.objects.bulk_create([
+            ConversationContext(
+                conversation=conversation,
+                intent='create_change_request',
+                collected_data={
+                    'short_description': 'benchmark',
+                    'description': 'benchmark_chat run',
+                    'priority': '3',
+                    'planned_start_date': '2026-01-01',
+                },
+                required_fields=['planned_end_date'],
+                next_field='planned_end_date'
+            )
+            for conversation in conversations
+        ])
+        return [str(conversation.id) for conversation in conversations]
+
+    def _payload(self, conversation_id):
+        return {'conversation_id': conversation_id, 'message': '2026-01-02'}
+
+    def _run_wsgi(self, conversation_ids, options):
+        def turn(conversation_id):
+            started = time.perf_counter()
+            response = Client().post('/api/chat/message/', self._payload(conversation_id), content_type='application/json')
+            connections.close_all()
+            return time.perf_counter() - started, response.status_code
+
+        # Offered load is --concurrency; a WSGI deployment only serves as
+        # many turns at once as it has worker threads.
+        threads = min(options['wsgi_threads'], options['concurrency'])
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(turn, conversation_ids))
+        return results, time.perf_counter() - started
+
+    def _run_asgi(self, conversation_ids, options):
+        async def run():
+            client = AsyncClient()
+            limit = asyncio.Semaphore(options['concurrency'])
+
+            async def turn(conversation_id):
+                async with limit:
+                    started = time.perf_counter()
+                    response = await client.post(
+                        '/api/chat/message/async/', self._payload(conversation_id), content_type='application/json'
+                    )
+                    return time.perf_counter() - started, response.status_code
+
+            return await asyncio.gather(*(turn(conversation_id) for conversation_id in conversation_ids))
+
+        started = time.perf_counter()
+        results = asyncio.run(run())
+        return results, time.perf_counter() - started
+
+    def _cleanup(self):
+        Conversation.objects.filter(context__collected_data__description='benchmark_chat run').delete()
+        ChangeRequest.objects.filter(description='benchmark_chat run').delete()
+
+    def _report(self, label, outcome):
+        results, elapsed = outcome
+        durations = sorted(duration for duration, _ in results)
+        errors = sum(1 for _, status_code in results if status_code != 200)
+        p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))]
+        self.stdout.write(
+            f"{label}: {len(results)} turns in {elapsed:.2f}s "
+            f"({len(results) / elapsed:.1f} turns/s), "
+            f"p50 {statistics.median(durations) * 1000:.1f} ms, "
+            f"p99 {p99 * 1000:.1f} ms, errors {errors}"
+        )
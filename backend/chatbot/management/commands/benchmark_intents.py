@@ -0,0 +1,124 @@
+"""
+Measure per-message cost of intent detection across message lengths
+"""
+import random
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from chatbot.intent_engine import build_engine
+from chatbot.intents import detect_intent
+
+
+def legacy_detect_intent(message: str, current_intent: str = None) -> str:
+    """The previous any()-over-lists substring implementation, for comparison"""
+    if current_intent and not legacy_wants_to_change_intent(message):
+        return current_intent
+
+    message_lower = message.lower()
+
+    if any(word in message_lower for word in ['create', 'new', 'make', 'add', 'start']):
+        if any(word in message_lower for word in ['change', 'ticket', 'request', 'cr']):
+            return 'create_change_request'
+    if any(word in message_lower for word in ['status', 'check', 'show', 'find', 'lookup', 'search']):
+        if any(word in message_lower for word in ['change', 'ticket', 'request', 'chg']):
+            return 'check_status'
+    if any(word in message_lower for word in ['update', 'modify', 'edit', 'change']):
+        if any(word in message_lower for word in ['change', 'ticket', 'request']):
+            return 'update_change_request'
+    if any(word in message_lower for word in ['list', 'all', 'show all', 'my changes']):
+        return 'list_changes'
+    if any(word in message_lower for word in ['help', 'what can you do', 'commands', 'how to']):
+        return 'help'
+    if any(word in message_lower for word in ['hello', 'hi', 'hey', 'good morning', 'good afternoon']):
+        return 'greeting'
+    return 'unknown'
+
+
+def legacy_wants_to_change_intent(message: str) -> bool:
+    message_lower = message.lower()
+    change_keywords = [
+        'cancel', 'stop', 'nevermind', 'never mind', 'forget it',
+        'start over', 'restart', 'i want to', 'instead',
+    ]
+    return any(keyword in message_lower for keyword in change_keywords)
+
+
+# Filler without any keyword, so both implementations scan the whole message
+FILLER = (
+    'the deployment of version three needs a database migration '
+    'plus cache warmup before traffic moves over to the green pool'
+).split()
+
+
+class Command(BaseCommand):
+    help = "Compare detect_intent() against the previous substring implementation"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lengths', default='20,100,500,2000', help='Message lengths in characters')
+        parser.add_argument('--number', type=int, default=2000, help='Calls per measurement')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--cascade',
+            action='store_true',
+            help='Also run the configured intent engine and print per-stage counters'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        number = options['number']
+
+        self.stdout.write(f"{'length':>7} {'case':<10} {'legacy us':>10} {'compiled us':>12} {'speedup':>8}")
+        for length in [int(value) for value in options['lengths'].split(',')]:
+            filler = self._filler(rng, length)
+            cases = [
+                # No keyword: every table is scanned to the end
+                ('miss', filler, None),
+                # Keywords at the end of a long message
+                ('late hit', (filler + ' please create a change request')[-length:], None),
+                # Field answer inside a flow: only the switch keywords matter
+                ('in flow', filler, 'create_change_request'),
+            ]
+            for label, message, current_intent in cases:
+                legacy = self._time(legacy_detect_intent, message, current_intent, number)
+                compiled = self._time(detect_intent, message, current_intent, number)
+                self.stdout.write(
+                    f"{length:>7} {label:<10} {legacy:>10.2f} {compiled:>12.2f} {legacy / compiled:>7.1f}x"
+                )
+
+        if options['cascade']:
+            self._cascade(rng, number)
+
+    def _cascade(self, rng, number):
+        """Classify a mix of clear, ambiguous and keyword-free messages"""
+        messages = [
+            rng.choice([
+                'create a new ticket',
+                'check status of CHG0001234',
+                'hello',
+                'create a change request',
+                self._filler(rng, 60),
+            ])
+            for _ in range(number)
+        ]
+        engine = build_engine()
+        engine.classify(messages)
+
+        self.stdout.write('')
+        self.stdout.write(f"{'stage':<14} {'threshold':>9} {'messages':>9} {'hit rate':>9} {'errors':>7} {'us/msg':>8}")
+        for stats in engine.stats():
+            self.stdout.write(
+                f"{stats['stage']:<14} {stats['threshold']:>9.2f} {stats['messages']:>9} "
+                f"{stats['hit_rate']:>9.1%} {stats['errors']:>7} {stats['mean_latency_us']:>8.2f}"
+            )
+
+    def _filler(self, rng, length):
+        words = []
+        while sum(len(word) + 1 for word in words) < length:
+            words.append(rng.choice(FILLER))
+        return ' '.join(words)[:length]
+
+    def _time(self, func, message, current_intent, number):
+        """Best of three runs, in microseconds per call"""
+        timer = timeit.Timer(lambda: func(message, current_intent))
+        return min(timer.repeat(repeat=3, number=number)) / number * 1e6
@@ -0,0 +1,99 @@
+"""
+Train the local intent classifier from stored user messages
+
+Stored messages are labelled by the keyword rules, so without --labels the
+model mostly learns to agree with KeywordStage, which runs before it. Pass a
+CSV of hand-labelled examples (especially messages the rules get wrong or
+miss) to make the classifier stage worth running.
+"""
+import csv
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.classifier import DEFAULT_FEATURES, IntentClassifier, reset_classifier, training_examples
+from chatbot.models import Message
+
+
+class Command(BaseCommand):
+    help = (
+        "Train the hashed TF-IDF intent classifier on user messages, labelled by "
+        "the keyword rules, plus optional hand-labelled examples"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=settings.CHATBOT_INTENT_MODEL['PATH'],
+            help='Artifact directory (default: CHATBOT_INTENT_MODEL PATH)'
+        )
+        parser.add_argument(
+            '--labels',
+            help='CSV file of text,intent rows added to (and overriding) the stored messages'
+        )
+        parser.add_argument('--limit', type=int, help='Use at most this many recent messages')
+        parser.add_argument('--features', type=int, default=DEFAULT_FEATURES, help='Hash buckets')
+        parser.add_argument('--epochs', type=int, default=30)
+        parser.add_argument('--holdout', type=float, default=0.1, help='Share kept back for evaluation')
+
+    def handle(self, *args, **options):
+        messages = (
+            Message.objects
+            .filter(sender='user')
+            .order_by('-timestamp')
+            .values_list('text', flat=True)
+        )
+        if options['limit']:
+            messages = messages[:options['limit']]
+        texts, labels = training_examples(messages.iterator(chunk_size=2000))
+
+        if options['labels']:
+            curated = self._read_labels(options['labels'])
+            keep = [i for i, text in enumerate(texts) if text not in curated]
+            texts = [texts[i] for i in keep] + list(curated)
+            labels = [labels[i] for i in keep] + list(curated.values())
+        else:
+            self.stderr.write(self.style.WARNING(
+                "No --labels given: every example is labelled by the keyword rules, "
+                "so the model will mostly repeat the keyword stage."
+            ))
+
+        if not texts:
+            raise CommandError("No user messages to train on.")
+
+        examples = list(zip(texts, labels))
+        random.Random(0).shuffle(examples)
+        texts = [text for text, _ in examples]
+        labels = [label for _, label in examples]
+
+        split = int(len(texts) * (1 - options['holdout'])) if len(texts) > 10 else len(texts)
+        started = time.perf_counter()
+        classifier = IntentClassifier.train(
+            texts[:split],
+            labels[:split],
+            n_features=options['features'],
+            epochs=options['epochs']
+        )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"Trained on {split} messages, {len(classifier.labels)} intents, in {elapsed:.1f}s"
+        )
+        if split < len(texts):
+            predicted = classifier.predict(texts[split:])
+            correct = sum(intent == label for (intent, _), label in zip(predicted, labels[split:]))
+            self.stdout.write(f"Holdout agreement: {correct}/{len(texts) - split}")
+
+        version = classifier.save(options['output'])
+        reset_classifier()
+        self.stdout.write(self.style.SUCCESS(f"Saved model to {version}; {options['output']} now points to it"))
+
+    def _read_labels(self, path):
+        with open(path, newline='') as handle:
+            return {
+                row[0].strip(): row[1].strip()
+                for row in csv.reader(handle)
+                if len(row) >= 2 and row[0].strip()
+            }
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:19
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='message',
+            options={'ordering': ['timestamp', 'id'], 'verbose_name': 'Message', 'verbose_name_plural': 'Messages'},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0002_message_ordering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationcontext',
+            name='version',
+            field=models.PositiveIntegerField(default=0, help_text='Incremented on every write; guards cached copies against lost updates'),
+        ),
+    ]
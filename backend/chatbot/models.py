@@ -29,6 +29,13 @@ class Conversation(models.Model):
         ordering = ['-updated_at']
         verbose_name = 'Conversation'
         verbose_name_plural = 'Conversations'
+        indexes = [
+            # Conversation list pages (keyset on updated_at, id), unfiltered
+            # and filtered by status or user
+            models.Index(fields=['-updated_at', '-id'], name='conversation_recent_idx'),
+            models.Index(fields=['status', '-updated_at', '-id'], name='conversation_status_idx'),
+            models.Index(fields=['user', '-updated_at', '-id'], name='conversation_user_idx'),
+        ]
 
     def __str__(self):
         return f"Conversation {self.id} - {self.status}"
@@ -52,7 +59,7 @@ class Message(models.Model):
     metadata = models.JSONField(null=True, blank=True, help_text="For rich content")
 
     class Meta:
-        ordering = ['timestamp']
+        ordering = ['timestamp', 'id']
         verbose_name = 'Message'
         verbose_name_plural = 'Messages'
 
@@ -77,6 +84,10 @@ class ConversationContext(models.Model):
         blank=True,
         on_delete=models.SET_NULL
     )
+    version = models.PositiveIntegerField(
+        default=0,
+        help_text="Incremented on every write; guards cached copies against lost updates"
+    )
 
     class Meta:
         verbose_name = 'Conversation Context'
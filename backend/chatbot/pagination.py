@@ -0,0 +1,101 @@
+"""
+Keyset pagination for conversation listings
+
+Pages are read newest first by (updated_at, id): the cursor is the last row
+of the previous page, and the next page is the rows strictly after it. The
+cost of a page does not depend on how deep it is, and no row is repeated
+within one pass (a conversation updated meanwhile moves to the front, for
+the next pass). DRF's CursorPagination keys on one field plus an offset,
+which degrades on ties; this one keys on both.
+"""
+import base64
+import json
+import uuid
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class UpdatedAtCursorPagination(BasePagination):
+    """
+    ?cursor=<opaque>&page_size=N over (-updated_at, -id)
+
+    Response: {"next": url or null, "results": [...]}
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        queryset = queryset.order_by('-updated_at', '-id')
+        if position is not None:
+            updated_at, pk = position
+            queryset = queryset.filter(Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=pk))
+
+        # One extra row says whether there is a next page
+        rows = list(queryset[:self.page_size_value + 1])
+        self.has_next = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+        self.last = rows[-1] if rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last))
+
+    @staticmethod
+    def encode_cursor(row) -> str:
+        position = json.dumps([row.updated_at.isoformat(), str(row.pk)])
+        return base64.urlsafe_b64encode(position.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        """(updated_at, id) of the cursor, None on the first page"""
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            updated_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            updated_at = parse_datetime(updated_at)
+            pk = uuid.UUID(pk)
+        except (TypeError, ValueError, AttributeError):
+            raise NotFound("Invalid cursor")
+        if updated_at is None:
+            raise NotFound("Invalid cursor")
+        return updated_at, pk
@@ -37,12 +37,47 @@ class ConversationSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'started_at', 'updated_at']
 
 
+class ConversationSummarySerializer(serializers.ModelSerializer):
+    """Conversation list row: no messages, intent from the context"""
+    intent = serializers.CharField(source='context.intent', read_only=True, default=None)
+
+    class Meta:
+        model = Conversation
+        fields = ['id', 'status', 'user', 'started_at', 'updated_at', 'intent']
+        read_only_fields = fields
+
+
 class ChatMessageRequestSerializer(serializers.Serializer):
     """Serializer for incoming chat message requests"""
     conversation_id = serializers.UUIDField(required=False, allow_null=True)
     message = serializers.CharField(required=True, max_length=2000)
 
 
+class BatchChatMessageItemSerializer(ChatMessageRequestSerializer):
+    """Serializer for one item of a batch chat request"""
+    conversation_ref = serializers.CharField(
+        required=False,
+        max_length=100,
+        help_text="Client label; items with the same label share one new conversation"
+    )
+
+    def validate(self, attrs):
+        if attrs.get('conversation_id') and attrs.get('conversation_ref'):
+            raise serializers.ValidationError("Give either conversation_id or conversation_ref, not both.")
+        return attrs
+
+
+class BatchChatMessageRequestSerializer(serializers.Serializer):
+    """Serializer for batch chat message requests"""
+    MAX_ITEMS = 100
+
+    # Items are validated one by one so a bad item fails alone
+    items = serializers.ListField(
+        allow_empty=False,
+        max_length=MAX_ITEMS
+    )
+
+
 class ChatMessageResponseSerializer(serializers.Serializer):
     """Serializer for chat message responses"""
     conversation_id = serializers.UUIDField()
@@ -1,3 +1,685 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+import time
+import unittest
+import uuid
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from integrations.models import ChangeRequest, IntegrationJob
+from .context_manager import ContextCache, ConversationManager, StaleContextError, context_cache
+from .entities import extract_entities
+from .handlers import CreateChangeRequestHandler
+from .idempotency import IN_FLIGHT, NEW, IdempotencyStore
+from .intent_engine import IntentEngine, IntentStage, KeywordStage
+from .intents import match_keywords, resolve_intent
+from .models import Conversation, ConversationContext, Message
+
+
+def conversation_awaiting(field: str, collected: dict, intent: str = 'create_change_request') -> Conversation:
+    """A conversation whose flow is waiting for one more field"""
+    conversation = Conversation.objects.create(status='active')
+    ConversationContext.objects.create(
+        conversation=conversation,
+        intent=intent,
+        collected_data=collected,
+        required_fields=[field],
+        next_field=field
+    )
+    return conversation
+
+
+CHANGE_FIELDS = {
+    'short_description': 'Patch nginx',
+    'description': 'Roll out the nginx security patch',
+    'priority': '2',
+    'planned_start_date': '2026-11-01',
+}
+
+
+class BatchChatMessageViewTests(TestCase):
+    """POST /api/chat/messages/batch/"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('chatbot:chat-message-batch')
+
+    def test_invalid_item_fails_alone(self):
+        response = self.client.post(self.url, {'items': [
+            {'message': 'x' * 2001},
+            {'message': 'hello'},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['succeeded'], 1)
+        self.assertEqual(response.data['failed'], 1)
+        first, second = response.data['results']
+        self.assertEqual(first['status'], 'error')
+        self.assertIn('message', first['errors'])
+        self.assertEqual(second['status'], 'ok')
+        self.assertEqual(list(Message.objects.filter(sender='user').values_list('text', flat=True)), ['hello'])
+
+    def test_invalid_conversation_id_is_not_loaded(self):
+        response = self.client.post(self.url, {'items': [
+            {'conversation_id': 'bad', 'message': ''},
+            {'message': 'hello'},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.data['results']], ['error', 'ok'])
+        self.assertEqual(Conversation.objects.count(), 1)
+
+
+class ChatMessageViewTests(TestCase):
+    """POST /api/chat/message/ and the turn pipeline behind it"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('chatbot:chat-message')
+
+    def test_turn_stays_within_its_query_budget(self):
+        conversation = conversation_awaiting('priority', {'short_description': 'Patch nginx'})
+        result = {'bot_message': 'Noted.'}
+
+        with transaction.atomic():
+            # SELECT, conversation UPDATE, context UPDATE, message INSERT
+            with self.assertNumQueries(4):
+                conversation, context = ConversationManager.load_turn(str(conversation.id), use_cache=False)
+                context.collected_data['priority'] = '2'
+                ConversationManager.save_turn(conversation, context, 'P2', result)
+
+        context.refresh_from_db()
+        self.assertEqual((context.version, context.collected_data['priority']), (1, '2'))
+        self.assertEqual(Message.objects.filter(conversation=conversation).count(), 2)
+
+    @unittest.skipIf(context_cache is None, "Context cache is disabled")
+    def test_stale_cached_context_is_retried_from_the_database(self):
+        conversation = conversation_awaiting('planned_end_date', CHANGE_FIELDS)
+        self.addCleanup(ConversationManager.invalidate, conversation.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            context_cache.put(conversation, conversation.context)
+        # Another worker moves the row on behind the cache's back
+        ConversationContext.objects.filter(conversation=conversation).update(version=5)
+
+        response = self.client.post(
+            self.url,
+            {'conversation_id': str(conversation.id), 'message': '2026-11-02'},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_complete'])
+        self.assertEqual(ConversationContext.objects.get(conversation=conversation).version, 6)
+        self.assertEqual(ChangeRequest.objects.count(), 1)
+        self.assertEqual(IntegrationJob.objects.count(), 1)
+        self.assertEqual(Message.objects.filter(conversation=conversation).count(), 2)
+
+
+class ContextCacheTests(TestCase):
+    """ContextCache with the in-process store"""
+
+    def cache_turn(self, cache: ContextCache, conversation: Conversation, dirty: bool = False) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            cache.put(conversation, conversation.context, dirty=dirty)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ContextCache(max_entries=2)
+        first, second, third = (conversation_awaiting('priority', {}) for _ in range(3))
+        self.cache_turn(cache, first)
+        self.cache_turn(cache, second)
+        self.assertIsNotNone(cache.get(first.id))
+
+        self.cache_turn(cache, third)
+
+        self.assertIsNone(cache.get(second.id))
+        self.assertEqual(cache.get(first.id)[1].pk, first.context.pk)
+
+    def test_idle_entry_expires(self):
+        cache = ContextCache(idle_ttl=0)
+        conversation = conversation_awaiting('priority', {})
+        self.cache_turn(cache, conversation)
+
+        time.sleep(0.01)
+        self.assertIsNone(cache.get(conversation.id))
+
+    def test_flush_writes_dirty_contexts_with_a_version_check(self):
+        cache = ContextCache(flush_interval=3600)
+        kept, conflicting = conversation_awaiting('priority', {}), conversation_awaiting('priority', {})
+        for conversation in (kept, conflicting):
+            conversation.context.collected_data = {'priority': '1'}
+            self.cache_turn(cache, conversation, dirty=True)
+        ConversationContext.objects.filter(conversation=conflicting).update(version=7)
+
+        with self.assertLogs('chatbot.context_manager', 'WARNING'):
+            self.assertEqual(cache.flush(), 1)
+
+        self.assertEqual(ConversationContext.objects.get(conversation=kept).collected_data, {'priority': '1'})
+        self.assertEqual(ConversationContext.objects.get(conversation=conflicting).collected_data, {})
+        self.assertIsNone(cache.get(conflicting.id))
+        self.assertEqual(cache.get(kept.id)[1].version, 1)
+
+
+class ListChangesTests(TestCase):
+    """The list_changes intent over POST /api/chat/message/"""
+
+    def setUp(self):
+        self.client = APIClient()
+        for index in range(12):
+            ChangeRequest.objects.create(
+                servicenow_sys_id=f"{index:032d}",
+                number=f"CHG{index:07d}",
+                short_description=f"Change {index}",
+                state='Closed' if index % 3 == 0 else 'New',
+                priority='3'
+            )
+
+    def say(self, message: str, conversation_id: str = None) -> dict:
+        payload = {'message': message}
+        if conversation_id:
+            payload['conversation_id'] = conversation_id
+        response = self.client.post(reverse('chatbot:chat-message'), payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_more_with_punctuation_pages_on(self):
+        first = self.say("list all changes")
+        self.assertEqual(first['collected_data']['page'], 1)
+        self.assertFalse(first['is_complete'])
+
+        second = self.say("more?", first['conversation_id'])
+        self.assertEqual(second['intent'], 'list_changes')
+        self.assertEqual(second['collected_data']['page'], 2)
+        self.assertIn('CHG0000001', second['bot_message'])
+        self.assertTrue(second['is_complete'])
+
+        third = self.say("next,", first['conversation_id'])
+        self.assertIn("no more change requests", third['bot_message'])
+
+    def test_other_intent_after_a_listing_is_not_a_listing(self):
+        first = self.say("list all changes")
+
+        reply = self.say("create a new change request", first['conversation_id'])
+
+        self.assertEqual(reply['intent'], 'create_change_request')
+        self.assertEqual(reply['next_field'], 'short_description')
+
+    def test_new_filters_start_a_new_listing(self):
+        first = self.say("list all changes")
+
+        reply = self.say("list all closed changes", first['conversation_id'])
+
+        self.assertEqual(reply['collected_data']['filters'], {'state': 'Closed'})
+        self.assertEqual(reply['collected_data']['page'], 1)
+        self.assertTrue(reply['is_complete'])
+
+
+class UpdateChangeRequestTests(TestCase):
+    """The update_change_request intent over POST /api/chat/message/"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.change_request = ChangeRequest.objects.create(
+            servicenow_sys_id='0' * 32,
+            number='CHG0000012',
+            short_description='Patch nginx',
+            description='Roll out the nginx security patch',
+            priority='3',
+            state='New'
+        )
+
+    def say(self, message: str, conversation_id: str = None) -> dict:
+        payload = {'message': message}
+        if conversation_id:
+            payload['conversation_id'] = conversation_id
+        response = self.client.post(reverse('chatbot:chat-message'), payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_only_a_bare_done_word_saves(self):
+        first = self.say("update change request CHG0000012")
+        self.assertEqual(first['next_field'], 'edits')
+
+        noted = self.say("summary: save the access logs", first['conversation_id'])
+        self.assertFalse(noted['is_complete'])
+        self.change_request.refresh_from_db()
+        self.assertEqual(self.change_request.short_description, 'Patch nginx')
+
+        saved = self.say("Done.", first['conversation_id'])
+        self.assertTrue(saved['is_complete'])
+        self.change_request.refresh_from_db()
+        self.assertEqual(self.change_request.short_description, 'save the access logs')
+        self.assertEqual(IntegrationJob.objects.filter(kind='servicenow.update_change_request').count(), 1)
+
+    def test_answer_that_is_not_a_change_number_asks_again(self):
+        first = self.say("update a change request")
+
+        reply = self.say("the nginx one", first['conversation_id'])
+
+        self.assertEqual(reply['next_field'], 'change_number')
+        self.assertNotIn('None', reply['bot_message'])
+        self.assertIn('Which change request', reply['bot_message'])
+
+    def test_unknown_change_number_asks_again(self):
+        first = self.say("update change request CHG0000099")
+        self.assertIn("couldn't find", first['bot_message'])
+        self.assertEqual(first['next_field'], 'change_number')
+
+        reply = self.say("CHG0000012", first['conversation_id'])
+
+        self.assertEqual(reply['next_field'], 'edits')
+        self.assertIn('Updating CHG0000012', reply['bot_message'])
+
+
+class ConversationListPaginationTests(TestCase):
+    """Keyset pagination of GET /api/chat/conversations/"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('chatbot:conversation-list')
+
+    def pages(self, url: str) -> list:
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(list(response.data), ['next', 'results'])
+            pages.append([row['id'] for row in response.data['results']])
+            url = response.data['next']
+        return pages
+
+    def test_rows_with_equal_updated_at_are_each_listed_once(self):
+        conversations = [Conversation.objects.create(status='active') for _ in range(5)]
+        same_time = conversations[0].updated_at
+        Conversation.objects.update(updated_at=same_time)
+        newest = Conversation.objects.create(status='active')
+
+        pages = self.pages(f"{self.url}?page_size=2")
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 2])
+        ids = [str(conversation_id) for page in pages for conversation_id in page]
+        expected = [str(newest.id)] + sorted((str(c.id) for c in conversations), reverse=True)
+        self.assertEqual(ids, expected)
+
+    def test_filters_are_kept_across_pages(self):
+        for status in ['active', 'closed', 'active', 'active']:
+            Conversation.objects.create(status=status)
+
+        pages = self.pages(f"{self.url}?status=active&page_size=2")
+
+        self.assertEqual([len(page) for page in pages], [2, 1])
+
+    def test_bad_cursor_is_not_found(self):
+        response = self.client.get(f"{self.url}?cursor=not-a-cursor")
+
+        self.assertEqual(response.status_code, 404)
+
+
+class IdempotencyKeyTests(TestCase):
+    """Idempotency-Key on POST /api/chat/message/"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('chatbot:chat-message')
+        self.headers = {'HTTP_IDEMPOTENCY_KEY': f"test-{uuid.uuid4()}"}
+
+    def test_duplicate_key_replays_the_first_response(self):
+        first = self.client.post(self.url, {'message': 'hello'}, format='json', **self.headers)
+        second = self.client.post(self.url, {'message': 'hello'}, format='json', **self.headers)
+
+        self.assertEqual(second.status_code, first.status_code)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Message.objects.filter(sender='user').count(), 1)
+
+    def test_key_reused_with_another_body_is_rejected(self):
+        self.client.post(self.url, {'message': 'hello'}, format='json', **self.headers)
+        response = self.client.post(self.url, {'message': 'help'}, format='json', **self.headers)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Message.objects.filter(sender='user').count(), 1)
+
+
+class SharedIdempotencyStoreTests(TestCase):
+    """IdempotencyStore backed by the default (local memory) cache"""
+
+    def store(self) -> IdempotencyStore:
+        return IdempotencyStore(wait_timeout=0, claim_ttl=0.3, cache_alias='default')
+
+    def test_claim_outlives_its_ttl_while_held(self):
+        store, key = self.store(), f"test-{uuid.uuid4()}"
+        self.assertEqual(store.begin(key, 'body')[0], NEW)
+
+        with store.hold(key):
+            time.sleep(0.7)
+            self.assertEqual(store.begin(key, 'body')[0], IN_FLIGHT)
+
+    def test_claim_of_a_dead_worker_lapses(self):
+        store, key = self.store(), f"test-{uuid.uuid4()}"
+        self.assertEqual(store.begin(key, 'body')[0], NEW)
+
+        time.sleep(0.4)
+        self.assertEqual(store.begin(key, 'body')[0], NEW)
+
+
+class AsyncChatMessageViewTests(TestCase):
+    """POST /api/chat/message/async/"""
+
+    url = '/api/chat/message/async/'
+
+    async def test_message_is_answered(self):
+        response = await self.async_client.post(self.url, {'message': 'hello'}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['bot_message'])
+        self.assertEqual(await Message.objects.acount(), 2)
+
+    async def test_stale_retry_creates_one_change_request(self):
+        conversation = await Conversation.objects.acreate(status='active')
+        await ConversationContext.objects.acreate(
+            conversation=conversation,
+            intent='create_change_request',
+            collected_data=CHANGE_FIELDS,
+            required_fields=['planned_end_date'],
+            next_field='planned_end_date'
+        )
+        save_turn = ConversationManager.save_turn
+        calls = []
+
+        def stale_once(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise StaleContextError("changed by another worker")
+            return save_turn(*args)
+
+        with mock.patch.object(ConversationManager, 'save_turn', side_effect=stale_once):
+            response = await self.async_client.post(
+                self.url,
+                {'conversation_id': str(conversation.id), 'message': '2026-11-02'},
+                content_type='application/json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['is_complete'])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(await ChangeRequest.objects.acount(), 1)
+        self.assertEqual(await IntegrationJob.objects.acount(), 1)
+
+    async def test_duplicate_key_replays_the_first_response(self):
+        headers = {'Idempotency-Key': f"test-{uuid.uuid4()}"}
+        first = await self.async_client.post(
+            self.url, {'message': 'hello'}, content_type='application/json', headers=headers
+        )
+        second = await self.async_client.post(
+            self.url, {'message': 'hello'}, content_type='application/json', headers=headers
+        )
+
+        self.assertEqual(second.status_code, first.status_code)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(await Message.objects.filter(sender='user').acount(), 1)
+
+
+class ChatMessageStreamViewTests(TransactionTestCase):
+    """POST /api/chat/message/stream/ (the turn runs on its own thread and connection)"""
+
+    def stream(self, message: str, **headers) -> list:
+        response = APIClient().post(
+            reverse('chatbot:chat-message-stream'), {'message': message}, format='json', **headers
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.replayed = response.get('Idempotent-Replayed')
+        events = []
+        for chunk in b''.join(response.streaming_content).decode().strip().split('\n\n'):
+            event, data = chunk.split('\n')
+            events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+        return events
+
+    def test_first_turn_reports_the_detected_intent(self):
+        events = self.stream("create a P2 change to patch nginx from 2026-11-01 to 2026-11-02")
+
+        self.assertEqual(events[0][0], 'intent')
+        self.assertEqual(events[0][1]['intent'], 'create_change_request')
+        self.assertEqual(events[-1][0], 'result')
+        self.assertEqual(events[-1][1]['intent'], 'create_change_request')
+
+    def test_duplicate_key_replays_the_result_event(self):
+        headers = {'HTTP_IDEMPOTENCY_KEY': f"test-{uuid.uuid4()}"}
+        first = self.stream('hello', **headers)
+        second = self.stream('hello', **headers)
+
+        self.assertEqual(second, [first[-1]])
+        self.assertEqual(second[0][0], 'result')
+        self.assertEqual(self.replayed, 'true')
+        self.assertEqual(Message.objects.filter(sender='user').count(), 1)
+
+
+class EntityExtractionTests(TestCase):
+    """extract_entities() and the flow prefilling from it"""
+
+    def test_one_sentence_fills_four_fields(self):
+        self.assertEqual(
+            extract_entities("create a P2 change to patch nginx from 2026-11-01 to 2026-11-02"),
+            {
+                'priority': '2',
+                'short_description': 'patch nginx',
+                'planned_start_date': '2026-11-01',
+                'planned_end_date': '2026-11-02',
+            }
+        )
+
+    def test_lone_date_after_a_cue_is_the_end_date(self):
+        self.assertEqual(extract_entities("finish by 2026-11-02"), {'planned_end_date': '2026-11-02'})
+        self.assertEqual(
+            extract_entities("begin 2026-11-01, done by 2026-11-05"),
+            {'planned_start_date': '2026-11-01', 'planned_end_date': '2026-11-05'}
+        )
+
+    def test_impossible_date_is_skipped(self):
+        self.assertEqual(extract_entities("start 2026-02-30 or 2026-03-01"), {'planned_start_date': '2026-03-01'})
+
+    def test_priority_forms(self):
+        for message, priority in [("P3", '3'), ("this is high priority", '2'), ("set priority: urgent", '1')]:
+            with self.subTest(message=message):
+                self.assertEqual(extract_entities(message), {'priority': priority})
+
+    def test_labelled_fields(self):
+        self.assertEqual(
+            extract_entities("summary: Patch nginx. description: Roll out the patch"),
+            {'short_description': 'Patch nginx', 'description': 'Roll out the patch'}
+        )
+        self.assertEqual(extract_entities("hello there"), {})
+
+    def test_first_message_only_asks_for_what_is_missing(self):
+        response = APIClient().post(
+            reverse('chatbot:chat-message'),
+            {'message': "create a P2 change to patch nginx from 2026-11-01 to 2026-11-02"},
+            format='json'
+        )
+
+        self.assertEqual(response.data['next_field'], 'description')
+        self.assertEqual(response.data['required_fields'], ['description'])
+        self.assertEqual(response.data['collected_data']['short_description'], 'patch nginx')
+
+
+class FlowTests(TestCase):
+    """Slot filling with Flow.step() on an unsaved context"""
+
+    flow = CreateChangeRequestHandler.flow
+
+    def setUp(self):
+        self.context = ConversationContext(intent='', collected_data={}, required_fields=[])
+
+    def test_start_prefills_and_asks_the_first_open_slot(self):
+        reply = self.flow.step(self.context, "create a P2 change to patch nginx")
+
+        self.assertEqual(self.context.intent, 'create_change_request')
+        self.assertEqual(self.context.collected_data, {'priority': '2', 'short_description': 'patch nginx'})
+        self.assertEqual(self.context.required_fields, ['description', 'planned_start_date', 'planned_end_date'])
+        self.assertEqual(self.context.next_field, 'description')
+        self.assertIn("I've noted the summary, priority.", reply['bot_message'])
+
+    def test_invalid_answer_repeats_the_slot_error(self):
+        self.flow.step(self.context, "new change request")
+        for message in ["Patch nginx", "Roll out the patch"]:
+            self.flow.step(self.context, message)
+
+        reply = self.flow.step(self.context, "whenever")
+
+        self.assertEqual(reply['bot_message'], "Please enter a valid priority: 1 (Critical), 2 (High), 3 (Medium), or 4 (Low)")
+        self.assertEqual(self.context.next_field, 'priority')
+
+    def test_answer_fills_other_slots_found_in_it(self):
+        self.flow.step(self.context, "new change request")
+        self.flow.step(self.context, "Patch nginx")
+
+        self.flow.step(self.context, "Roll out the patch, P1 from 2026-11-01 to 2026-11-02")
+
+        self.assertEqual(self.context.collected_data['priority'], '1')
+        self.assertEqual(self.context.collected_data['planned_end_date'], '2026-11-02')
+        self.assertEqual(self.context.required_fields, [])
+
+    def test_lone_cued_date_answers_the_start_question(self):
+        self.flow.step(self.context, "create a P2 change to patch nginx")
+        self.flow.step(self.context, "Roll out the patch")
+
+        self.flow.step(self.context, "by 2026-11-01")
+
+        self.assertEqual(self.context.collected_data['planned_start_date'], '2026-11-01')
+        self.assertEqual(self.context.next_field, 'planned_end_date')
+
+    def test_last_answer_completes_and_reopen_asks_again(self):
+        self.flow.step(self.context, "create a P2 change to patch nginx from 2026-11-01")
+        self.flow.step(self.context, "Roll out the patch")
+        self.assertIsNone(self.flow.step(self.context, "2026-11-02"))
+        self.assertIsNone(self.context.next_field)
+
+        self.flow.reopen(self.context, 'priority')
+
+        self.assertEqual(self.context.next_field, 'priority')
+        self.assertNotIn('priority', self.context.collected_data)
+
+
+class KeywordMatchingTests(TestCase):
+    """Keywords match whole words, not substrings of longer ones"""
+
+    def test_cr_inside_describe_is_not_a_change_request(self):
+        self.assertNotIn('create_object', match_keywords("please describe the new layout"))
+        self.assertEqual(resolve_intent(match_keywords("please describe the new layout")), 'unknown')
+        self.assertEqual(resolve_intent(match_keywords("new CR please")), 'create_change_request')
+
+    def test_hi_inside_this_is_not_a_greeting(self):
+        self.assertNotIn('greeting', match_keywords("this is odd"))
+        self.assertEqual(resolve_intent(match_keywords("this is odd")), 'unknown')
+        self.assertEqual(resolve_intent(match_keywords("Hi!")), 'greeting')
+
+    def test_digits_separate_words(self):
+        self.assertEqual(resolve_intent(match_keywords("status of CHG0001234")), 'check_status')
+
+
+class FixedStage(IntentStage):
+    """Answers every message with one intent and confidence"""
+
+    def __init__(self, answer, threshold=0.5, fail=False):
+        super().__init__(threshold, name=answer[0])
+        self.answer = answer
+        self.fail = fail
+        self.seen = []
+
+    def classify(self, messages):
+        self.seen += messages
+        if self.fail:
+            raise RuntimeError("stage down")
+        return [self.answer] * len(messages)
+
+
+class IntentEngineTests(TestCase):
+    def test_confident_stage_ends_the_cascade(self):
+        later = FixedStage(('help', 1.0))
+        engine = IntentEngine([KeywordStage(threshold=0.5), later])
+
+        self.assertEqual(engine.detect("create a new change request"), 'create_change_request')
+        self.assertEqual(later.seen, [])
+
+    def test_undecided_messages_fall_through(self):
+        later = FixedStage(('help', 0.9))
+        engine = IntentEngine([KeywordStage(threshold=0.5), later])
+
+        self.assertEqual(engine.detect_many(["create a change", "mumble"]), ['create_change_request', 'help'])
+        self.assertEqual(later.seen, ["mumble"])
+
+    def test_failing_stage_is_skipped_and_counted(self):
+        failing = FixedStage(('help', 1.0), fail=True)
+        engine = IntentEngine([failing, FixedStage(('greeting', 0.9))])
+
+        with self.assertLogs('chatbot.intent_engine', 'ERROR'):
+            self.assertEqual(engine.detect("hi"), 'greeting')
+        self.assertEqual(failing.stats()['errors'], 1)
+
+    def test_guess_below_every_threshold_is_unknown(self):
+        engine = IntentEngine([FixedStage(('help', 0.4)), FixedStage(('greeting', 0.3))])
+
+        self.assertEqual(engine.classify(["mumble"]), [('unknown', 0.0)])
+
+    def test_ongoing_flow_keeps_its_intent(self):
+        engine = IntentEngine([FixedStage(('help', 1.0))])
+
+        self.assertEqual(engine.detect("P2", current_intent='create_change_request'), 'create_change_request')
+        self.assertEqual(engine.detect("cancel, show help", current_intent='create_change_request'), 'help')
+
+
+try:
+    import numpy
+    from .classifier import IntentClassifier
+except ImportError:
+    numpy = None
+
+
+@unittest.skipUnless(numpy, "NumPy is not installed")
+class IntentClassifierSaveTests(TestCase):
+    TEXTS = ["create a change", "new change request", "check status of chg12", "show status", "hello", "hi there"]
+    LABELS = ['create_change_request'] * 2 + ['check_status'] * 2 + ['greeting'] * 2
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        self.path = self.root / 'intent_model'
+
+    def train(self, seed=0, epochs=5):
+        return IntentClassifier.train(self.TEXTS, self.LABELS, n_features=256, epochs=epochs, seed=seed)
+
+    def test_retraining_leaves_a_loaded_model_untouched(self):
+        first = self.train()
+        first.save(self.path)
+        loaded = IntentClassifier.load(self.path)
+        before = numpy.array(loaded.weights)
+
+        self.train(epochs=20).save(self.path)
+
+        numpy.testing.assert_array_equal(loaded.weights, before)
+        reloaded = IntentClassifier.load(self.path)
+        self.assertFalse(numpy.array_equal(reloaded.weights, before))
+        self.assertTrue(self.path.is_symlink())
+
+    def test_directory_of_an_older_save_is_replaced(self):
+        self.path.mkdir()
+        (self.path / 'meta.json').write_text('{}')
+
+        self.train().save(self.path)
+
+        self.assertTrue(self.path.is_symlink())
+        self.assertEqual(IntentClassifier.load(self.path).labels, sorted(set(self.LABELS)))
+
+    def test_old_versions_are_pruned(self):
+        for seed in range(4):
+            latest = self.train(seed=seed).save(self.path, keep=2)
+
+        versions = sorted(p for p in self.path.with_name('intent_model.versions').iterdir())
+        self.assertEqual(len(versions), 2)
+        self.assertEqual(versions[-1], latest)
+        self.assertEqual(self.path.resolve(), latest.resolve())
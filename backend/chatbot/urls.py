@@ -4,6 +4,9 @@ URL configuration for chatbot app
 from django.urls import path
 from .views import (
     ChatMessageView,
+    AsyncChatMessageView,
+    ChatMessageStreamView,
+    BatchChatMessageView,
     ConversationListView,
     ConversationDetailView,
     ConversationDeleteView
@@ -14,6 +17,9 @@ app_name = 'chatbot'
 urlpatterns = [
     # Chat endpoint
     path('message/', ChatMessageView.as_view(), name='chat-message'),
+    path('message/stream/', ChatMessageStreamView.as_view(), name='chat-message-stream'),
+    path('message/async/', AsyncChatMessageView.as_view(), name='chat-message-async'),
+    path('messages/batch/', BatchChatMessageView.as_view(), name='chat-message-batch'),
 
     # Conversation management
     path('conversations/', ConversationListView.as_view(), name='conversation-list'),
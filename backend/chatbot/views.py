@@ -1,26 +1,95 @@
+import json
+import logging
+import queue
+import threading
+from contextlib import nullcontext
+from typing import Optional, Tuple
+
+from asgiref.sync import sync_to_async
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
-from django.shortcuts import get_object_or_404
+from rest_framework.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 
-from .models import Conversation, Message, ConversationContext
+from .models import Conversation, ConversationContext
+from .pagination import UpdatedAtCursorPagination
 from .serializers import (
     ConversationSerializer,
+    ConversationSummarySerializer,
     MessageSerializer,
     ChatMessageRequestSerializer,
-    ChatMessageResponseSerializer
+    ChatMessageResponseSerializer,
+    BatchChatMessageItemSerializer,
+    BatchChatMessageRequestSerializer
 )
-from .intents import detect_intent
-from .handlers import get_handler
-from .context_manager import ConversationManager
+from .intents import get_intent_description
+from .intent_engine import intent_engine
+from .handlers import BaseHandler, get_handler, progress_listener, report_progress
+from .context_manager import ConversationManager, StaleContextError, TurnBatch
+from .idempotency import HEADER as IDEMPOTENCY_HEADER, REPLAYED_HEADER, IdempotencyClaim, aidempotent, claim, idempotent
+
+logger = logging.getLogger(__name__)
+
+
+def build_turn_response(conversation: Conversation, context: ConversationContext, result: dict) -> dict:
+    """Build the chat message response body for a finished turn"""
+    response_data = {
+        'conversation_id': str(conversation.id),
+        'intent': context.intent or 'unknown',
+        'bot_message': result['bot_message'],
+        'required_fields': context.required_fields,
+        'collected_data': context.collected_data,
+        'next_field': context.next_field,
+        'is_complete': result.get('is_complete', False)
+    }
+
+    if 'change_request' in result:
+        response_data['change_request'] = result['change_request']
+
+    return response_data
+
+
+def route_turn(context: ConversationContext, user_message: str) -> Tuple[str, BaseHandler]:
+    """
+    Detect the intent of a message and pick the handler for it
+
+    Returns:
+        (intent, handler) tuple; the handler sets context.intent itself,
+        so on a conversation's first turn only the returned intent is known
+    """
+
+    # Detect intent if not already set or if user wants to change
+    current_intent = context.intent
+    ongoing_intent = current_intent
+    if current_intent and not get_handler(current_intent).continues(context, user_message):
+        ongoing_intent = None
+    detected_intent = intent_engine.detect(user_message, ongoing_intent)
+
+    # If intent changed, reset context
+    if detected_intent != current_intent and current_intent is not None:
+        ConversationManager.reset_context(context)
+        context.intent = detected_intent
+
+    # Route to appropriate handler
+    intent = detected_intent or 'unknown'
+    return intent, get_handler(intent)
 
 
 class ChatMessageView(APIView):
     """
     Handle chat messages - main endpoint for the chatbot
     POST /api/chat/message/
+
+    Retries carrying the same Idempotency-Key header get the first response.
     """
 
+    @idempotent
     def post(self, request):
         """Process a user message and return bot response"""
 
@@ -35,76 +104,308 @@ class ChatMessageView(APIView):
         conversation_id = request_serializer.validated_data.get('conversation_id')
         user_message = request_serializer.validated_data.get('message')
 
-        # Get or create conversation
-        if conversation_id:
-            conversation = get_object_or_404(Conversation, id=conversation_id)
-        else:
-            conversation = Conversation.objects.create(status='active')
+        conversation, context, result = self._process(conversation_id, user_message)
 
-        # Get or create context
-        context = ConversationManager.get_or_create_context(conversation)
+        response_data = build_turn_response(conversation, context, result)
 
-        # Save user message
-        Message.objects.create(
-            conversation=conversation,
-            sender='user',
-            text=user_message
-        )
+        return Response(response_data, status=status.HTTP_200_OK)
+
+    def _process(self, conversation_id, user_message: str):
+        """Run one turn, retrying from the database if the cached state was stale"""
+        try:
+            return self._run_turn(conversation_id, user_message)
+        except StaleContextError:
+            # Another worker changed the conversation after it was cached
+            ConversationManager.invalidate(conversation_id)
+            return self._run_turn(conversation_id, user_message, use_cache=False)
+
+    def _run_turn(self, conversation_id, user_message: str, use_cache: bool = True):
+        """Run one turn as a single unit of work"""
+
+        # One SELECT for conversation and context (none when cached), the
+        # handler changes state in memory, then save_turn() writes everything
+        # back with a fixed number of statements.
+        with transaction.atomic():
+            conversation, context = ConversationManager.load_turn(conversation_id, use_cache)
+            intent, handler = route_turn(context, user_message)
+            report_progress(
+                'intent',
+                conversation_id=str(conversation.id),
+                intent=intent,
+                message=get_intent_description(intent)
+            )
+            result = handler.handle(context, user_message)
+            ConversationManager.save_turn(conversation, context, user_message, result)
+
+        return conversation, context, result
+
+
+class ChatMessageStreamView(ChatMessageView):
+    """
+    Server-Sent Events variant of the chat endpoint
+    POST /api/chat/message/stream/
+
+    Takes the same request as ChatMessageView and streams:
+    - `intent` as soon as the message is routed
+    - `progress` while integrations run
+    - `result` with the usual response body, or `error`
+
+    A retry carrying the same Idempotency-Key gets only the final event of
+    the first attempt.
+    """
+
+    def post(self, request):
+        """Process a user message and stream the bot response"""
+
+        request_serializer = ChatMessageRequestSerializer(data=request.data)
+        if not request_serializer.is_valid():
+            return Response(
+                request_serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        conversation_id = request_serializer.validated_data.get('conversation_id')
+        user_message = request_serializer.validated_data.get('message')
+
+        # A retry with the same Idempotency-Key gets the final event of the
+        # first attempt instead of running the turn again
+        key_claim = None
+        if request.headers.get(IDEMPOTENCY_HEADER):
+            reply, key_claim = claim(request.path, request.headers[IDEMPOTENCY_HEADER], request.data)
+            if reply is not None:
+                status_code, data, replayed = reply
+                if not replayed:
+                    return Response(data, status=status_code)
+                response = self._event_response(iter([self._format_event(data['event'], data['data'])]))
+                response[REPLAYED_HEADER] = 'true'
+                return response
+
+        return self._event_response(self._stream(conversation_id, user_message, key_claim))
+
+    @staticmethod
+    def _event_response(events) -> StreamingHttpResponse:
+        response = StreamingHttpResponse(events, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    @staticmethod
+    def _format_event(event: str, data) -> str:
+        return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+    def _stream(self, conversation_id, user_message: str, key_claim: Optional[IdempotencyClaim] = None):
+        """Run the turn on a worker thread and yield its events as they happen"""
+        events = queue.Queue()
+
+        def run():
+            token = progress_listener.set(lambda event, data: events.put((event, data)))
+            try:
+                with key_claim.hold() if key_claim else nullcontext():
+                    try:
+                        conversation, context, result = self._process(conversation_id, user_message)
+                        outcome = ('result', build_turn_response(conversation, context, result))
+                    except Http404 as e:
+                        outcome = ('error', {'detail': str(e)})
+                if key_claim:
+                    key_claim.finish(status.HTTP_200_OK, {'event': outcome[0], 'data': outcome[1]})
+                events.put(outcome)
+            except Exception:
+                logger.exception("Streaming chat turn failed")
+                if key_claim:
+                    key_claim.abandon()
+                events.put(('error', {'detail': 'Internal server error'}))
+            finally:
+                progress_listener.reset(token)
+                connections.close_all()
+                events.put(None)
+
+        threading.Thread(target=run, daemon=True).start()
 
-        # Detect intent if not already set or if user wants to change
-        current_intent = context.intent
-        detected_intent = detect_intent(user_message, current_intent)
-
-        # If intent changed, reset context
-        if detected_intent != current_intent and current_intent is not None:
-            ConversationManager.reset_context(context)
-            context.intent = detected_intent
-            context.save()
-
-        # Route to appropriate handler
-        handler = get_handler(detected_intent or 'unknown')
-        result = handler.handle(context, user_message)
-
-        # Save bot response
-        bot_message_obj = Message.objects.create(
-            conversation=conversation,
-            sender='bot',
-            text=result['bot_message'],
-            metadata=result.get('change_request')
+        while True:
+            item = events.get()
+            if item is None:
+                return
+            yield self._format_event(*item)
+
+
+class BatchChatMessageView(APIView):
+    """
+    Process many chat messages in one request
+    POST /api/chat/messages/batch/
+
+    Items run in order through the same pipeline as ChatMessageView, in one
+    transaction with their writes grouped. Each item gets its own result;
+    a failed item does not affect the others. Honours Idempotency-Key.
+    """
+
+    @idempotent
+    def post(self, request):
+        """Process an ordered list of user messages"""
+
+        request_serializer = BatchChatMessageRequestSerializer(data=request.data)
+        if not request_serializer.is_valid():
+            return Response(
+                request_serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # (is_valid, validated_data or errors) per item
+        items = []
+        for payload in request_serializer.validated_data['items']:
+            item_serializer = BatchChatMessageItemSerializer(data=payload)
+            if item_serializer.is_valid():
+                items.append((True, item_serializer.validated_data))
+            else:
+                items.append((False, item_serializer.errors))
+
+        conversation_ids = [
+            item['conversation_id'] for is_valid, item in items
+            if is_valid and item.get('conversation_id')
+        ]
+
+        try:
+            results = self._run_batch(items, conversation_ids)
+        except StaleContextError:
+            # Another worker changed a conversation after it was cached
+            for conversation_id in conversation_ids:
+                ConversationManager.invalidate(conversation_id)
+            results = self._run_batch(items, conversation_ids, use_cache=False)
+
+        failed = sum(1 for result in results if result['status'] == 'error')
+        return Response(
+            {'succeeded': len(results) - failed, 'failed': failed, 'results': results},
+            status=status.HTTP_200_OK
         )
 
-        # Mark conversation as completed if done
-        if result.get('is_complete'):
-            conversation.status = 'completed'
-            conversation.save()
+    def _run_batch(self, items, conversation_ids, use_cache: bool = True):
+        """Run every valid item as a turn and write all of them at the end"""
+        results = []
 
-        # Refresh context from database
-        context.refresh_from_db()
+        with transaction.atomic():
+            batch = TurnBatch(conversation_ids, use_cache)
 
-        # Build response
-        response_data = {
-            'conversation_id': str(conversation.id),
-            'intent': context.intent or 'unknown',
-            'bot_message': result['bot_message'],
-            'required_fields': context.required_fields,
-            'collected_data': context.collected_data,
-            'next_field': context.next_field,
-            'is_complete': result.get('is_complete', False)
-        }
+            for index, (is_valid, item) in enumerate(items):
+                if not is_valid:
+                    results.append({'index': index, 'status': 'error', 'errors': item})
+                    continue
 
-        if 'change_request' in result:
-            response_data['change_request'] = result['change_request']
+                user_message = item['message']
+                try:
+                    conversation, context, result = batch.run_turn(
+                        user_message,
+                        lambda context: route_turn(context, user_message)[1].handle(context, user_message),
+                        conversation_id=item.get('conversation_id'),
+                        conversation_ref=item.get('conversation_ref')
+                    )
+                except Http404 as e:
+                    results.append({'index': index, 'status': 'error', 'errors': {'detail': str(e)}})
+                    continue
+                except Exception:
+                    logger.exception("Batch chat item %s failed", index)
+                    results.append({'index': index, 'status': 'error', 'errors': {'detail': 'Internal server error'}})
+                    continue
 
-        return Response(response_data, status=status.HTTP_200_OK)
+                results.append({'index': index, 'status': 'ok', **build_turn_response(conversation, context, result)})
+
+            batch.flush()
+
+        return results
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncChatMessageView(View):
+    """
+    Native async variant of the chat endpoint for ASGI deployments
+    POST /api/chat/message/async/
+
+    Same request and response format as ChatMessageView. Reads go through
+    the async ORM and the handler's text-only part (BaseHandler.prepare())
+    runs on the event loop, so most turns never hold a worker thread. A turn
+    whose handler writes runs the rest of it (BaseHandler.finish()) and the
+    save as one transaction on the ORM's thread. Honours Idempotency-Key.
+    """
+
+    @aidempotent
+    async def post(self, request):
+        """Process a user message and return bot response"""
+
+        try:
+            payload = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'detail': 'JSON parse error'}, status=status.HTTP_400_BAD_REQUEST)
+
+        request_serializer = ChatMessageRequestSerializer(data=payload)
+        if not request_serializer.is_valid():
+            return JsonResponse(request_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        conversation_id = request_serializer.validated_data.get('conversation_id')
+        user_message = request_serializer.validated_data.get('message')
+
+        try:
+            try:
+                conversation, context, result = await self._run_turn(conversation_id, user_message)
+            except StaleContextError:
+                ConversationManager.invalidate(conversation_id)
+                conversation, context, result = await self._run_turn(conversation_id, user_message, use_cache=False)
+        except Http404 as e:
+            return JsonResponse({'detail': str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+        return JsonResponse(build_turn_response(conversation, context, result), status=status.HTTP_200_OK)
+
+    async def _run_turn(self, conversation_id, user_message: str, use_cache: bool = True):
+        """Run one turn; reads are async and the writes commit atomically"""
+        conversation, context = await ConversationManager.aload_turn(conversation_id, use_cache)
+        _, handler = route_turn(context, user_message)
+        result = handler.prepare(context, user_message)
+        if result is None:
+            # What the handler writes (a change request and its jobs) commits
+            # or rolls back with the turn, so a retry after StaleContextError
+            # does not repeat it
+            result = await sync_to_async(self._finish_turn)(handler, conversation, context, user_message)
+        else:
+            await ConversationManager.asave_turn(conversation, context, user_message, result)
+
+        return conversation, context, result
+
+    @staticmethod
+    @transaction.atomic
+    def _finish_turn(handler: BaseHandler, conversation: Conversation, context: ConversationContext,
+                     user_message: str) -> dict:
+        result = handler.finish(context, user_message)
+        ConversationManager.save_turn(conversation, context, user_message, result)
+        return result
 
 
 class ConversationListView(generics.ListAPIView):
     """
-    List all conversations
-    GET /api/chat/conversations/
+    List conversations, most recently updated first, a page at a time
+    GET /api/chat/conversations/?status=active&user=1&page_size=20
+
+    Rows are summaries; ?expand=messages returns full conversations with
+    messages and context (fetched in two extra queries per page). Follow
+    "next" for the following page.
     """
-    queryset = Conversation.objects.all()
-    serializer_class = ConversationSerializer
+    pagination_class = UpdatedAtCursorPagination
+
+    def expanded(self) -> bool:
+        return self.request.query_params.get('expand') == 'messages'
+
+    def get_queryset(self):
+        queryset = Conversation.objects.select_related('context')
+        status_filter = self.request.query_params.get('status')
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+        user = self.request.query_params.get('user')
+        if user:
+            if not user.isdigit():
+                raise ValidationError({'user': "Must be a user id."})
+            queryset = queryset.filter(user_id=int(user))
+        if self.expanded():
+            queryset = queryset.prefetch_related('messages')
+        return queryset
+
+    def get_serializer_class(self):
+        return ConversationSerializer if self.expanded() else ConversationSummarySerializer
 
 
 class ConversationDetailView(generics.RetrieveAPIView):
@@ -112,7 +413,7 @@ class ConversationDetailView(generics.RetrieveAPIView):
     Get a specific conversation with all messages
     GET /api/chat/conversations/{id}/
     """
-    queryset = Conversation.objects.all()
+    queryset = Conversation.objects.select_related('context').prefetch_related('messages')
     serializer_class = ConversationSerializer
     lookup_field = 'id'
 
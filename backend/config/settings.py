@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+from corsheaders.defaults import default_headers
 from decouple import config, Csv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -100,10 +101,214 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Take the write lock when a transaction starts, so concurrent
+            # chat turns wait for each other instead of failing with
+            # "database is locked" when a read lock cannot be upgraded
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+            # A file, not the shared in-memory database, so tests that run
+            # concurrent transactions wait on the lock like real workers
+            'TEST': {
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
         }
     }
 
 
+# Local LCHG numbers (given to change requests until ServiceNow assigns the
+# CHG number) are reserved from the database this many at a time per worker
+# process (integrations/numbering.py)
+CHANGE_NUMBER_BLOCK_SIZE = config('CHANGE_NUMBER_BLOCK_SIZE', default=50, cast=int)
+
+# Outbound integration job queue (integrations/jobs.py), processed by
+# `manage.py run_integration_worker`. Failed jobs retry after
+# BACKOFF_BASE * 2^(attempt-1) seconds (capped at BACKOFF_MAX) and are
+# dead-lettered after MAX_ATTEMPTS; a running job whose worker has been
+# silent for LEASE_TIMEOUT seconds is handed to another worker. ServiceNow
+# updates wait UPDATE_COALESCE_WINDOW seconds so edits made meanwhile are
+# sent in the same PATCH.
+INTEGRATION_JOBS = {
+    'MAX_ATTEMPTS': config('INTEGRATION_JOB_MAX_ATTEMPTS', default=5, cast=int),
+    'BACKOFF_BASE': config('INTEGRATION_JOB_BACKOFF_BASE', default=5, cast=float),
+    'BACKOFF_MAX': config('INTEGRATION_JOB_BACKOFF_MAX', default=600, cast=float),
+    'LEASE_TIMEOUT': config('INTEGRATION_JOB_LEASE_TIMEOUT', default=300, cast=int),
+    'BATCH_SIZE': config('INTEGRATION_JOB_BATCH_SIZE', default=10, cast=int),
+    'POLL_INTERVAL': config('INTEGRATION_JOB_POLL_INTERVAL', default=2, cast=float),
+    'UPDATE_COALESCE_WINDOW': config('INTEGRATION_JOB_UPDATE_COALESCE_WINDOW', default=10, cast=float),
+}
+
+# Remote records created for a new change request by one fan-out job
+# (integrations/fanout.py): always a ServiceNow change, plus a Jira issue in
+# JIRA_PROJECT and a pull request in GITHUB_REPO (from the branch named by
+# GITHUB_HEAD, where {number} is the local number) when those are set. The
+# calls run concurrently. After CALL_TIMEOUT seconds the ones that have not
+# started are retried later; those in flight are waited for (bounded by
+# INTEGRATION_HTTP timeouts), since they may still create their record.
+CHANGE_FAN_OUT = {
+    'JIRA_PROJECT': config('CHANGE_JIRA_PROJECT', default=None),
+    'GITHUB_REPO': config('CHANGE_GITHUB_REPO', default=None),
+    'GITHUB_HEAD': config('CHANGE_GITHUB_HEAD', default='change/{number}'),
+    'GITHUB_BASE': config('CHANGE_GITHUB_BASE', default='main'),
+    'MAX_WORKERS': config('CHANGE_FAN_OUT_WORKERS', default=8, cast=int),
+    'CALL_TIMEOUT': config('CHANGE_FAN_OUT_TIMEOUT', default=20, cast=float),
+}
+
+# Rate limits per integration and credential (integrations/ratelimit.py).
+# RATE calls per second with bursts of BURST; calls in flight adapt between
+# MIN_CONCURRENCY and MAX_CONCURRENCY (halved on 429/5xx). Callers wait up to
+# MAX_WAIT seconds for a permit. Set CACHE_ALIAS to a cache shared by all
+# processes (Redis, memcached) for cluster-wide limits. GitHub allows 5000
+# requests an hour per token; 304 answers are not counted.
+INTEGRATION_RATE_LIMITS = {
+    'RATE': config('RATE_LIMIT_RATE', default=10, cast=float),
+    'BURST': config('RATE_LIMIT_BURST', default=20, cast=int),
+    'MIN_CONCURRENCY': config('RATE_LIMIT_MIN_CONCURRENCY', default=1, cast=int),
+    'MAX_CONCURRENCY': config('RATE_LIMIT_MAX_CONCURRENCY', default=10, cast=int),
+    'MAX_WAIT': config('RATE_LIMIT_MAX_WAIT', default=10, cast=float),
+    'CACHE_ALIAS': config('RATE_LIMIT_CACHE_ALIAS', default=None),
+    'GITHUB': {
+        'RATE': config('GITHUB_RATE_LIMIT_RATE', default=1.35, cast=float),
+        'BURST': config('GITHUB_RATE_LIMIT_BURST', default=100, cast=int),
+    },
+}
+
+# Jira issue creation (integrations/services.py): default issue type, items
+# per bulk-create request (Jira allows 50) and how long project issue types
+# and create-screen fields are cached.
+JIRA_ISSUES = {
+    'ISSUE_TYPE': config('JIRA_ISSUE_TYPE', default='Task'),
+    'BULK_SIZE': config('JIRA_BULK_SIZE', default=50, cast=int),
+    'METADATA_TTL': config('JIRA_METADATA_TTL', default=3600, cast=float),
+}
+
+# HTTP transport shared by the integration services (integrations/transport.py).
+# Connections are kept alive per host; idempotent calls are retried RETRIES
+# times with jittered backoff (BACKOFF_BASE * 2^n, capped at BACKOFF_MAX);
+# after BREAKER_FAILURES consecutive failures an integration is not called
+# for BREAKER_RESET seconds. Per-integration overrides go in e.g.
+# INTEGRATION_HTTP['SERVICENOW'] = {'READ_TIMEOUT': 60}.
+INTEGRATION_HTTP = {
+    'CONNECT_TIMEOUT': config('INTEGRATION_HTTP_CONNECT_TIMEOUT', default=3.05, cast=float),
+    'READ_TIMEOUT': config('INTEGRATION_HTTP_READ_TIMEOUT', default=30, cast=float),
+    'RETRIES': config('INTEGRATION_HTTP_RETRIES', default=3, cast=int),
+    'BACKOFF_BASE': config('INTEGRATION_HTTP_BACKOFF_BASE', default=0.5, cast=float),
+    'BACKOFF_MAX': config('INTEGRATION_HTTP_BACKOFF_MAX', default=8, cast=float),
+    'POOL_MAXSIZE': config('INTEGRATION_HTTP_POOL_MAXSIZE', default=10, cast=int),
+    'BREAKER_FAILURES': config('INTEGRATION_HTTP_BREAKER_FAILURES', default=5, cast=int),
+    'BREAKER_RESET': config('INTEGRATION_HTTP_BREAKER_RESET', default=30, cast=float),
+}
+
+# Inbound webhooks (POST /api/webhooks/<source>/, integrations/webhooks.py).
+# A source is enabled by its secret: HMAC-SHA256 signing secrets for GitHub
+# and Jira, a shared X-Webhook-Token for ServiceNow. apply_webhook_events
+# applies BATCH_SIZE events per transaction and deletes processed events
+# after RETENTION_DAYS.
+WEBHOOKS = {
+    'GITHUB_SECRET': config('WEBHOOK_GITHUB_SECRET', default=None),
+    'JIRA_SECRET': config('WEBHOOK_JIRA_SECRET', default=None),
+    'SERVICENOW_TOKEN': config('WEBHOOK_SERVICENOW_TOKEN', default=None),
+    'BATCH_SIZE': config('WEBHOOK_BATCH_SIZE', default=500, cast=int),
+    'POLL_INTERVAL': config('WEBHOOK_POLL_INTERVAL', default=1, cast=float),
+    'RETENTION_DAYS': config('WEBHOOK_RETENTION_DAYS', default=14, cast=float),
+}
+
+# Live PR / Jira status in change request listings (?enrich=true, see
+# integrations/enrichment.py). Links are resolved in batches (GITHUB_BATCH
+# PRs per GraphQL query, JIRA_BATCH keys per JQL search) within TIMEOUT
+# seconds, and the results are cached for TTL seconds.
+CHANGE_ENRICHMENT = {
+    'TTL': config('ENRICHMENT_TTL', default=60, cast=float),
+    'MAX_ENTRIES': config('ENRICHMENT_MAX_ENTRIES', default=10000, cast=int),
+    'TIMEOUT': config('ENRICHMENT_TIMEOUT', default=5, cast=float),
+    'GITHUB_BATCH': config('ENRICHMENT_GITHUB_BATCH', default=50, cast=int),
+    'JIRA_BATCH': config('ENRICHMENT_JIRA_BATCH', default=100, cast=int),
+}
+
+# Stored GET responses for conditional requests (integrations/http_cache.py).
+# GitHub PR polls revalidate them with ETag / Last-Modified, and a 304 does
+# not count against GitHub's rate limit. At most MAX_ENTRIES responses are
+# kept; the least recently used are evicted.
+HTTP_RESPONSE_CACHE = {
+    'MAX_ENTRIES': config('HTTP_CACHE_MAX_ENTRIES', default=10000, cast=int),
+}
+
+# Change request status cache (integrations/status_cache.py). Snapshots older
+# than FRESH_TTL seconds are still served, but refreshed from ServiceNow in
+# the background; after STALE_TTL they are dropped. Set CACHE_ALIAS to share
+# entries (and invalidations from run_integration_worker) across processes.
+# With sync_servicenow running, set REMOTE_REFRESH off: the local table is
+# kept current and status reads never call ServiceNow.
+CHANGE_STATUS_CACHE = {
+    'FRESH_TTL': config('STATUS_CACHE_FRESH_TTL', default=30, cast=float),
+    'STALE_TTL': config('STATUS_CACHE_STALE_TTL', default=3600, cast=float),
+    'MAX_ENTRIES': config('STATUS_CACHE_MAX_ENTRIES', default=10000, cast=int),
+    'CACHE_ALIAS': config('STATUS_CACHE_ALIAS', default=None),
+    'REFRESH_WORKERS': config('STATUS_CACHE_REFRESH_WORKERS', default=4, cast=int),
+    'REMOTE_REFRESH': config('STATUS_CACHE_REMOTE_REFRESH', default=True, cast=bool),
+}
+
+# Incremental ServiceNow change_request sync (`manage.py sync_servicenow`,
+# integrations/sync.py): records fetched per request.
+SERVICENOW_SYNC = {
+    'PAGE_SIZE': config('SERVICENOW_SYNC_PAGE_SIZE', default=500, cast=int),
+}
+
+# Conversation context cache (chatbot/context_manager.py)
+# CACHE_ALIAS names an entry in CACHES shared by all workers; without it each
+# process keeps its own LRU. FLUSH_INTERVAL > 0 defers context writes and
+# flushes them in batches (in-process store only).
+CHATBOT_CONTEXT_CACHE = {
+    'ENABLED': config('CONTEXT_CACHE_ENABLED', default=True, cast=bool),
+    'MAX_ENTRIES': config('CONTEXT_CACHE_MAX_ENTRIES', default=10000, cast=int),
+    'IDLE_TTL': config('CONTEXT_CACHE_IDLE_TTL', default=900, cast=int),
+    'CACHE_ALIAS': config('CONTEXT_CACHE_ALIAS', default=None),
+    'FLUSH_INTERVAL': config('CONTEXT_CACHE_FLUSH_INTERVAL', default=0, cast=float),
+}
+
+# Idempotency-Key response store (chatbot/idempotency.py)
+# WAIT_TIMEOUT bounds how long a duplicate waits for the first attempt;
+# CLAIM_TTL is the longest a turn may run before a shared claim (CACHE_ALIAS)
+# held by a dead worker lapses. Live claims are renewed every CLAIM_TTL / 3.
+# Without CACHE_ALIAS each worker process keeps its own store, so a retry that
+# reaches another worker runs the turn again: set it to a cache shared by all
+# workers (e.g. Redis) whenever more than one runs.
+CHATBOT_IDEMPOTENCY = {
+    'MAX_ENTRIES': config('IDEMPOTENCY_MAX_ENTRIES', default=10000, cast=int),
+    'TTL': config('IDEMPOTENCY_TTL', default=86400, cast=int),
+    'WAIT_TIMEOUT': config('IDEMPOTENCY_WAIT_TIMEOUT', default=30, cast=int),
+    'CLAIM_TTL': config('IDEMPOTENCY_CLAIM_TTL', default=300, cast=int),
+    'CACHE_ALIAS': config('IDEMPOTENCY_CACHE_ALIAS', default=None),
+}
+
+
+# Local intent classifier (chatbot/classifier.py), trained with
+# `manage.py train_intent_classifier`; needs NumPy. Without --labels it only
+# learns the keyword rules' labels.
+CHATBOT_INTENT_MODEL = {
+    'ENABLED': config('INTENT_MODEL_ENABLED', default=True, cast=bool),
+    'PATH': config('INTENT_MODEL_PATH', default=str(BASE_DIR / 'intent_model')),
+}
+
+# Intent cascade (chatbot/intent_engine.py). Stages run in order; a message
+# leaves the cascade at the first stage whose confidence reaches THRESHOLD.
+# The keyword stage scores 1.0 for a single rule match and 0.5 when the rule
+# priority decided, so a threshold of 1.0 sends those to the next stage. A
+# message no stage is confident about is 'unknown'.
+CHATBOT_INTENT_ENGINE = {
+    'STAGES': [
+        {
+            'BACKEND': 'chatbot.intent_engine.KeywordStage',
+            'THRESHOLD': config('INTENT_KEYWORD_THRESHOLD', default=0.5, cast=float),
+        },
+        {
+            'BACKEND': 'chatbot.intent_engine.ClassifierStage',
+            'THRESHOLD': config('INTENT_CLASSIFIER_THRESHOLD', default=0.6, cast=float),
+        },
+    ],
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -151,6 +356,8 @@ CORS_ALLOWED_ORIGINS = config(
     default='http://localhost:5173',
     cast=Csv()
 )
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['idempotent-replayed']
 
 # Django REST Framework
 REST_FRAMEWORK = {
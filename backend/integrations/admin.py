@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import ChangeRequest
+from .jobs import requeue
+from .models import ChangeRequest, HTTPCacheEntry, IntegrationJob, NumberSequence, SyncCheckpoint, WebhookEvent
 
 
 @admin.register(ChangeRequest)
@@ -32,3 +33,53 @@ class ChangeRequestAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at')
         }),
     )
+
+
+@admin.register(NumberSequence)
+class NumberSequenceAdmin(admin.ModelAdmin):
+    list_display = ['name', 'next_value']
+
+
+@admin.register(SyncCheckpoint)
+class SyncCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['name', 'watermark', 'last_key', 'records', 'updated_at']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(HTTPCacheEntry)
+class HTTPCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ['url', 'namespace', 'etag', 'fetched_at', 'used_at']
+    list_filter = ['namespace']
+    search_fields = ['url']
+    readonly_fields = ['key', 'fetched_at', 'used_at']
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'source', 'event_type', 'delivery_id', 'outcome', 'received_at', 'processed_at']
+    list_filter = ['source', 'outcome']
+    search_fields = ['delivery_id', 'error']
+    readonly_fields = ['received_at', 'processed_at']
+
+
+@admin.register(IntegrationJob)
+class IntegrationJobAdmin(admin.ModelAdmin):
+    list_display = [
+        'id',
+        'kind',
+        'status',
+        'priority',
+        'attempts',
+        'run_after',
+        'change_request',
+        'created_at'
+    ]
+    list_filter = ['status', 'kind', 'priority']
+    search_fields = ['kind', 'last_error', 'change_request__number']
+    readonly_fields = ['created_at', 'updated_at', 'locked_by', 'locked_at']
+    actions = ['retry_dead_jobs']
+
+    @admin.action(description="Retry selected dead jobs")
+    def retry_dead_jobs(self, request, queryset):
+        count = requeue(queryset)
+        self.message_user(request, f"{count} job(s) queued again.")
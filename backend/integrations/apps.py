@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class IntegrationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'integrations'
+
+    def ready(self):
+        # Registers the signal handlers that invalidate the status cache
+        from . import status_cache  # noqa: F401
@@ -0,0 +1,142 @@
+"""
+Live GitHub PR and Jira issue status for change request listings
+
+Rendering a page of change requests with their linked PR and issue would be
+one remote call per row. enrich() instead collects the links of the whole
+page and resolves them with a constant number of calls: one aliased GitHub
+GraphQL query per GITHUB_BATCH pull requests and one Jira JQL
+`key in (...)` search per JIRA_BATCH issues, GitHub and Jira side by side
+(integrations/fanout.py). Results are cached for TTL seconds, so paging
+back and forth or refreshing a list does not call out again.
+
+An integration that is not configured, fails, is out of rate limit permits
+or misses the deadline leaves its field None; the listing itself never
+fails because of it.
+"""
+import logging
+import re
+from typing import Any, Dict, List
+
+from django.conf import settings
+
+from .caching import TTLCache
+from .fanout import fan_out
+from .ratelimit import max_wait
+from .services import get_github_service, get_jira_service
+
+logger = logging.getLogger(__name__)
+
+JIRA_KEY_PATTERN = re.compile(r'^[A-Z][A-Z0-9_]*-\d+$')
+REPO_PATTERN = re.compile(r'^[\w.-]+/[\w.-]+$')
+
+_MISSING = object()
+
+
+def enrichment_option(name: str, default: Any) -> Any:
+    """Read a CHANGE_ENRICHMENT setting"""
+    return getattr(settings, 'CHANGE_ENRICHMENT', {}).get(name, default)
+
+
+# Remote status by ('github', (repo, number)) / ('jira', key); None = not found
+_cache = TTLCache(
+    ttl=enrichment_option('TTL', 60),
+    max_entries=enrichment_option('MAX_ENTRIES', 10000)
+)
+
+
+def enrich(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Add github_pull_request and jira_issue to serialized change requests
+
+    Args:
+        rows: ChangeRequestSerializer data (github_repo, github_pr_number
+            and jira_issue_key are read)
+
+    Returns:
+        The same rows, updated in place. github_pull_request is
+        {'state', 'title', 'url', 'merged', 'isDraft'} and jira_issue is
+        {'status', 'summary'}; either is None when not linked or unknown.
+    """
+    pr_links = {
+        (row['github_repo'], row['github_pr_number'])
+        for row in rows
+        if row.get('github_pr_number') and REPO_PATTERN.match(row.get('github_repo') or '')
+    }
+    jira_keys = {
+        row['jira_issue_key']
+        for row in rows
+        if JIRA_KEY_PATTERN.match(row.get('jira_issue_key') or '')
+    }
+
+    wanted = {'github': pr_links, 'jira': jira_keys}
+    found = {integration: {} for integration in wanted}
+    missing = {}
+    for integration, keys in wanted.items():
+        for key in keys:
+            value = _cache.get((integration, key), _MISSING)
+            if value is _MISSING:
+                missing.setdefault(integration, []).append(key)
+            else:
+                found[integration][key] = value
+
+    if missing:
+        fetchers = {'github': _fetch_pull_requests, 'jira': _fetch_issues}
+        results, errors = fan_out(
+            {
+                integration: (lambda fetch=fetchers[integration], keys=sorted(keys): fetch(keys))
+                for integration, keys in missing.items()
+            },
+            timeout=enrichment_option('TIMEOUT', 5)
+        )
+        for integration, error in errors.items():
+            # ValueError: the integration is not configured
+            if not isinstance(error, ValueError):
+                logger.warning("Could not enrich change requests from %s: %s", integration, error)
+        for integration, fetched in results.items():
+            for key in missing[integration]:
+                value = fetched.get(key)
+                _cache.set((integration, key), value)
+                found[integration][key] = value
+
+    for row in rows:
+        row['github_pull_request'] = found['github'].get((row.get('github_repo'), row.get('github_pr_number')))
+        row['jira_issue'] = found['jira'].get(row.get('jira_issue_key'))
+    return rows
+
+
+def _fetch_pull_requests(links: List[tuple]) -> Dict[tuple, Dict[str, Any]]:
+    # A listing does not wait for rate limit permits
+    with max_wait(0):
+        return get_github_service().get_pull_requests(
+            links,
+            batch_size=enrichment_option('GITHUB_BATCH', 50)
+        )
+
+
+def _fetch_issues(keys: List[str]) -> Dict[str, Dict[str, Any]]:
+    with max_wait(0):
+        issues = get_jira_service().search_issues(
+            keys,
+            fields=['status', 'summary'],
+            batch_size=enrichment_option('JIRA_BATCH', 100)
+        )
+    return {
+        key: {'status': (fields.get('status') or {}).get('name'), 'summary': fields.get('summary')}
+        for key, fields in issues.items()
+    }
+
+
+def forget(integration: str, key: Any) -> None:
+    """
+    Drop one cached status (e.g. on a webhook about it)
+
+    Args:
+        integration: 'github' or 'jira'
+        key: (repo, number) for github, the issue key for jira
+    """
+    _cache.delete((integration, key))
+
+
+def clear_cache() -> None:
+    """Forget every cached status"""
+    _cache.clear()
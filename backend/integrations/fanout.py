@@ -0,0 +1,131 @@
+"""
+Concurrent calls to several integrations
+
+Creating a change request means a ServiceNow change, a Jira issue and a
+GitHub pull request; none needs another's answer, so fan_out() runs them
+side by side on a bounded thread pool and the whole takes about as long as
+the slowest call. Each call has a deadline; a call that misses it is
+reported with a TimeoutError. A call that had already started keeps running
+in the background (bounded by the transport's timeouts) and is reported as
+StillRunning, whose future a caller that must not lose the outcome (a
+remote create) can keep waiting on.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+
+
+def fan_out_option(name: str, default: Any) -> Any:
+    """Read a CHANGE_FAN_OUT setting"""
+    return getattr(settings, 'CHANGE_FAN_OUT', {}).get(name, default)
+
+
+_executor = ThreadPoolExecutor(
+    max_workers=fan_out_option('MAX_WORKERS', 8),
+    thread_name_prefix='fan-out'
+)
+
+
+class StillRunning(TimeoutError):
+    """A call missed the deadline after it had started; it may still succeed"""
+
+    def __init__(self, message: str, future: Future):
+        super().__init__(message)
+        self.future = future
+
+
+def fan_out(
+    calls: Dict[str, Callable[[], Any]],
+    timeout: Optional[float] = None,
+    on_result: Optional[Callable[[str, Any], None]] = None
+) -> Tuple[Dict[str, Any], Dict[str, Exception]]:
+    """
+    Run independent calls concurrently
+
+    Calls must not use the database: they run on pool threads.
+
+    Args:
+        calls: Name -> zero-argument callable
+        timeout: Seconds to wait for all of them (None waits indefinitely)
+        on_result: Called with (name, result) in the calling thread as soon
+            as each call succeeds, e.g. to record it before the others end
+
+    Returns:
+        (results, errors) dicts keyed by call name; a call that missed the
+        deadline has a TimeoutError, a StillRunning one if it had started
+    """
+    futures = {_executor.submit(call): name for name, call in calls.items()}
+
+    results, errors = {}, {}
+
+    def collect(future):
+        name = futures[future]
+        if future.exception() is not None:
+            errors[name] = future.exception()
+            return
+        results[name] = future.result()
+        if on_result is not None:
+            on_result(name, results[name])
+
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            collect(future)
+    except FuturesTimeoutError:
+        for future, name in futures.items():
+            if name in results or name in errors:
+                continue
+            if future.cancel():
+                errors[name] = TimeoutError(f"not started within {timeout:g}s")
+            elif future.done():
+                collect(future)
+            else:
+                errors[name] = StillRunning(f"no answer within {timeout:g}s", future)
+    return results, errors
+
+
+def creation_payload(number: str, data: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Arguments of each remote create for a new change request
+
+    Jira and GitHub are included when CHANGE_FAN_OUT names a project or
+    repository.
+
+    Args:
+        number: Local change request number
+        data: Collected change request fields
+
+    Returns:
+        Payload for the change_request.fan_out job
+    """
+    payload = {
+        'servicenow': {
+            'short_description': data['short_description'],
+            'description': data['description'],
+            'priority': data['priority'],
+            'planned_start_date': data['planned_start_date'],
+            'planned_end_date': data['planned_end_date'],
+            'correlation_id': number
+        }
+    }
+
+    jira_project = fan_out_option('JIRA_PROJECT', None)
+    if jira_project:
+        payload['jira'] = {
+            'project': jira_project,
+            'summary': data['short_description'],
+            'description': data['description']
+        }
+
+    github_repo = fan_out_option('GITHUB_REPO', None)
+    if github_repo:
+        payload['github'] = {
+            'repo': github_repo,
+            'title': data['short_description'],
+            'body': data['description'],
+            'head': fan_out_option('GITHUB_HEAD', 'change/{number}').format(number=number),
+            'base': fan_out_option('GITHUB_BASE', 'main')
+        }
+
+    return payload
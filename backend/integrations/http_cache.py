@@ -0,0 +1,146 @@
+"""
+Conditional-request cache for integration GETs
+
+Polling GitHub for pull request state would spend one rate-limit unit per
+call. Instead, the last response to each URL is stored in HTTPCacheEntry
+with its ETag and Last-Modified, and the next poll is sent with
+If-None-Match / If-Modified-Since. GitHub answers 304 Not Modified when
+nothing changed, which does not count against the rate limit, and the
+stored body is returned.
+
+Entries are in the database, so they survive restarts and are shared by
+the web and worker processes. The table is bounded to MAX_ENTRIES; the
+least recently used entries are evicted first.
+"""
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from .models import HTTPCacheEntry
+from .transport import HTTPTransport
+
+
+def http_cache_option(name: str, default: Any) -> Any:
+    """Read an HTTP_RESPONSE_CACHE setting"""
+    return getattr(settings, 'HTTP_RESPONSE_CACHE', {}).get(name, default)
+
+
+class ConditionalResponseCache:
+    """
+    Serves GETs through conditional requests and stored responses
+
+    Attributes:
+        namespace: Prefix of the cache keys (one per integration)
+        max_entries: Entries kept across all namespaces
+    """
+
+    def __init__(self, namespace: str, max_entries: int = 10000):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._rate_limit_remaining: Optional[int] = None
+
+    def get_json(self, transport: HTTPTransport, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        GET a JSON resource, revalidating the stored copy if there is one
+
+        Args:
+            transport: Transport of the integration
+            path: URL relative to the transport's base_url
+            params: Query parameters
+
+        Returns:
+            Parsed JSON body (from the server, or from the cache on a 304)
+
+        Raises:
+            requests.RequestException: The request failed
+        """
+        url = requests.Request('GET', transport.url(path), params=params).prepare().url
+        key = hashlib.sha256(f"{self.namespace} {url}".encode()).hexdigest()
+        entry = HTTPCacheEntry.objects.filter(key=key).first()
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        response = transport.get(url, headers=headers, raise_for_status=False)
+        self._note_rate_limit(response)
+        now = timezone.now()
+
+        if response.status_code == 304 and entry is not None:
+            # A 304 may carry a newer validator
+            HTTPCacheEntry.objects.filter(key=key).update(
+                etag=response.headers.get('ETag', entry.etag),
+                used_at=now
+            )
+            self._count('hits')
+            return json.loads(entry.body)
+
+        response.raise_for_status()
+        self._count('misses')
+
+        etag = response.headers.get('ETag', '')
+        last_modified = response.headers.get('Last-Modified', '')
+        if etag or last_modified:
+            HTTPCacheEntry.objects.update_or_create(
+                key=key,
+                defaults={
+                    'namespace': self.namespace,
+                    'url': url,
+                    'etag': etag[:255],
+                    'last_modified': last_modified[:64],
+                    'body': response.text,
+                    'fetched_at': now,
+                    'used_at': now
+                }
+            )
+            if entry is None:
+                self._evict()
+        elif entry is not None:
+            # The resource no longer sends validators
+            HTTPCacheEntry.objects.filter(key=key).delete()
+        return response.json()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters of this process since start (or reset_stats())"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['rate_limit_remaining'] = self._rate_limit_remaining
+        requests_made = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / requests_made if requests_made else 0.0
+        return stats
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._counters = dict.fromkeys(self._counters, 0)
+
+    def clear(self) -> None:
+        """Drop every stored response of this namespace"""
+        HTTPCacheEntry.objects.filter(namespace=self.namespace).delete()
+
+    def _evict(self) -> None:
+        excess = HTTPCacheEntry.objects.count() - self.max_entries
+        if excess <= 0:
+            return
+        oldest = list(HTTPCacheEntry.objects.order_by('used_at').values_list('key', flat=True)[:excess])
+        deleted, _ = HTTPCacheEntry.objects.filter(key__in=oldest).delete()
+        self._count('evictions', deleted)
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def _note_rate_limit(self, response: requests.Response) -> None:
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        if remaining is not None and remaining.isdigit():
+            with self._lock:
+                self._rate_limit_remaining = int(remaining)
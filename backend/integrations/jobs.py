@@ -0,0 +1,558 @@
+"""
+Durable queue for outbound integration calls
+
+The chat turn records what has to happen in ServiceNow, Jira or GitHub as
+IntegrationJob rows (enqueue()) and returns at once; run_integration_worker
+claims the rows in batches and makes the calls. Failed calls are retried with
+exponential backoff and end up dead-lettered (status 'dead') after
+max_attempts.
+
+Claiming uses SELECT ... FOR UPDATE SKIP LOCKED where the database supports
+it, so workers never wait for each other's rows. On SQLite the transaction
+already holds the write lock and workers poll for new rows.
+
+Delivery is at least once: a worker that dies after the remote call but
+before recording success leaves the job to be retried once its lease runs
+out.
+"""
+import logging
+import random
+import select
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from datetime import timedelta
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .fanout import StillRunning, fan_out, fan_out_option
+from .models import ChangeRequest, IntegrationJob
+from .services import get_github_service, get_jira_service, get_servicenow_service
+from .transport import is_client_error
+from .status_cache import change_status_cache
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'integration_jobs'
+
+# kind -> (handler, on_dead callback)
+JOB_HANDLERS: Dict[str, tuple] = {}
+
+# Remote creates of a change_request.fan_out job, in the order their link
+# fields are applied
+FAN_OUT_TARGETS = ('servicenow', 'jira', 'github')
+
+
+class PermanentJobError(Exception):
+    """Raised by a job handler when retrying cannot help"""
+
+
+class JobDeferred(Exception):
+    """
+    Raised by a job handler that cannot run yet
+
+    The job runs again after delay seconds; the attempt is not counted.
+    """
+
+    def __init__(self, message: str, delay: float):
+        super().__init__(message)
+        self.delay = delay
+
+
+def job_option(name: str, default: Any) -> Any:
+    """Read an INTEGRATION_JOBS setting"""
+    return getattr(settings, 'INTEGRATION_JOBS', {}).get(name, default)
+
+
+def register(kind: str, on_dead: Optional[Callable[[IntegrationJob], None]] = None):
+    """
+    Register a job handler
+
+    The handler receives the claimed job, runs outside any transaction, and
+    returns a JSON-serializable result. on_dead runs once the job is
+    dead-lettered.
+
+    Args:
+        kind: Job type name
+        on_dead: Optional callback for dead-lettered jobs
+    """
+    def decorator(handler):
+        JOB_HANDLERS[kind] = (handler, on_dead)
+        return handler
+    return decorator
+
+
+def enqueue(
+    kind: str,
+    payload: Dict[str, Any],
+    change_request: Optional[ChangeRequest] = None,
+    priority: int = 3,
+    delay: float = 0
+) -> IntegrationJob:
+    """
+    Queue an integration call
+
+    Call inside the transaction that writes the change, so the job exists
+    exactly when the change does.
+
+    Args:
+        kind: Registered job type
+        payload: Handler arguments (JSON-serializable)
+        change_request: Change request the job belongs to
+        priority: 1 (first) to 4 (last)
+        delay: Seconds before the job may run
+
+    Returns:
+        The new job
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown integration job kind: {kind}")
+
+    job = IntegrationJob.objects.create(
+        kind=kind,
+        payload=payload,
+        change_request=change_request,
+        priority=priority,
+        max_attempts=job_option('MAX_ATTEMPTS', 5),
+        run_after=timezone.now() + timedelta(seconds=delay)
+    )
+    transaction.on_commit(_notify_workers)
+    return job
+
+
+def schedule_change_update(change_request: ChangeRequest, changes: Dict[str, Any]) -> IntegrationJob:
+    """
+    Queue a ServiceNow update of changed fields, coalesced per change request
+
+    Edits made while an earlier write for the same change is still waiting
+    ride along with it: a pending fan-out whose ServiceNow create has not run
+    yet picks up the new values, and a pending update (held back
+    UPDATE_COALESCE_WINDOW seconds) gains the field names. The update job reads the values when it runs, so each remote
+    write sends the latest state of just the changed fields.
+
+    Call inside the transaction that saves the local change.
+
+    Args:
+        change_request: The (already saved) change request
+        changes: Changed field names and their new values
+
+    Returns:
+        The job that will carry the changes
+    """
+    waiting = IntegrationJob.objects.filter(
+        change_request=change_request,
+        status=IntegrationJob.STATUS_PENDING
+    )
+
+    values = {field: str(value) for field, value in changes.items()}
+    create_job = waiting.filter(kind='change_request.fan_out').order_by('id').first()
+    if create_job is not None and 'servicenow' not in create_job.payload.get('done', {}):
+        payload = {**create_job.payload, 'servicenow': {**create_job.payload['servicenow'], **values}}
+        # Conditional, so a job claimed meanwhile is left alone
+        if waiting.filter(id=create_job.id).update(payload=payload, updated_at=timezone.now()):
+            return create_job
+
+    update_job = waiting.filter(kind='servicenow.update_change_request').order_by('id').first()
+    if update_job is not None:
+        fields = sorted(set(update_job.payload['fields']) | set(changes))
+        if waiting.filter(id=update_job.id).update(payload={'fields': fields}, updated_at=timezone.now()):
+            return update_job
+
+    return enqueue(
+        'servicenow.update_change_request',
+        {'fields': sorted(changes)},
+        change_request=change_request,
+        priority=int(change_request.priority),
+        delay=job_option('UPDATE_COALESCE_WINDOW', 10)
+    )
+
+
+def _notify_workers() -> None:
+    """Wake idle PostgreSQL workers; SQLite workers find the job when polling"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f"NOTIFY {NOTIFY_CHANNEL}")
+
+
+def claim_jobs(worker_id: str, batch_size: int) -> List[IntegrationJob]:
+    """
+    Claim due jobs for this worker, most urgent first
+
+    Args:
+        worker_id: Name recorded in locked_by
+        batch_size: Maximum jobs to claim
+
+    Returns:
+        Claimed jobs, already marked running
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = (
+            IntegrationJob.objects
+            .filter(status=IntegrationJob.STATUS_PENDING, run_after__lte=now)
+            .order_by('priority', 'run_after', 'id')
+        )
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        jobs = list(due[:batch_size])
+        if not jobs:
+            return []
+
+        IntegrationJob.objects.filter(id__in=[job.id for job in jobs]).update(
+            status=IntegrationJob.STATUS_RUNNING,
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+            updated_at=now
+        )
+
+    for job in jobs:
+        job.status = IntegrationJob.STATUS_RUNNING
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.attempts += 1
+    return jobs
+
+
+def run_job(job: IntegrationJob) -> bool:
+    """
+    Run a claimed job and record the outcome
+
+    Args:
+        job: Job returned by claim_jobs()
+
+    Returns:
+        True if the job succeeded
+    """
+    handler, on_dead = JOB_HANDLERS.get(job.kind, (None, None))
+    try:
+        if handler is None:
+            raise PermanentJobError(f"No handler registered for {job.kind}")
+        result = handler(job)
+    except JobDeferred as deferral:
+        _defer(job, deferral)
+        return False
+    except Exception as error:
+        permanent = isinstance(error, PermanentJobError)
+        _record_failure(job, error, permanent, on_dead)
+        return False
+
+    with transaction.atomic():
+        IntegrationJob.objects.filter(id=job.id, locked_by=job.locked_by).update(
+            status=IntegrationJob.STATUS_SUCCEEDED,
+            result=result,
+            last_error='',
+            locked_at=None,
+            updated_at=timezone.now()
+        )
+    return True
+
+
+def _record_failure(job: IntegrationJob, error: Exception, permanent: bool, on_dead) -> None:
+    """Schedule a retry with backoff, or dead-letter the job"""
+    message = f"{type(error).__name__}: {error}"
+    now = timezone.now()
+
+    if permanent or job.attempts >= job.max_attempts:
+        logger.error("Integration job %s (%s) dead after %s attempts: %s", job.id, job.kind, job.attempts, message)
+        with transaction.atomic():
+            IntegrationJob.objects.filter(id=job.id, locked_by=job.locked_by).update(
+                status=IntegrationJob.STATUS_DEAD,
+                last_error=message,
+                locked_at=None,
+                updated_at=now
+            )
+            job.status = IntegrationJob.STATUS_DEAD
+            job.last_error = message
+            if on_dead is not None:
+                on_dead(job)
+        return
+
+    # A rate-limited call retries once its quota is back
+    delay = max(backoff_delay(job.attempts), getattr(error, 'retry_after', 0))
+    logger.warning("Integration job %s (%s) failed, retrying in %.0fs: %s", job.id, job.kind, delay, message)
+    IntegrationJob.objects.filter(id=job.id, locked_by=job.locked_by).update(
+        status=IntegrationJob.STATUS_PENDING,
+        run_after=now + timedelta(seconds=delay),
+        last_error=message,
+        locked_at=None,
+        updated_at=now
+    )
+
+
+def _defer(job: IntegrationJob, deferral: JobDeferred) -> None:
+    """Put a job that cannot run yet back in the queue, giving back its attempt"""
+    logger.info("Integration job %s (%s) deferred %.0fs: %s", job.id, job.kind, deferral.delay, deferral)
+    now = timezone.now()
+    IntegrationJob.objects.filter(id=job.id, locked_by=job.locked_by).update(
+        status=IntegrationJob.STATUS_PENDING,
+        attempts=F('attempts') - 1,
+        run_after=now + timedelta(seconds=deferral.delay),
+        locked_at=None,
+        updated_at=now
+    )
+
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff with jitter: base * 2^(attempts-1), capped"""
+    base = job_option('BACKOFF_BASE', 5)
+    cap = job_option('BACKOFF_MAX', 600)
+    return min(cap, base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+
+def release_stale_jobs() -> int:
+    """
+    Return jobs of crashed workers to the queue
+
+    A running job whose lease (LEASE_TIMEOUT seconds) expired is pending
+    again; the attempt it used still counts.
+
+    Returns:
+        Number of jobs released
+    """
+    cutoff = timezone.now() - timedelta(seconds=job_option('LEASE_TIMEOUT', 300))
+    return IntegrationJob.objects.filter(
+        status=IntegrationJob.STATUS_RUNNING,
+        locked_at__lt=cutoff
+    ).update(status=IntegrationJob.STATUS_PENDING, locked_at=None, updated_at=timezone.now())
+
+
+def wait_for_jobs(timeout: float) -> None:
+    """
+    Sleep until a job may be ready
+
+    PostgreSQL workers LISTEN and wake on enqueue's NOTIFY; other databases
+    simply wait for the poll interval.
+    """
+    if connection.vendor == 'postgresql':
+        connection.ensure_connection()
+        raw = connection.connection
+        if hasattr(raw, 'poll') and hasattr(raw, 'notifies'):
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            if select.select([raw], [], [], timeout) != ([], [], []):
+                raw.poll()
+                del raw.notifies[:]
+            return
+
+    # Polling fallback
+    time.sleep(timeout)
+
+
+def requeue(jobs) -> int:
+    """Put dead-lettered jobs back in the queue with fresh attempts"""
+    return jobs.filter(status=IntegrationJob.STATUS_DEAD).update(
+        status=IntegrationJob.STATUS_PENDING,
+        attempts=0,
+        run_after=timezone.now(),
+        locked_at=None,
+        updated_at=timezone.now()
+    )
+
+
+# Job handlers
+
+def _update_change_request(job: IntegrationJob, **fields) -> None:
+    """Update the job's change request and drop its cached status"""
+    if job.change_request_id:
+        ChangeRequest.objects.filter(id=job.change_request_id).update(updated_at=timezone.now(), **fields)
+        change_status_cache.invalidate(job.change_request_id)
+
+
+def _call(func, *args, **kwargs):
+    """Make a service call; a 4xx response will not improve on retry"""
+    try:
+        return func(*args, **kwargs)
+    except Exception as error:
+        if is_client_error(error):
+            raise PermanentJobError(str(error)) from error
+        raise
+
+
+def _create_remote(name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    One remote create of a fan-out (runs on a fan-out thread, no ORM)
+
+    Returns:
+        The ChangeRequest fields linking to what was created
+    """
+    if name == 'servicenow':
+        try:
+            service = get_servicenow_service()
+        except ValueError:
+            # Not configured (local development): the local record is the change
+            return {'state': 'New'}
+        snow_response = _call(service.create_change_request, **arguments)
+        return {
+            'servicenow_sys_id': snow_response['sys_id'],
+            'number': snow_response['number'],
+            'state': snow_response.get('state', 'New')
+        }
+
+    if name == 'jira':
+        try:
+            service = get_jira_service()
+        except ValueError as error:
+            raise PermanentJobError(str(error))
+        issue = _call(service.create_issue, **arguments)
+        return {'jira_issue_key': issue['key']}
+
+    if name == 'github':
+        try:
+            service = get_github_service()
+        except ValueError as error:
+            raise PermanentJobError(str(error))
+        pull_request = _call(service.create_pull_request, **arguments)
+        return {'github_repo': arguments['repo'], 'github_pr_number': pull_request['number']}
+
+    raise PermanentJobError(f"Unknown fan-out target: {name}")
+
+
+def _fan_out_dead(job: IntegrationJob) -> None:
+    if 'servicenow' not in job.payload.get('done', {}):
+        _update_change_request(job, state='Sync Failed')
+
+
+def _renew_lease(job: IntegrationJob) -> None:
+    """Keep a long-running job from being handed to another worker"""
+    job.locked_at = timezone.now()
+    IntegrationJob.objects.filter(id=job.id, locked_by=job.locked_by).update(locked_at=job.locked_at)
+
+
+def _wait_running(job: IntegrationJob, future: Future) -> Any:
+    """
+    Wait for a call that outlived its deadline, renewing the job's lease
+
+    The call is bounded by the transport's timeouts, so this ends.
+    """
+    while True:
+        try:
+            return future.result(timeout=job_option('LEASE_TIMEOUT', 300) / 3)
+        except FuturesTimeoutError:
+            _renew_lease(job)
+
+
+@register('change_request.fan_out', on_dead=_fan_out_dead)
+def change_request_fan_out(job: IntegrationJob) -> Dict[str, Any]:
+    """
+    Create the ServiceNow change, Jira issue and GitHub PR concurrently
+
+    The payload holds the arguments of each create (see
+    integrations.fanout.creation_payload). Each create that succeeds is
+    saved in payload['done'] as soon as it returns, before its links are
+    written, so a retry only repeats the creates that failed. A create
+    still running at CALL_TIMEOUT is waited for rather than counted as
+    failed: it may yet succeed, and repeating it would create the record
+    twice.
+    """
+    done = dict(job.payload.get('done', {}))
+
+    def record(name: str, result: Dict[str, Any]) -> None:
+        done[name] = result
+        job.payload = {**job.payload, 'done': dict(done)}
+        IntegrationJob.objects.filter(id=job.id).update(payload=job.payload)
+
+    calls = {
+        name: partial(_create_remote, name, job.payload[name])
+        for name in FAN_OUT_TARGETS
+        if name in job.payload and name not in done
+    }
+    _, errors = fan_out(calls, timeout=fan_out_option('CALL_TIMEOUT', 20), on_result=record)
+
+    for name, error in list(errors.items()):
+        if isinstance(error, StillRunning):
+            logger.warning("Integration job %s: %s create still running after its deadline, waiting", job.id, name)
+            try:
+                record(name, _wait_running(job, error.future))
+            except Exception as late_error:
+                errors[name] = late_error
+            else:
+                del errors[name]
+
+    # Links of every create not written yet, including those of an earlier
+    # attempt whose local update failed
+    linked = job.payload.get('linked', [])
+    unlinked = [name for name in FAN_OUT_TARGETS if name in done and name not in linked]
+    if unlinked:
+        fields = {}
+        for name in unlinked:
+            fields.update(done[name])
+        _update_change_request(job, **fields)
+        job.payload = {**job.payload, 'linked': linked + unlinked}
+        IntegrationJob.objects.filter(id=job.id).update(payload=job.payload)
+        if 'servicenow' in unlinked:
+            # Updates deferred until the change existed can go now
+            IntegrationJob.objects.filter(
+                change_request_id=job.change_request_id,
+                kind='servicenow.update_change_request',
+                status=IntegrationJob.STATUS_PENDING
+            ).update(run_after=timezone.now())
+
+    if errors:
+        summary = '; '.join(f"{name}: {type(error).__name__}: {error}" for name, error in errors.items())
+        if all(isinstance(error, PermanentJobError) for error in errors.values()):
+            raise PermanentJobError(summary)
+        raise RuntimeError(summary)
+    return done
+
+
+@register('servicenow.update_change_request')
+def servicenow_update_change_request(job: IntegrationJob) -> Dict[str, Any]:
+    """PATCH the fields listed in the payload with their current local values"""
+    change_request = ChangeRequest.objects.filter(id=job.change_request_id).first()
+    if change_request is None:
+        raise PermanentJobError("Change request no longer exists")
+    if change_request.state == 'Sync Failed':
+        raise PermanentJobError(f"{change_request.number} was never created in ServiceNow")
+    if change_request.state == 'Pending':
+        message = f"{change_request.number} is not in ServiceNow yet"
+        creating = IntegrationJob.objects.filter(
+            change_request_id=change_request.id,
+            kind='change_request.fan_out',
+            status__in=[IntegrationJob.STATUS_PENDING, IntegrationJob.STATUS_RUNNING]
+        ).exists()
+        if creating:
+            # The fan-out wakes this job once it has linked the change
+            raise JobDeferred(message, delay=job_option('UPDATE_COALESCE_WINDOW', 10))
+        raise RuntimeError(message)
+
+    try:
+        service = get_servicenow_service()
+    except ValueError:
+        return {'skipped': 'ServiceNow not configured'}
+
+    fields = {field: getattr(change_request, field) for field in job.payload['fields']}
+    _call(service.update_change_request, change_request.servicenow_sys_id, **fields)
+    return {'fields': sorted(fields)}
+
+
+@register('jira.create_issue')
+def jira_create_issue(job: IntegrationJob) -> Dict[str, Any]:
+    """Create a Jira issue and link it to the change request"""
+    try:
+        service = get_jira_service()
+    except ValueError as error:
+        raise PermanentJobError(str(error))
+
+    issue = _call(service.create_issue, **job.payload)
+
+    _update_change_request(job, jira_issue_key=issue['key'])
+    return {'key': issue['key']}
+
+
+@register('github.create_pull_request')
+def github_create_pull_request(job: IntegrationJob) -> Dict[str, Any]:
+    """Open a GitHub pull request and link it to the change request"""
+    try:
+        service = get_github_service()
+    except ValueError as error:
+        raise PermanentJobError(str(error))
+
+    pull_request = _call(service.create_pull_request, **job.payload)
+
+    _update_change_request(job, github_repo=job.payload['repo'], github_pr_number=pull_request['number'])
+    return {'number': pull_request['number']}
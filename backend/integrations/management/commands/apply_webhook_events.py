@@ -0,0 +1,65 @@
+"""
+Apply webhook events from the inbox to change requests
+"""
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from integrations.webhooks import apply_pending, purge_processed, webhook_option
+
+
+class Command(BaseCommand):
+    help = (
+        "Drain the WebhookEvent inbox in batches: skip redelivered events, "
+        "merge the events per change request and write them with bulk updates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=webhook_option('BATCH_SIZE', 500))
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=webhook_option('POLL_INTERVAL', 1),
+            help='Seconds to wait when the inbox is empty'
+        )
+        parser.add_argument('--once', action='store_true', help='Exit once the inbox is empty')
+
+    def handle(self, *args, **options):
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        totals = {}
+        last_purge = 0.0
+
+        while not self._stopping:
+            close_old_connections()
+
+            if time.monotonic() - last_purge > 3600:
+                purged = purge_processed(webhook_option('RETENTION_DAYS', 14))
+                if purged:
+                    self.stdout.write(f"Purged {purged} processed event(s)")
+                last_purge = time.monotonic()
+
+            counts = apply_pending(options['batch_size'])
+            if not counts:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            for outcome, count in counts.items():
+                totals[outcome] = totals.get(outcome, 0) + count
+            self.stdout.write(
+                "Batch: " + ", ".join(f"{count} {outcome}" for outcome, count in sorted(counts.items()))
+            )
+
+        self.stdout.write(
+            "Webhook events processed: "
+            + (", ".join(f"{count} {outcome}" for outcome, count in sorted(totals.items())) or "none")
+        )
+
+    def _stop(self, signum, frame):
+        self._stopping = True
@@ -0,0 +1,68 @@
+"""
+Create Jira issues for change requests that do not have one yet
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from integrations.fanout import fan_out_option
+from integrations.models import ChangeRequest
+from integrations.services import get_jira_service
+from integrations.status_cache import change_status_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-create a Jira issue for every change request without one and "
+        "store the issue keys. Items that fail are listed and left unlinked."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--project',
+            default=fan_out_option('JIRA_PROJECT', None),
+            help='Jira project key (default: CHANGE_JIRA_PROJECT)'
+        )
+        parser.add_argument('--state', help='Only change requests in this state')
+        parser.add_argument('--limit', type=int, default=None, help='At most this many change requests')
+        parser.add_argument('--issue-type', default=None, help='Issue type name (default: JIRA_ISSUE_TYPE)')
+
+    def handle(self, *args, **options):
+        if not options['project']:
+            raise CommandError("No Jira project: pass --project or set CHANGE_JIRA_PROJECT")
+        try:
+            service = get_jira_service()
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        change_requests = ChangeRequest.objects.filter(jira_issue_key__isnull=True).order_by('created_at', 'id')
+        if options['state']:
+            change_requests = change_requests.filter(state=options['state'])
+        change_requests = list(change_requests[:options['limit']])
+        if not change_requests:
+            self.stdout.write("Every change request already has a Jira issue")
+            return
+
+        results = service.create_issues([
+            {
+                'project': options['project'],
+                'summary': f"{change_request.number}: {change_request.short_description}",
+                'description': change_request.description,
+                'issue_type': options['issue_type']
+            }
+            for change_request in change_requests
+        ])
+
+        linked = []
+        for change_request, result in zip(change_requests, results):
+            if 'error' in result:
+                self.stderr.write(f"{change_request.number}: {result['error']}")
+                continue
+            change_request.jira_issue_key = result['key']
+            linked.append(change_request)
+
+        ChangeRequest.objects.bulk_update(linked, ['jira_issue_key'])
+        for change_request in linked:
+            change_status_cache.invalidate(change_request.id)
+
+        self.stdout.write(
+            f"Linked {len(linked)} of {len(change_requests)} change request(s) to Jira issues in {options['project']}"
+        )
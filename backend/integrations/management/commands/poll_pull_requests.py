@@ -0,0 +1,76 @@
+"""
+Poll the GitHub pull requests linked to change requests
+"""
+import signal
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from integrations.models import ChangeRequest
+from integrations.services import get_github_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetch the state of every linked GitHub pull request. Requests are "
+        "conditional, so unchanged PRs are served from the HTTP response "
+        "cache and cost no rate limit. With --interval, keeps polling."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Seconds between polls; 0 polls once (default: %(default)s)'
+        )
+        parser.add_argument('--quiet', action='store_true', help='Only print the summary of each poll')
+
+    def handle(self, *args, **options):
+        try:
+            service = get_github_service()
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        while not self._stopping:
+            close_old_connections()
+            service.responses.reset_stats()
+            started = time.perf_counter()
+            links = ChangeRequest.objects.filter(
+                github_repo__isnull=False,
+                github_pr_number__isnull=False
+            ).values_list('number', 'github_repo', 'github_pr_number')
+
+            failed = 0
+            for number, repo, pr_number in links.iterator():
+                try:
+                    pull_request = service.get_pull_request(repo, pr_number)
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f"{number}: {repo}#{pr_number} failed: {error}")
+                    continue
+                if not options['quiet']:
+                    state = 'merged' if pull_request.get('merged_at') else pull_request.get('state')
+                    self.stdout.write(f"{number}: {repo}#{pr_number} {state}")
+
+            stats = service.responses.stats()
+            self.stdout.write(
+                f"Polled {stats['hits'] + stats['misses']} pull request(s) in "
+                f"{time.perf_counter() - started:.1f}s: {stats['hits']} unchanged (304), "
+                f"{stats['misses']} fetched, {failed} failed; "
+                f"rate limit remaining {stats['rate_limit_remaining'] if stats['rate_limit_remaining'] is not None else '-'}"
+            )
+
+            if not options['interval']:
+                break
+            deadline = time.monotonic() + options['interval']
+            while not self._stopping and time.monotonic() < deadline:
+                time.sleep(min(1, deadline - time.monotonic()))
+
+    def _stop(self, signum, frame):
+        self._stopping = True
@@ -0,0 +1,47 @@
+"""
+Show how often integration calls were throttled
+"""
+import json
+
+from django.core.management.base import BaseCommand
+
+from integrations.ratelimit import rate_limit_options, rate_limit_stats
+from integrations.services import get_github_service, get_jira_service, get_servicenow_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the rate limiter counters of each configured integration. "
+        "Totals of all processes need INTEGRATION_RATE_LIMITS['CACHE_ALIAS']; "
+        "without it only this process is counted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Print the counters as JSON')
+
+    def handle(self, *args, **options):
+        # Creating the services registers their limiters
+        for name, get_service in (
+            ('servicenow', get_servicenow_service),
+            ('jira', get_jira_service),
+            ('github', get_github_service),
+        ):
+            try:
+                get_service()
+            except ValueError:
+                self.stderr.write(f"{name}: not configured")
+
+        stats = rate_limit_stats()
+        if options['json']:
+            self.stdout.write(json.dumps(stats, indent=2))
+            return
+
+        for name, counters in sorted(stats.items()):
+            integration = name.split(':')[0]
+            shared = 'all processes' if rate_limit_options(integration)['CACHE_ALIAS'] else 'this process only'
+            throttled = counters['throttled'] / counters['calls'] if counters['calls'] else 0.0
+            self.stdout.write(
+                f"{name} ({shared}): {counters['calls']} calls, {counters['throttled']} throttled "
+                f"({throttled:.1%}), {counters['rejected']} rejected, {counters['overloaded']} overloaded; "
+                f"concurrency limit {counters['concurrency_limit']}, paused {counters['paused_for']}s"
+            )
@@ -0,0 +1,68 @@
+"""
+Process queued integration jobs (ServiceNow, Jira, GitHub)
+"""
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from integrations.jobs import claim_jobs, job_option, release_stale_jobs, run_job, wait_for_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Claim IntegrationJob rows in batches and run them, retrying failures "
+        "with backoff. Run one or more of these next to the web workers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=job_option('BATCH_SIZE', 10))
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=job_option('POLL_INTERVAL', 2),
+            help='Seconds to wait when the queue is empty'
+        )
+        parser.add_argument('--worker-id', default=f"{socket.gethostname()}:{os.getpid()}")
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due')
+
+    def handle(self, *args, **options):
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        worker_id = options['worker_id']
+        self.stdout.write(f"Integration worker {worker_id} started")
+        succeeded = failed = 0
+        last_release = 0.0
+
+        while not self._stopping:
+            close_old_connections()
+
+            if time.monotonic() - last_release > job_option('LEASE_TIMEOUT', 300) / 2:
+                released = release_stale_jobs()
+                if released:
+                    self.stdout.write(f"Released {released} stale job(s)")
+                last_release = time.monotonic()
+
+            jobs = claim_jobs(worker_id, options['batch_size'])
+            if not jobs:
+                if options['once']:
+                    break
+                wait_for_jobs(options['poll_interval'])
+                continue
+
+            for job in jobs:
+                # Finish the claimed batch even when asked to stop
+                if run_job(job):
+                    succeeded += 1
+                else:
+                    failed += 1
+
+        self.stdout.write(f"Integration worker {worker_id} stopped: {succeeded} succeeded, {failed} failed")
+
+    def _stop(self, signum, frame):
+        self._stopping = True
@@ -0,0 +1,128 @@
+"""
+Stress the local change number allocator from several processes at once
+"""
+import multiprocessing
+import random
+import time
+import uuid
+from collections import Counter
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection, transaction
+
+from integrations.models import ChangeRequest
+from integrations.numbering import LOCAL_CHANGE_PREFIX, NumberAllocator
+
+MARKER = 'stress_change_numbers'
+
+
+class _Rollback(Exception):
+    """Raised inside a transaction to roll it back on purpose"""
+
+
+def _legacy_number():
+    """The previous max+1 fallback, for comparison"""
+    last_cr = ChangeRequest.objects.all().order_by('-id').first()
+    next_number = 1 if not last_cr else int(last_cr.number.replace('CHG', '')) + 1
+    return f"CHG{next_number:07d}"
+
+
+def _worker(task):
+    """
+    Create change requests in one process, each in its own transaction
+
+    Returns:
+        (committed numbers, unique violations, queries issued) tuple
+    """
+    count, block_size, rollback_rate, legacy, seed = task
+    allocator = NumberAllocator('change_request', prefix=LOCAL_CHANGE_PREFIX, block_size=block_size)
+    rng = random.Random(seed)
+    committed, collisions, queries = [], 0, 0
+
+    for _ in range(count):
+        try:
+            with transaction.atomic():
+                before = len(connection.queries_log)
+                number = _legacy_number() if legacy else allocator.allocate()
+                queries += len(connection.queries_log) - before
+                ChangeRequest.objects.create(
+                    servicenow_sys_id=uuid.uuid4().hex,
+                    number=number,
+                    short_description=MARKER,
+                    description='',
+                    state='New',
+                    priority='4'
+                )
+                if rng.random() < rollback_rate:
+                    raise _Rollback
+            committed.append(number)
+        except _Rollback:
+            pass
+        except IntegrityError:
+            collisions += 1
+
+    return committed, collisions, queries
+
+
+class Command(BaseCommand):
+    help = (
+        "Create change requests from several processes concurrently and "
+        "check that no change number is handed out twice. Writes to the "
+        "configured database and removes its rows afterwards; "
+        "integrations.tests.NumberAllocatorTests is the automated version."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8)
+        parser.add_argument('--per-process', type=int, default=250, help='Creates per process')
+        parser.add_argument('--block-size', type=int, default=20, help='Numbers reserved per query')
+        parser.add_argument(
+            '--rollback-rate',
+            type=float,
+            default=0.1,
+            help='Share of transactions rolled back after taking a number'
+        )
+        parser.add_argument(
+            '--legacy',
+            action='store_true',
+            help='Use the previous max+1 lookup instead of the allocator'
+        )
+        parser.add_argument('--keep', action='store_true', help='Keep the created rows')
+
+    def handle(self, *args, **options):
+        tasks = [
+            (options['per_process'], options['block_size'], options['rollback_rate'], options['legacy'], seed)
+            for seed in range(options['processes'])
+        ]
+
+        started = time.perf_counter()
+        # spawn: each worker sets Django up and opens its own connection
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(options['processes'], initializer=django.setup) as pool:
+            results = pool.map(_worker, tasks)
+        elapsed = time.perf_counter() - started
+
+        numbers = [number for committed, _, _ in results for number in committed]
+        collisions = sum(collisions for _, collisions, _ in results)
+        attempts = options['processes'] * options['per_process']
+        duplicates = [number for number, seen in Counter(numbers).items() if seen > 1]
+        stored = ChangeRequest.objects.filter(short_description=MARKER).count()
+
+        self.stdout.write(
+            f"{options['processes']} processes, {attempts} creates in {elapsed:.1f}s "
+            f"({attempts / elapsed:.0f}/s)"
+        )
+        self.stdout.write(f"Committed: {len(numbers)}, stored: {stored}")
+        self.stdout.write(f"Unique violations: {collisions}")
+        self.stdout.write(f"Duplicate numbers: {len(duplicates)}")
+        if not options['legacy']:
+            queries = sum(queries for _, _, queries in results)
+            self.stdout.write(f"Allocator queries (DEBUG only): {queries}")
+
+        if not options['keep']:
+            ChangeRequest.objects.filter(short_description=MARKER).delete()
+
+        if duplicates or collisions or stored != len(numbers):
+            raise CommandError("Change numbers were handed out more than once.")
+        self.stdout.write(self.style.SUCCESS("No duplicate change numbers."))
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:40
+
+from django.db import migrations, models
+
+SEQUENCE_NAME = 'change_request'
+PG_SEQUENCE = 'integrations_change_request_number_seq'
+LOCAL_CHANGE_PREFIX = 'LCHG'
+
+
+def seed_change_request_numbers(apps, schema_editor):
+    """
+    Give duplicate numbers a local LCHG number and create the allocator's counter
+
+    Duplicates came from the old max+1 fallback racing under concurrency; the
+    oldest record keeps its number. Locally allocated numbers use the LCHG
+    prefix and never collide with the CHG numbers ServiceNow hands out, so
+    the counter starts at 1 whatever CHG numbers exist.
+    """
+    ChangeRequest = apps.get_model('integrations', 'ChangeRequest')
+    NumberSequence = apps.get_model('integrations', 'NumberSequence')
+    db_alias = schema_editor.connection.alias
+
+    records = ChangeRequest.objects.using(db_alias).order_by('id').values_list('id', 'number')
+    next_value = 1
+
+    seen = set()
+    for record_id, number in records:
+        if number in seen:
+            number = f"{LOCAL_CHANGE_PREFIX}{next_value:07d}"
+            next_value += 1
+            ChangeRequest.objects.using(db_alias).filter(id=record_id).update(number=number)
+        seen.add(number)
+
+    NumberSequence.objects.using(db_alias).create(name=SEQUENCE_NAME, next_value=next_value)
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f"CREATE SEQUENCE {PG_SEQUENCE} START WITH {next_value}")
+
+
+def drop_change_request_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f"DROP SEQUENCE IF EXISTS {PG_SEQUENCE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NumberSequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('next_value', models.BigIntegerField(default=1, help_text='First number not yet handed out to any worker')),
+            ],
+            options={
+                'verbose_name': 'Number Sequence',
+                'verbose_name_plural': 'Number Sequences',
+            },
+        ),
+        migrations.RunPython(seed_change_request_numbers, drop_change_request_sequence),
+        migrations.RemoveIndex(
+            model_name='changerequest',
+            name='integration_number_93e312_idx',
+        ),
+        migrations.AlterField(
+            model_name='changerequest',
+            name='number',
+            field=models.CharField(help_text='Change request number (e.g., CHG0030001)', max_length=40, unique=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0003_integrationjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='changerequest',
+            index=models.Index(fields=['created_at', 'id'], name='integration_created_ae1d18_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changerequest',
+            index=models.Index(fields=['state', 'created_at', 'id'], name='integration_state_87d609_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changerequest',
+            index=models.Index(fields=['priority', 'created_at', 'id'], name='integration_priorit_86f07e_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0004_changerequest_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncCheckpoint',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('watermark', models.CharField(blank=True, default='', help_text='Remote update time of the last record applied (YYYY-MM-DD HH:MM:SS, UTC)', max_length=19)),
+                ('last_key', models.CharField(blank=True, default='', help_text='Key of the last record applied at the watermark', max_length=32)),
+                ('records', models.BigIntegerField(default=0, help_text='Records applied since the checkpoint was created')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Sync Checkpoint',
+                'verbose_name_plural': 'Sync Checkpoints',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0005_sync_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HTTPCacheEntry',
+            fields=[
+                ('key', models.CharField(help_text='SHA-256 of namespace and URL', max_length=64, primary_key=True, serialize=False)),
+                ('namespace', models.CharField(help_text='Integration the response came from', max_length=50)),
+                ('url', models.TextField()),
+                ('etag', models.CharField(blank=True, default='', max_length=255)),
+                ('last_modified', models.CharField(blank=True, default='', max_length=64)),
+                ('body', models.TextField(help_text='Response body (JSON)')),
+                ('fetched_at', models.DateTimeField(help_text='When the body was last sent by the server')),
+                ('used_at', models.DateTimeField(help_text='Last time the entry was served (LRU eviction order)')),
+            ],
+            options={
+                'verbose_name': 'HTTP Cache Entry',
+                'verbose_name_plural': 'HTTP Cache Entries',
+                'indexes': [models.Index(fields=['used_at'], name='integration_used_at_08dbc2_idx')],
+            },
+        ),
+    ]
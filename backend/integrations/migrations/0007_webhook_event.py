@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0006_http_cache_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('servicenow', 'ServiceNow'), ('jira', 'Jira'), ('github', 'GitHub')], max_length=20)),
+                ('event_type', models.CharField(blank=True, default='', max_length=100)),
+                ('delivery_id', models.CharField(help_text="Sender's delivery id (or a hash of the body)", max_length=100)),
+                ('body', models.TextField(help_text='Raw request body')),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('outcome', models.CharField(blank=True, choices=[('applied', 'Applied'), ('duplicate', 'Duplicate'), ('ignored', 'Ignored'), ('failed', 'Failed')], default='', max_length=20)),
+                ('error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'verbose_name': 'Webhook Event',
+                'verbose_name_plural': 'Webhook Events',
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='webhook_pending_idx'), models.Index(fields=['source', 'delivery_id'], name='integration_source_d37068_idx'), models.Index(fields=['processed_at'], name='integration_process_9a9289_idx')],
+            },
+        ),
+    ]
@@ -12,6 +12,7 @@ class ChangeRequest(models.Model):
     )
     number = models.CharField(
         max_length=40,
+        unique=True,
         help_text="Change request number (e.g., CHG0030001)"
     )
     short_description = models.CharField(max_length=255)
@@ -47,10 +48,202 @@ class ChangeRequest(models.Model):
         verbose_name_plural = 'Change Requests'
         indexes = [
             models.Index(fields=['servicenow_sys_id']),
-            models.Index(fields=['number']),
             models.Index(fields=['jira_issue_key']),
+            # Keyset pagination (newest first), optionally filtered
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['state', 'created_at', 'id']),
+            models.Index(fields=['priority', 'created_at', 'id']),
         ]
         ordering = ['-created_at']
 
     def __str__(self):
         return f"{self.number} - {self.short_description}"
+
+
+class NumberSequence(models.Model):
+    """
+    Counter row for allocating record numbers (see integrations/numbering.py)
+
+    Used where the database has no native sequences; on PostgreSQL the
+    allocator uses the sequence created by migration 0002 instead.
+    """
+
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField(
+        default=1,
+        help_text="First number not yet handed out to any worker"
+    )
+
+    class Meta:
+        verbose_name = 'Number Sequence'
+        verbose_name_plural = 'Number Sequences'
+
+    def __str__(self):
+        return f"{self.name} (next: {self.next_value})"
+
+
+class IntegrationJob(models.Model):
+    """
+    Outbound integration call waiting for (or done by) run_integration_worker
+
+    Rows are written in the same transaction as the change they belong to,
+    so a call is never lost nor made for a rolled back change.
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_DEAD = 'dead'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_DEAD, 'Dead'),
+    ]
+
+    kind = models.CharField(max_length=100, help_text="Registered job type (e.g. change_request.fan_out)")
+    payload = models.JSONField(default=dict)
+    change_request = models.ForeignKey(
+        ChangeRequest,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='jobs'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    priority = models.PositiveSmallIntegerField(default=3, help_text="Lower runs first (1-Critical ... 4-Low)")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(help_text="Not claimed before this time (retry backoff)")
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    result = models.JSONField(null=True, blank=True)
+
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Integration Job'
+        verbose_name_plural = 'Integration Jobs'
+        indexes = [
+            models.Index(fields=['status', 'priority', 'run_after']),
+        ]
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+
+
+class SyncCheckpoint(models.Model):
+    """
+    Resume point of an incremental sync (see integrations/sync.py)
+
+    Records are pulled ordered by (updated timestamp, key); the checkpoint is
+    the last pair applied, so an interrupted sync continues after it.
+    """
+
+    name = models.CharField(max_length=50, primary_key=True)
+    watermark = models.CharField(
+        max_length=19,
+        blank=True,
+        default='',
+        help_text="Remote update time of the last record applied (YYYY-MM-DD HH:MM:SS, UTC)"
+    )
+    last_key = models.CharField(
+        max_length=32,
+        blank=True,
+        default='',
+        help_text="Key of the last record applied at the watermark"
+    )
+    records = models.BigIntegerField(default=0, help_text="Records applied since the checkpoint was created")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Sync Checkpoint'
+        verbose_name_plural = 'Sync Checkpoints'
+
+    def __str__(self):
+        return f"{self.name} ({self.watermark or 'not started'})"
+
+
+class HTTPCacheEntry(models.Model):
+    """
+    Last response to a GET, kept for conditional requests (see integrations/http_cache.py)
+
+    The next GET of the URL sends the stored ETag / Last-Modified; a
+    304 Not Modified answer is served from body.
+    """
+
+    key = models.CharField(max_length=64, primary_key=True, help_text="SHA-256 of namespace and URL")
+    namespace = models.CharField(max_length=50, help_text="Integration the response came from")
+    url = models.TextField()
+    etag = models.CharField(max_length=255, blank=True, default='')
+    last_modified = models.CharField(max_length=64, blank=True, default='')
+    body = models.TextField(help_text="Response body (JSON)")
+    fetched_at = models.DateTimeField(help_text="When the body was last sent by the server")
+    used_at = models.DateTimeField(help_text="Last time the entry was served (LRU eviction order)")
+
+    class Meta:
+        verbose_name = 'HTTP Cache Entry'
+        verbose_name_plural = 'HTTP Cache Entries'
+        indexes = [
+            models.Index(fields=['used_at']),
+        ]
+
+    def __str__(self):
+        return self.url
+
+
+class WebhookEvent(models.Model):
+    """
+    Inbound webhook delivery, stored as received (see integrations/webhooks.py)
+
+    The endpoint only authenticates and inserts; apply_webhook_events reads
+    pending rows in batches and sets processed_at and outcome.
+    """
+
+    SOURCE_CHOICES = [
+        ('servicenow', 'ServiceNow'),
+        ('jira', 'Jira'),
+        ('github', 'GitHub'),
+    ]
+
+    OUTCOME_APPLIED = 'applied'
+    OUTCOME_DUPLICATE = 'duplicate'
+    OUTCOME_IGNORED = 'ignored'
+    OUTCOME_FAILED = 'failed'
+    OUTCOME_CHOICES = [
+        (OUTCOME_APPLIED, 'Applied'),
+        (OUTCOME_DUPLICATE, 'Duplicate'),
+        (OUTCOME_IGNORED, 'Ignored'),
+        (OUTCOME_FAILED, 'Failed'),
+    ]
+
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    event_type = models.CharField(max_length=100, blank=True, default='')
+    delivery_id = models.CharField(max_length=100, help_text="Sender's delivery id (or a hash of the body)")
+    body = models.TextField(help_text="Raw request body")
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES, blank=True, default='')
+    error = models.TextField(blank=True, default='')
+
+    class Meta:
+        verbose_name = 'Webhook Event'
+        verbose_name_plural = 'Webhook Events'
+        indexes = [
+            # The pending inbox, oldest first
+            models.Index(
+                fields=['id'],
+                name='webhook_pending_idx',
+                condition=models.Q(processed_at__isnull=True)
+            ),
+            models.Index(fields=['source', 'delivery_id']),
+            models.Index(fields=['processed_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.source} {self.event_type or 'event'} {self.delivery_id}"
@@ -0,0 +1,155 @@
+"""
+Local record number allocation (LCHG0000001, ...)
+
+A change request gets a local number when it is saved, before ServiceNow has
+created it. ServiceNow hands out CHG numbers itself, so local numbers use
+their own LCHG prefix and can never collide with a number that arrives from
+ServiceNow (create, sync or webhook).
+
+Numbers are reserved from the database in blocks (hi/lo): a worker takes
+block_size numbers with one query and hands them out from memory, so most
+creates need no extra query and workers never hand out the same number.
+
+On PostgreSQL a native sequence is used; nextval() is not transactional, so
+a rolled back turn only leaves gaps. Elsewhere an atomic UPDATE ... RETURNING
+on the NumberSequence counter row reserves the block. That update is part
+of the caller's transaction, so a block reserved in a transaction that rolls
+back is discarded rather than handed out again.
+"""
+import threading
+from collections import deque
+from typing import Callable, Deque, List, Optional, Tuple
+from django.conf import settings
+from django.db import connections, transaction
+
+from .models import NumberSequence
+
+
+# Prefix of change request numbers allocated locally
+LOCAL_CHANGE_PREFIX = 'LCHG'
+
+
+def sequence_db_name(name: str) -> str:
+    """Name of the native PostgreSQL sequence backing a NumberSequence row"""
+    return f"integrations_{name}_number_seq"
+
+
+class NumberAllocator:
+    """
+    Thread-safe, block-reserving number allocator for one sequence
+
+    Attributes:
+        name: NumberSequence row / sequence name
+        prefix: Text before the digits (e.g. 'LCHG')
+        width: Zero-padded digit count
+        block_size: Numbers reserved per database round trip
+    """
+
+    def __init__(self, name: str, prefix: str, width: int = 7, block_size: int = 50, using: str = 'default'):
+        if block_size < 1:
+            raise ValueError("block_size must be at least 1")
+        self.name = name
+        self.prefix = prefix
+        self.width = width
+        self.block_size = block_size
+        self.using = using
+        self._values: Deque[int] = deque()
+        # (thread id, on_commit callback) while the block was reserved by a
+        # transaction that has not committed yet
+        self._pending: Optional[Tuple[int, Callable[[], None]]] = None
+        self._lock = threading.Lock()
+
+    def allocate(self) -> str:
+        """
+        Next number, reserving a new block when the current one is used up
+
+        Returns:
+            Formatted number (e.g. 'LCHG0000042')
+        """
+        with self._lock:
+            connection = connections[self.using]
+            if self._pending is not None and not self._pending_is_live(connection):
+                # The counter update that reserved the block was rolled back
+                # (or belongs to another thread's open transaction)
+                self._values.clear()
+                self._pending = None
+
+            if not self._values:
+                self._reserve(connection)
+            return self.format(self._values.popleft())
+
+    def format(self, value: int) -> str:
+        return f"{self.prefix}{value:0{self.width}d}"
+
+    def discard(self) -> None:
+        """Forget the reserved block"""
+        with self._lock:
+            self._values.clear()
+            self._pending = None
+
+    def _reserve(self, connection) -> None:
+        if connection.vendor == 'postgresql':
+            self._values.extend(self._reserve_postgresql(connection))
+            return
+
+        start = self._reserve_counter(connection)
+        self._values.extend(range(start, start + self.block_size))
+
+        if connection.in_atomic_block:
+            def confirm():
+                with self._lock:
+                    if self._pending is not None and self._pending[1] is confirm:
+                        self._pending = None
+
+            self._pending = (threading.get_ident(), confirm)
+            transaction.on_commit(confirm, using=self.using)
+
+    def _pending_is_live(self, connection) -> bool:
+        """
+        Whether the uncommitted reservation can still commit
+
+        Django drops on_commit callbacks registered inside a transaction or
+        savepoint when it rolls back, so the callback still being queued
+        means the counter update is still in place.
+        """
+        thread_id, confirm = self._pending
+        if thread_id != threading.get_ident():
+            return False
+        return any(callback is confirm for _, callback, _ in connection.run_on_commit)
+
+    def _reserve_postgresql(self, connection) -> List[int]:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)",
+                [sequence_db_name(self.name), self.block_size]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def _reserve_counter(self, connection) -> int:
+        """Advance the counter row by one block and return the block start"""
+        table = connection.ops.quote_name(NumberSequence._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET next_value = next_value + %s WHERE name = %s RETURNING next_value",
+                [self.block_size, self.name]
+            )
+            row = cursor.fetchone()
+            if row is None:
+                NumberSequence.objects.using(self.using).bulk_create(
+                    [NumberSequence(name=self.name, next_value=1)],
+                    ignore_conflicts=True
+                )
+                cursor.execute(
+                    f"UPDATE {table} SET next_value = next_value + %s WHERE name = %s RETURNING next_value",
+                    [self.block_size, self.name]
+                )
+                row = cursor.fetchone()
+        return row[0] - self.block_size
+
+
+change_number_allocator = NumberAllocator(
+    'change_request',
+    prefix=LOCAL_CHANGE_PREFIX,
+    width=7,
+    block_size=getattr(settings, 'CHANGE_NUMBER_BLOCK_SIZE', 50)
+)
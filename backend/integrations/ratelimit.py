@@ -0,0 +1,352 @@
+"""
+Per-integration rate limiting and adaptive concurrency
+
+ServiceNow, Jira and GitHub each enforce their own quotas per credential.
+Every HTTPTransport call first takes a permit from its RateLimiter, which
+combines:
+
+- a token bucket of RATE calls per second with bursts up to BURST, keyed by
+  integration and credential (a hash of the auth), so two tokens for the
+  same integration have separate budgets;
+- a Retry-After pause: a 429/503 answer with Retry-After stops every caller
+  of that bucket until the time has passed, instead of each retrying into
+  the same wall;
+- an adaptive concurrency limit (AIMD): it halves on 429, 5xx, timeouts and
+  connection errors and grows by about one per round of successful calls,
+  between MIN_CONCURRENCY and MAX_CONCURRENCY.
+
+With CACHE_ALIAS set, the bucket and the pause live in that Django cache
+(use one shared by all processes, e.g. Redis), so the limits hold across
+web and worker processes; the bucket is then approximated by fixed windows
+of BURST / RATE seconds using the cache's atomic incr(). The concurrency
+limit is per process.
+
+Callers choose how long to wait for a permit: max_wait() sets it for the
+current thread (0 fails fast with RateLimited); the default is MAX_WAIT.
+"""
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULTS = {
+    'RATE': 10,
+    'BURST': 20,
+    'MIN_CONCURRENCY': 1,
+    'MAX_CONCURRENCY': 10,
+    'MAX_WAIT': 10,
+    'CACHE_ALIAS': None,
+}
+
+KEY_PREFIX = 'integrations:ratelimit:'
+
+COUNTERS = ('calls', 'throttled', 'rejected', 'overloaded')
+
+_local = threading.local()
+
+
+class RateLimited(Exception):
+    """No permit within the caller's wait limit; retry_after is a hint in seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def rate_limit_options(integration: str) -> Dict[str, Any]:
+    """INTEGRATION_RATE_LIMITS options for one integration, with defaults"""
+    configured = getattr(settings, 'INTEGRATION_RATE_LIMITS', {})
+    options = {name: configured.get(name, default) for name, default in DEFAULTS.items()}
+    options.update(configured.get(integration.upper(), {}))
+    return options
+
+
+@contextmanager
+def max_wait(seconds: float):
+    """
+    Limit how long calls in this thread wait for a permit
+
+    Args:
+        seconds: Longest wait; 0 fails fast with RateLimited
+    """
+    previous = getattr(_local, 'max_wait', None)
+    _local.max_wait = seconds
+    try:
+        yield
+    finally:
+        _local.max_wait = previous
+
+
+def credential_key(auth: Any = None, headers: Optional[Dict[str, str]] = None) -> str:
+    """Short, non-reversible id of the credential a transport sends"""
+    material = repr(auth) + (headers or {}).get('Authorization', '')
+    return hashlib.sha256(material.encode()).hexdigest()[:12]
+
+
+class TokenBucket:
+    """In-process token bucket"""
+
+    # take() reserves the token it returns a wait for
+    reserves = True
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.retry_after = 1 / rate
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, max_wait: float) -> Optional[float]:
+        """
+        Reserve a token
+
+        Returns:
+            Seconds to sleep before using it, or None (nothing reserved)
+            if that would exceed max_wait
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+    def refund(self) -> None:
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+
+class SharedWindow:
+    """Token bucket approximated by fixed windows in a shared Django cache"""
+
+    reserves = False
+
+    def __init__(self, cache_alias: str, key: str, rate: float, burst: float):
+        self.cache = caches[cache_alias]
+        self.key = key
+        self.burst = burst
+        self.window = burst / rate
+        self.retry_after = self.window
+
+    def take(self, max_wait: float) -> Optional[float]:
+        """Same contract as TokenBucket.take()"""
+        now = time.time()
+        slot = int(now // self.window)
+        key = f"{self.key}:{slot}"
+        self.cache.add(key, 0, timeout=int(self.window * 2) + 1)
+        if self.cache.incr(key) <= self.burst:
+            return 0.0
+        # Full: the earliest permit is at the start of a later window
+        wait = (slot + 1) * self.window - now
+        return wait if wait <= max_wait else None
+
+    def refund(self) -> None:
+        key = f"{self.key}:{int(time.time() // self.window)}"
+        try:
+            self.cache.decr(key)
+        except ValueError:
+            pass  # The window has expired
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on calls in flight
+
+    Halves on overload, grows by 1/limit per success (about +1 per round).
+    """
+
+    def __init__(self, minimum: int, maximum: int):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(maximum)
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: float) -> bool:
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.in_flight < int(self.limit), timeout=timeout):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, overloaded: bool) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            if overloaded:
+                self.limit = max(self.minimum, self.limit / 2)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class RateLimiter:
+    """
+    Permits for calls to one integration with one credential
+
+    Attributes:
+        name: Integration and credential, e.g. 'github:3f2a9c01d4e5'
+        max_wait: Default wait for a permit (seconds)
+    """
+
+    def __init__(self, name: str, rate: float = 10, burst: float = 20, min_concurrency: int = 1,
+                 max_concurrency: int = 10, max_wait: float = 10, cache_alias: Optional[str] = None):
+        self.name = name
+        self.max_wait = max_wait
+        self.key = f"{KEY_PREFIX}{name}"
+        self.cache = caches[cache_alias] if cache_alias else None
+        self.bucket = SharedWindow(cache_alias, self.key, rate, burst) if cache_alias else TokenBucket(rate, burst)
+        self.concurrency = AdaptiveConcurrency(min_concurrency, max_concurrency)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(COUNTERS, 0)
+        self._wait_seconds = 0.0
+
+    def acquire(self, wait: Optional[float] = None) -> None:
+        """
+        Wait for a permit; pair every acquire() with release()
+
+        Args:
+            wait: Longest wait in seconds (default: max_wait() of this
+                thread, else self.max_wait); 0 fails fast
+
+        Raises:
+            RateLimited: No permit within the wait
+        """
+        if wait is None:
+            wait = getattr(_local, 'max_wait', None)
+        if wait is None:
+            wait = self.max_wait
+        started = time.monotonic()
+        deadline = started + wait
+
+        paused = self.paused_for()
+        if paused > wait:
+            self._reject(f"{self.name} asked to wait {paused:.1f}s (Retry-After)", paused)
+        if paused:
+            time.sleep(paused)
+
+        while True:
+            sleep = self.bucket.take(max(0.0, deadline - time.monotonic()))
+            if sleep is None:
+                self._reject(f"{self.name} rate limit reached", self.bucket.retry_after)
+            if sleep:
+                time.sleep(sleep)
+            # A shared window only says when to try again
+            if not sleep or self.bucket.reserves:
+                break
+
+        if not self.concurrency.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            self._reject(f"{self.name} concurrency limit ({int(self.concurrency.limit)}) reached", 1.0)
+
+        waited = time.monotonic() - started
+        self._count('calls')
+        if waited > 0.001:
+            self._count('throttled')
+            with self._lock:
+                self._wait_seconds += waited
+
+    def release(self, overloaded: bool = False, retry_after: Optional[float] = None,
+                free: bool = False) -> None:
+        """
+        Return a permit with the call's outcome
+
+        Args:
+            overloaded: The call got 429/5xx, timed out or could not connect
+            retry_after: Retry-After of the response, in seconds
+            free: The call did not count against the remote quota (e.g. a
+                304 answer to a conditional GitHub request); its token is
+                given back
+        """
+        self.concurrency.release(overloaded)
+        if free:
+            self.bucket.refund()
+        if overloaded:
+            self._count('overloaded')
+        if retry_after:
+            self.pause(retry_after)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller of this limiter for seconds"""
+        until = time.time() + seconds
+        with self._lock:
+            self._paused_until = max(self._paused_until, until)
+        if self.cache is not None:
+            self.cache.set(f"{self.key}:paused", until, timeout=int(seconds) + 1)
+
+    def paused_for(self) -> float:
+        """Seconds left of a Retry-After pause"""
+        until = self._paused_until
+        if self.cache is not None:
+            until = max(until, self.cache.get(f"{self.key}:paused") or 0)
+        return max(0.0, until - time.time())
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Counters of this limiter
+
+        calls: permits granted; throttled: of those, how many had to wait;
+        rejected: RateLimited raised; overloaded: 429/5xx/timeouts seen.
+        With a shared cache the counters are the totals of all processes.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats['wait_seconds'] = round(self._wait_seconds, 3)
+        if self.cache is not None:
+            shared = self.cache.get_many([f"{self.key}:count:{name}" for name in COUNTERS])
+            stats.update({name: shared.get(f"{self.key}:count:{name}", 0) for name in COUNTERS})
+        stats['concurrency_limit'] = int(self.concurrency.limit)
+        stats['in_flight'] = self.concurrency.in_flight
+        stats['paused_for'] = round(self.paused_for(), 3)
+        return stats
+
+    def _reject(self, message: str, retry_after: float) -> None:
+        self._count('rejected')
+        raise RateLimited(message, retry_after)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+        if self.cache is not None:
+            key = f"{self.key}:count:{name}"
+            self.cache.add(key, 0, timeout=None)
+            self.cache.incr(key)
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(integration: str, credential: str = '') -> RateLimiter:
+    """The process-wide limiter of an integration and credential"""
+    name = f"{integration}:{credential}" if credential else integration
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                options = rate_limit_options(integration)
+                limiter = _limiters[name] = RateLimiter(
+                    name,
+                    rate=options['RATE'],
+                    burst=options['BURST'],
+                    min_concurrency=options['MIN_CONCURRENCY'],
+                    max_concurrency=options['MAX_CONCURRENCY'],
+                    max_wait=options['MAX_WAIT'],
+                    cache_alias=options['CACHE_ALIAS']
+                )
+    return limiter
+
+
+def rate_limit_stats() -> Dict[str, Dict[str, Any]]:
+    """stats() of every limiter in this process, by name"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
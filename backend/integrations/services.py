@@ -1,13 +1,27 @@
 """
 Integration services for external systems
+
+Services are process-wide singletons (get_servicenow_service() etc.): the
+configuration is read once and every call goes through the integration's
+pooled HTTPTransport (integrations/transport.py).
 """
-from typing import Dict, Any
+import threading
+from typing import Dict, Any, FrozenSet, Iterator, List, Optional, Tuple
 from decouple import config
+from django.conf import settings
+
+from .caching import TTLCache
+from .http_cache import ConditionalResponseCache, http_cache_option
+from .transport import build_transport, iter_json_items
 
 
 class ServiceNowService:
     """Service for interacting with ServiceNow API"""
 
+    TABLE = 'api/now/table/change_request'
+    # Labels ('New') rather than internal values ('-5') in responses
+    DISPLAY = {'sysparm_display_value': 'true', 'sysparm_exclude_reference_link': 'true'}
+
     def __init__(self):
         self.instance = config('SERVICENOW_INSTANCE', default=None)
         self.username = config('SERVICENOW_USERNAME', default=None)
@@ -19,13 +33,23 @@ class ServiceNowService:
                 "Please set SERVICENOW_INSTANCE, SERVICENOW_USERNAME, and SERVICENOW_PASSWORD in .env"
             )
 
+        # An instance name, or a full URL (e.g. a local stub server)
+        base_url = self.instance if '://' in self.instance else f"https://{self.instance}.service-now.com"
+        self.transport = build_transport(
+            'servicenow',
+            base_url,
+            auth=(self.username, self.password),
+            headers={'Content-Type': 'application/json'}
+        )
+
     def create_change_request(
         self,
         short_description: str,
         description: str,
         priority: str,
         planned_start_date: str,
-        planned_end_date: str
+        planned_end_date: str,
+        correlation_id: str = ''
     ) -> Dict[str, Any]:
         """
         Create a change request in ServiceNow
@@ -36,32 +60,24 @@ class ServiceNowService:
             priority: Priority level (1-4)
             planned_start_date: Start date (YYYY-MM-DD)
             planned_end_date: End date (YYYY-MM-DD)
+            correlation_id: Local change request number, so a sync that
+                sees the change before it is linked finds the local row
 
         Returns:
             ServiceNow response with sys_id and number
         """
-        # TODO: Implement actual ServiceNow API call
-        # For now, this is a placeholder that would be implemented later
-        # Example implementation:
-        #
-        # import requests
-        # url = f"https://{self.instance}.service-now.com/api/now/table/change_request"
-        # headers = {
-        #     'Content-Type': 'application/json',
-        #     'Accept': 'application/json'
-        # }
-        # data = {
-        #     'short_description': short_description,
-        #     'description': description,
-        #     'priority': priority,
-        #     'planned_start_date': planned_start_date,
-        #     'planned_end_date': planned_end_date
-        # }
-        # response = requests.post(url, auth=(self.username, self.password), headers=headers, json=data)
-        # response.raise_for_status()
-        # return response.json()['result']
-
-        raise NotImplementedError("ServiceNow API integration not yet implemented")
+        data = {
+            'short_description': short_description,
+            'description': description,
+            'priority': priority,
+            'start_date': planned_start_date,
+            'end_date': planned_end_date
+        }
+        if correlation_id:
+            data['correlation_id'] = correlation_id
+        # POST is not retried: a lost response could mean a duplicate change
+        response = self.transport.post(self.TABLE, json=data, params=self.DISPLAY)
+        return response.json()['result']
 
     def get_change_request(self, sys_id: str) -> Dict[str, Any]:
         """
@@ -73,7 +89,8 @@ class ServiceNowService:
         Returns:
             ServiceNow change request data
         """
-        raise NotImplementedError("ServiceNow API integration not yet implemented")
+        response = self.transport.get(f"{self.TABLE}/{sys_id}", params=self.DISPLAY)
+        return response.json()['result']
 
     def update_change_request(self, sys_id: str, **kwargs) -> Dict[str, Any]:
         """
@@ -81,12 +98,56 @@ class ServiceNowService:
 
         Args:
             sys_id: ServiceNow system ID
-            **kwargs: Fields to update
+            **kwargs: Fields to update (only the ones that changed)
 
         Returns:
             ServiceNow response
         """
-        raise NotImplementedError("ServiceNow API integration not yet implemented")
+        # Setting fields to given values is safe to repeat
+        response = self.transport.patch(f"{self.TABLE}/{sys_id}", json=kwargs, params=self.DISPLAY, idempotent=True)
+        return response.json()['result']
+
+    def iter_updated_change_requests(
+        self,
+        watermark: str = '',
+        last_sys_id: str = '',
+        limit: int = 500,
+        fields: Optional[tuple] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Change requests updated after a position, oldest first
+
+        Records come ordered by (sys_updated_on, sys_id) and are parsed while
+        the response streams in. Values are raw (state '-5', not 'New';
+        sys_updated_on in UTC).
+
+        Args:
+            watermark: sys_updated_on of the last record already seen
+                (YYYY-MM-DD HH:MM:SS); empty for the start of the table
+            last_sys_id: sys_id of that record, to page through records
+                sharing one timestamp
+            limit: Page size
+            fields: Columns to return (default: all)
+
+        Yields:
+            Change request records
+        """
+        query = ''
+        if watermark:
+            query = f"sys_updated_on>{watermark}^NQsys_updated_on={watermark}^sys_id>{last_sys_id}"
+        params = {
+            'sysparm_query': f"{query}^ORDERBYsys_updated_on^ORDERBYsys_id",
+            'sysparm_limit': limit,
+            'sysparm_display_value': 'false',
+            'sysparm_exclude_reference_link': 'true',
+            'sysparm_no_count': 'true',
+        }
+        if fields:
+            params['sysparm_fields'] = ','.join(fields)
+
+        response = self.transport.get(self.TABLE, params=params, stream=True)
+        with response:
+            yield from iter_json_items(response.iter_content(65536), 'result')
 
 
 class JiraService:
@@ -103,7 +164,21 @@ class JiraService:
                 "Please set JIRA_URL, JIRA_EMAIL, and JIRA_API_TOKEN in .env"
             )
 
-    def create_issue(self, project: str, summary: str, description: str) -> Dict[str, Any]:
+        self.transport = build_transport(
+            'jira',
+            self.url,
+            auth=(self.email, self.api_token),
+            headers={'Content-Type': 'application/json'}
+        )
+
+        options = getattr(settings, 'JIRA_ISSUES', {})
+        self.issue_type = options.get('ISSUE_TYPE', 'Task')
+        self.bulk_size = min(options.get('BULK_SIZE', 50), 50)
+        # Project issue types and create-screen fields
+        self.metadata = TTLCache(ttl=options.get('METADATA_TTL', 3600), max_entries=512)
+
+    def create_issue(self, project: str, summary: str, description: str,
+                     issue_type: Optional[str] = None) -> Dict[str, Any]:
         """
         Create a Jira issue
 
@@ -111,16 +186,158 @@ class JiraService:
             project: Project key
             summary: Issue summary
             description: Issue description
+            issue_type: Issue type name (default JIRA_ISSUES['ISSUE_TYPE'])
 
         Returns:
             Jira issue data
         """
-        raise NotImplementedError("Jira API integration not yet implemented")
+        data = {'fields': self.issue_fields(project, summary, description, issue_type)}
+        response = self.transport.post('rest/api/2/issue', json=data)
+        return response.json()
+
+    def create_issues(self, batch: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Create many Jira issues through the bulk endpoint
+
+        Items are sent bulk_size (at most 50, Jira's limit) per request.
+        One failing item does not stop the others.
+
+        Args:
+            batch: Items with project, summary, description and optionally
+                issue_type (the create_issue() arguments)
+
+        Returns:
+            One dict per item, in order: {'key', 'id'} when created,
+            {'error': message} when not
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(batch)
+        prepared = []
+        for index, item in enumerate(batch):
+            try:
+                prepared.append((index, {'fields': self.issue_fields(**item)}))
+            except Exception as error:
+                results[index] = {'error': str(error)}
+
+        for start in range(0, len(prepared), self.bulk_size):
+            chunk = prepared[start:start + self.bulk_size]
+            try:
+                response = self.transport.post(
+                    'rest/api/2/issue/bulk',
+                    json={'issueUpdates': [update for _, update in chunk]},
+                    raise_for_status=False
+                )
+                # 400 means some items failed; the others were created
+                if response.status_code != 400:
+                    response.raise_for_status()
+                data = response.json()
+            except Exception as error:
+                for index, _ in chunk:
+                    results[index] = {'error': str(error)}
+                continue
+
+            failed = {error['failedElementNumber']: error for error in data.get('errors', [])}
+            created = iter(data.get('issues', []))
+            for position, (index, _) in enumerate(chunk):
+                if position in failed:
+                    results[index] = {'error': self._bulk_error(failed[position])}
+                    continue
+                issue = next(created, None)
+                results[index] = (
+                    {'key': issue['key'], 'id': issue['id']} if issue
+                    else {'error': "Not in Jira's bulk create response"}
+                )
+
+        return results
+
+    def search_issues(self, keys: List[str], fields: List[str] = ('status', 'summary'),
+                      batch_size: int = 100) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up many issues by key, one JQL search per batch_size keys
+
+        Args:
+            keys: Issue keys (e.g. OPS-12); keys that do not exist are left out
+            fields: Issue fields to return
+            batch_size: Keys per search
+
+        Returns:
+            Issue key -> fields dict
+        """
+        issues = {}
+        for start in range(0, len(keys), batch_size):
+            chunk = keys[start:start + batch_size]
+            response = self.transport.post(
+                'rest/api/2/search',
+                json={
+                    'jql': f"key in ({', '.join(chunk)})",
+                    'fields': list(fields),
+                    'maxResults': len(chunk),
+                    # Unknown keys are warnings, not a 400 for the whole search
+                    'validateQuery': 'warn'
+                },
+                idempotent=True
+            )
+            for issue in response.json().get('issues', []):
+                issues[issue['key']] = issue['fields']
+        return issues
+
+    def issue_fields(self, project: str, summary: str, description: str,
+                     issue_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Create payload fields, checked against the project's cached metadata
+
+        Raises:
+            ValueError: The project has no such issue type
+        """
+        issue_type = issue_type or self.issue_type
+        type_id = self.issue_types(project).get(issue_type.lower())
+        if type_id is None:
+            raise ValueError(f"Jira project {project} has no issue type {issue_type!r}")
+
+        fields = {
+            'project': {'key': project},
+            'summary': summary,
+            'issuetype': {'id': type_id}
+        }
+        # Not every create screen has a description
+        if 'description' in self.create_fields(project, type_id):
+            fields['description'] = description
+        return fields
+
+    def issue_types(self, project: str) -> Dict[str, str]:
+        """Lower-cased issue type name -> id for a project (cached)"""
+        def load():
+            response = self.transport.get(
+                f"rest/api/2/issue/createmeta/{project}/issuetypes",
+                params={'maxResults': 200}
+            )
+            return {issue_type['name'].lower(): issue_type['id'] for issue_type in response.json()['values']}
+
+        return self.metadata.get_or_load(('issuetypes', project), load)
+
+    def create_fields(self, project: str, issue_type_id: str) -> FrozenSet[str]:
+        """Ids of the fields on a project's create screen for an issue type (cached)"""
+        def load():
+            response = self.transport.get(
+                f"rest/api/2/issue/createmeta/{project}/issuetypes/{issue_type_id}",
+                params={'maxResults': 200}
+            )
+            return frozenset(field['fieldId'] for field in response.json()['values'])
+
+        return self.metadata.get_or_load(('fields', project, issue_type_id), load)
+
+    @staticmethod
+    def _bulk_error(error: Dict[str, Any]) -> str:
+        details = error.get('elementErrors', {})
+        messages = list(details.get('errorMessages', []))
+        messages += [f"{field}: {message}" for field, message in details.get('errors', {}).items()]
+        return '; '.join(messages) or f"HTTP {error.get('status')}"
 
 
 class GitHubService:
     """Service for interacting with GitHub API"""
 
+    PULL_REQUEST_FIELDS = 'state title url merged isDraft'
+
     def __init__(self):
         self.token = config('GITHUB_TOKEN', default=None)
 
@@ -130,6 +347,22 @@ class GitHubService:
                 "Please set GITHUB_TOKEN in .env"
             )
 
+        api_url = config('GITHUB_API_URL', default='https://api.github.com')
+        self.graphql_url = config('GITHUB_GRAPHQL_URL', default=f"{api_url.rstrip('/')}/graphql")
+        self.transport = build_transport(
+            'github',
+            api_url,
+            headers={
+                'Authorization': f"Bearer {self.token}",
+                'Accept': 'application/vnd.github+json',
+                'X-GitHub-Api-Version': '2022-11-28'
+            }
+        )
+        self.responses = ConditionalResponseCache(
+            'github',
+            max_entries=http_cache_option('MAX_ENTRIES', 10000)
+        )
+
     def create_pull_request(
         self,
         repo: str,
@@ -151,4 +384,102 @@ class GitHubService:
         Returns:
             GitHub PR data
         """
-        raise NotImplementedError("GitHub API integration not yet implemented")
+        data = {'title': title, 'body': body, 'head': head, 'base': base}
+        response = self.transport.post(f"repos/{repo}/pulls", json=data)
+        return response.json()
+
+    def get_pull_requests(self, links: List[Tuple[str, int]],
+                          batch_size: int = 50) -> Dict[Tuple[str, int], Dict[str, Any]]:
+        """
+        Look up many pull requests, one aliased GraphQL query per batch_size
+
+        Args:
+            links: (owner/repo, PR number) pairs; PRs that do not exist (or
+                are not visible to the token) are left out
+            batch_size: Pull requests per query
+
+        Returns:
+            (repo, number) -> {'state', 'title', 'url', 'merged', 'isDraft'}
+        """
+        pull_requests = {}
+        for start in range(0, len(links), batch_size):
+            chunk = links[start:start + batch_size]
+            declarations, selections, variables = [], [], {}
+            for index, (repo, number) in enumerate(chunk):
+                owner, _, name = repo.partition('/')
+                declarations.append(f"$o{index}: String!, $r{index}: String!, $n{index}: Int!")
+                selections.append(
+                    f"pr{index}: repository(owner: $o{index}, name: $r{index}) "
+                    f"{{ pullRequest(number: $n{index}) {{ {self.PULL_REQUEST_FIELDS} }} }}"
+                )
+                variables.update({f"o{index}": owner, f"r{index}": name, f"n{index}": number})
+
+            query = f"query({', '.join(declarations)}) {{ {' '.join(selections)} }}"
+            response = self.transport.post(
+                self.graphql_url,
+                json={'query': query, 'variables': variables},
+                idempotent=True
+            )
+            # Missing PRs come back as null with an entry in 'errors'
+            data = response.json().get('data') or {}
+            for index, link in enumerate(chunk):
+                pull_request = (data.get(f"pr{index}") or {}).get('pullRequest')
+                if pull_request:
+                    pull_requests[link] = pull_request
+        return pull_requests
+
+    def get_pull_request(self, repo: str, number: int) -> Dict[str, Any]:
+        """
+        Get a GitHub pull request
+
+        Sent as a conditional request against the last stored response;
+        an unchanged PR costs no rate limit (see integrations/http_cache.py).
+
+        Args:
+            repo: Repository name (owner/repo)
+            number: PR number
+
+        Returns:
+            GitHub PR data
+        """
+        return self.responses.get_json(self.transport, f"repos/{repo}/pulls/{number}")
+
+
+_services: Dict[type, Any] = {}
+_services_lock = threading.Lock()
+
+
+def _service(service_class):
+    """The process-wide instance of a service class (created on first use)"""
+    service = _services.get(service_class)
+    if service is None:
+        with _services_lock:
+            service = _services.get(service_class)
+            if service is None:
+                # Raises ValueError when not configured; nothing is cached then
+                service = _services[service_class] = service_class()
+    return service
+
+
+def get_servicenow_service() -> ServiceNowService:
+    """Shared ServiceNowService (raises ValueError when not configured)"""
+    return _service(ServiceNowService)
+
+
+def get_jira_service() -> JiraService:
+    """Shared JiraService (raises ValueError when not configured)"""
+    return _service(JiraService)
+
+
+def get_github_service() -> GitHubService:
+    """Shared GitHubService (raises ValueError when not configured)"""
+    return _service(GitHubService)
+
+
+def reset_services() -> None:
+    """Drop the shared services and their connection pools (e.g. after changing settings)"""
+    with _services_lock:
+        for service in _services.values():
+            service.transport.close()
+        _services.clear()
+
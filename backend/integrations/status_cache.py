@@ -0,0 +1,237 @@
+"""
+Stale-while-revalidate cache of change request status
+
+Status checks read a snapshot of the change request from here instead of the
+database or ServiceNow. A fresh snapshot (younger than FRESH_TTL) is served
+as is; an older one (up to STALE_TTL) is served immediately while a
+background thread refreshes it from ServiceNow. Only a miss reads the local
+database on the request path; nothing on the request path waits for
+ServiceNow. Saving or deleting a ChangeRequest invalidates its entry.
+
+Entries live in an in-process LRU, or in a Django cache (CACHE_ALIAS) shared
+by all workers, which is needed for invalidations made by
+run_integration_worker to reach the web workers right away.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import ChangeRequest
+from .services import get_servicenow_service
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FIELDS = (
+    'id',
+    'number',
+    'servicenow_sys_id',
+    'short_description',
+    'description',
+    'state',
+    'priority',
+    'jira_issue_key',
+    'github_repo',
+    'github_pr_number',
+    'created_at',
+)
+
+
+def snapshot(change_request: ChangeRequest) -> Dict[str, Any]:
+    """The change request fields a status reply needs"""
+    return {field: getattr(change_request, field) for field in SNAPSHOT_FIELDS}
+
+
+class ChangeStatusCache:
+    """
+    Read-through status cache keyed by change request number and sys_id
+
+    Entries are stored by primary key; number and sys_id map to the key, so
+    one invalidation covers both.
+    """
+
+    KEY_PREFIX = 'integrations:status:'
+
+    def __init__(
+        self,
+        fresh_ttl: float = 30,
+        stale_ttl: float = 3600,
+        max_entries: int = 10000,
+        cache_alias: Optional[str] = None,
+        refresh_workers: int = 4,
+        remote_refresh: bool = True
+    ):
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.cache_alias = cache_alias
+        self.remote_refresh = remote_refresh
+        self._entries: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix='status-refresh')
+
+    def get(self, number: Optional[str] = None, sys_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Status snapshot of a change request
+
+        Args:
+            number: Change request number (e.g. CHG0000012)
+            sys_id: ServiceNow system ID
+
+        Returns:
+            Snapshot dict (see SNAPSHOT_FIELDS), or None if no such change
+        """
+        alias = f"number:{number}" if number else f"sys_id:{sys_id}"
+        pk = self._get(alias)
+        entry = self._get(f"id:{pk}") if pk is not None else None
+
+        # The alias may point at a change whose number has since changed
+        if entry is not None and not self._matches(entry['data'], number, sys_id):
+            entry = None
+
+        if entry is not None:
+            age = time.time() - entry['fetched']
+            if age < self.fresh_ttl:
+                return entry['data']
+            if age < self.stale_ttl:
+                self.refresh_in_background(entry['data']['id'])
+                return entry['data']
+
+        # Miss: read the local record now, ask ServiceNow in the background
+        lookup = {'number': number} if number else {'servicenow_sys_id': sys_id}
+        change_request = ChangeRequest.objects.filter(**lookup).first()
+        if change_request is None:
+            return None
+
+        data = self.put(change_request)
+        self.refresh_in_background(change_request.id)
+        return data
+
+    def put(self, change_request: ChangeRequest) -> Dict[str, Any]:
+        """Store a fresh snapshot of a change request"""
+        data = snapshot(change_request)
+        self._set(f"id:{change_request.id}", {'data': data, 'fetched': time.time()})
+        self._set(f"number:{change_request.number}", change_request.id)
+        self._set(f"sys_id:{change_request.servicenow_sys_id}", change_request.id)
+        return data
+
+    def invalidate(self, change_request_id: int) -> None:
+        """Drop the snapshot of a change request (its aliases then miss)"""
+        self._delete(f"id:{change_request_id}")
+
+    def refresh_in_background(self, change_request_id: int) -> None:
+        """Schedule refresh(), unless one for the same change is running"""
+        with self._lock:
+            if change_request_id in self._refreshing:
+                return
+            self._refreshing.add(change_request_id)
+        self._executor.submit(self._refresh_task, change_request_id)
+
+    def refresh(self, change_request_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Pull the state from ServiceNow, store it locally and re-cache
+
+        When ServiceNow is not configured or fails, or remote_refresh is off
+        (sync_servicenow keeps the table current), the local record is
+        cached again as it is.
+
+        Returns:
+            The new snapshot, or None if the change no longer exists
+        """
+        change_request = ChangeRequest.objects.filter(id=change_request_id).first()
+        if change_request is None:
+            self.invalidate(change_request_id)
+            return None
+
+        remote = None
+        if self.remote_refresh:
+            try:
+                remote = get_servicenow_service().get_change_request(change_request.servicenow_sys_id)
+            except Exception as error:
+                logger.debug("Status refresh of %s from ServiceNow skipped: %s", change_request.number, error)
+
+        if remote and remote.get('state') and remote['state'] != change_request.state:
+            change_request.state = remote['state']
+            # update(), not save(): post_save would only invalidate the
+            # snapshot stored right below
+            ChangeRequest.objects.filter(id=change_request.id).update(
+                state=change_request.state,
+                updated_at=timezone.now()
+            )
+
+        return self.put(change_request)
+
+    def _refresh_task(self, change_request_id: int) -> None:
+        close_old_connections()
+        try:
+            self.refresh(change_request_id)
+        except Exception:
+            logger.exception("Status refresh of change request %s failed", change_request_id)
+        finally:
+            with self._lock:
+                self._refreshing.discard(change_request_id)
+            close_old_connections()
+
+    @staticmethod
+    def _matches(data: Dict[str, Any], number: Optional[str], sys_id: Optional[str]) -> bool:
+        if number:
+            return data['number'] == number
+        return data['servicenow_sys_id'] == sys_id
+
+    def _get(self, key: str) -> Any:
+        if self.cache_alias:
+            return caches[self.cache_alias].get(self.KEY_PREFIX + key)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: Any) -> None:
+        if self.cache_alias:
+            caches[self.cache_alias].set(self.KEY_PREFIX + key, value, timeout=self.stale_ttl)
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            # Three keys per change request
+            while len(self._entries) > self.max_entries * 3:
+                self._entries.popitem(last=False)
+
+    def _delete(self, key: str) -> None:
+        if self.cache_alias:
+            caches[self.cache_alias].delete(self.KEY_PREFIX + key)
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+def _build_status_cache() -> ChangeStatusCache:
+    """Create the process-wide cache from CHANGE_STATUS_CACHE"""
+    options = getattr(settings, 'CHANGE_STATUS_CACHE', {})
+    return ChangeStatusCache(
+        fresh_ttl=options.get('FRESH_TTL', 30),
+        stale_ttl=options.get('STALE_TTL', 3600),
+        max_entries=options.get('MAX_ENTRIES', 10000),
+        cache_alias=options.get('CACHE_ALIAS'),
+        refresh_workers=options.get('REFRESH_WORKERS', 4),
+        remote_refresh=options.get('REMOTE_REFRESH', True)
+    )
+
+
+change_status_cache = _build_status_cache()
+
+
+@receiver(post_save, sender=ChangeRequest)
+@receiver(post_delete, sender=ChangeRequest)
+def _invalidate_change_status(sender, instance, **kwargs):
+    change_status_cache.invalidate(instance.pk)
@@ -0,0 +1,268 @@
+"""
+Incremental pull of ServiceNow change requests into ChangeRequest
+
+The change_request table is read in pages ordered by (sys_updated_on,
+sys_id), starting after the position stored in a SyncCheckpoint. Each page
+is upserted on servicenow_sys_id with one bulk_create(update_conflicts=True)
+and the checkpoint is advanced in the same transaction, so a sync that stops
+half way resumes after the last page it applied.
+
+ServiceNow owns CHG numbers: a synced number held by another local row
+(whose record ServiceNow has since renumbered) is taken from that row, which
+gets a local number. A record that still cannot be applied stops the sync
+before it, and the checkpoint never moves past it.
+
+A change created by a change_request.fan_out job is linked to its local
+(LCHG) row only after the create returns. A sync that sees it in between
+matches it to that row by correlation_id, which the create sets to the
+local number, instead of inserting it as a second change request.
+
+Run by `manage.py sync_servicenow` (once, or every --interval seconds).
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import ChangeRequest, SyncCheckpoint
+from .numbering import LOCAL_CHANGE_PREFIX, change_number_allocator
+from .services import ServiceNowService
+from .status_cache import change_status_cache
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = 'servicenow.change_request'
+
+# change_request.state choice values
+STATE_LABELS = {
+    '-5': 'New',
+    '-4': 'Assess',
+    '-3': 'Authorize',
+    '-2': 'Scheduled',
+    '-1': 'Implement',
+    '0': 'Review',
+    '3': 'Closed',
+    '4': 'Canceled',
+}
+
+REMOTE_FIELDS = (
+    'sys_id', 'number', 'short_description', 'description', 'state', 'priority', 'sys_updated_on', 'correlation_id'
+)
+
+UPDATE_FIELDS = ['number', 'short_description', 'description', 'state', 'priority', 'updated_at']
+
+
+def sync_option(name: str, default: Any) -> Any:
+    """Read a SERVICENOW_SYNC setting"""
+    return getattr(settings, 'SERVICENOW_SYNC', {}).get(name, default)
+
+
+class ChangeRequestSync:
+    """
+    Pulls updated ServiceNow change requests page by page
+
+    Attributes:
+        service: ServiceNowService to read from
+        page_size: Records per request
+    """
+
+    def __init__(self, service: ServiceNowService, page_size: int = 500):
+        self.service = service
+        self.page_size = page_size
+
+    def run(self, max_pages: Optional[int] = None) -> Dict[str, int]:
+        """
+        Sync until no updated record is left (or max_pages were applied)
+
+        Returns:
+            Dict with pages, records, rekeyed (local rows that gave up their
+            number) and held (1 if a record could not be applied and the
+            sync stopped before it) counts
+        """
+        stats = {'pages': 0, 'records': 0, 'rekeyed': 0, 'held': 0}
+        while max_pages is None or stats['pages'] < max_pages:
+            applied, rekeyed, complete = self.sync_page()
+            if applied:
+                stats['pages'] += 1
+            stats['records'] += applied
+            stats['rekeyed'] += rekeyed
+            if not complete:
+                stats['held'] = 1
+                break
+            if applied < self.page_size:
+                break
+        return stats
+
+    def sync_page(self) -> tuple:
+        """
+        Fetch and apply the page after the checkpoint
+
+        Returns:
+            (records applied, local rows rekeyed, page complete) tuple; an
+            incomplete page left the checkpoint at the last applied record
+        """
+        checkpoint = self.checkpoint()
+        records = list(self.service.iter_updated_change_requests(
+            checkpoint.watermark,
+            checkpoint.last_key,
+            limit=self.page_size,
+            fields=REMOTE_FIELDS
+        ))
+        if not records:
+            return 0, 0, True
+
+        with transaction.atomic():
+            # Serializes concurrent syncs on the checkpoint row
+            checkpoint = SyncCheckpoint.objects.select_for_update().get(name=CHECKPOINT_NAME)
+            last = records[-1]
+            if (last['sys_updated_on'], last['sys_id']) <= (checkpoint.watermark, checkpoint.last_key):
+                # Another sync applied this page already
+                return 0, 0, True
+
+            applied, rekeyed = self._upsert(records)
+            if applied:
+                last = records[applied - 1]
+                checkpoint.watermark, checkpoint.last_key = last['sys_updated_on'], last['sys_id']
+                checkpoint.records += applied
+                checkpoint.save()
+
+        sys_ids = [record['sys_id'] for record in records[:applied]]
+        for change_request_id in ChangeRequest.objects.filter(servicenow_sys_id__in=sys_ids).values_list('id', flat=True):
+            change_status_cache.invalidate(change_request_id)
+
+        return applied, rekeyed, applied == len(records)
+
+    @staticmethod
+    def checkpoint() -> SyncCheckpoint:
+        checkpoint, _ = SyncCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+        return checkpoint
+
+    @staticmethod
+    def reset() -> None:
+        """Start the next sync from the beginning of the table"""
+        SyncCheckpoint.objects.filter(name=CHECKPOINT_NAME).update(
+            watermark='',
+            last_key='',
+            records=0,
+            updated_at=timezone.now()
+        )
+
+    def _upsert(self, records: List[Dict[str, Any]]) -> tuple:
+        """
+        Insert or update a page of records
+
+        Returns:
+            (records applied, local rows rekeyed) tuple; records after the
+            first one that could not be applied are left for the next sync
+        """
+        self._adopt(records)
+        objs = [self._to_model(record) for record in records]
+        try:
+            with transaction.atomic():
+                self._save(objs)
+            return len(objs), 0
+        except IntegrityError:
+            # A number held by another local change request; apply the page
+            # row by row to find it
+            pass
+
+        rekeyed = 0
+        for applied, obj in enumerate(objs):
+            try:
+                with transaction.atomic():
+                    self._save([obj])
+                continue
+            except IntegrityError:
+                pass
+            try:
+                with transaction.atomic():
+                    rekeyed += self._release_number(obj)
+                    self._save([obj])
+            except IntegrityError as error:
+                logger.error(
+                    "Cannot apply ServiceNow change %s (%s), sync stopped before it: %s",
+                    obj.number, obj.servicenow_sys_id, error
+                )
+                return applied, rekeyed
+        return len(objs), rekeyed
+
+    @staticmethod
+    def _adopt(records: List[Dict[str, Any]]) -> int:
+        """
+        Link records created for a local change request that is not linked yet
+
+        The local row takes the record's sys_id, so the upsert that follows
+        updates it rather than inserting a duplicate; the fan-out job later
+        writes the same link.
+
+        Returns:
+            Number of local rows linked
+        """
+        by_number = {
+            record['correlation_id']: record
+            for record in records
+            if (record.get('correlation_id') or '').startswith(LOCAL_CHANGE_PREFIX)
+        }
+        if not by_number:
+            return 0
+        known = set(
+            ChangeRequest.objects
+            .filter(servicenow_sys_id__in=[record['sys_id'] for record in by_number.values()])
+            .values_list('servicenow_sys_id', flat=True)
+        )
+        adopted = 0
+        for change_request in ChangeRequest.objects.filter(number__in=list(by_number)):
+            sys_id = by_number[change_request.number]['sys_id']
+            if sys_id in known:
+                continue
+            logger.info("ServiceNow change %s links to local change request %s", sys_id, change_request.number)
+            ChangeRequest.objects.filter(id=change_request.id).update(servicenow_sys_id=sys_id, updated_at=timezone.now())
+            adopted += 1
+        return adopted
+
+    @staticmethod
+    def _save(objs: List[ChangeRequest]) -> None:
+        ChangeRequest.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=['servicenow_sys_id'],
+            update_fields=UPDATE_FIELDS
+        )
+
+    @staticmethod
+    def _release_number(obj: ChangeRequest) -> int:
+        """
+        Give another row holding obj's number a local number instead
+
+        Returns:
+            Number of rows rekeyed (0 or 1)
+        """
+        holder = (
+            ChangeRequest.objects
+            .filter(number=obj.number)
+            .exclude(servicenow_sys_id=obj.servicenow_sys_id)
+            .first()
+        )
+        if holder is None:
+            return 0
+        local_number = change_number_allocator.allocate()
+        logger.warning(
+            "ServiceNow change %s (%s) takes its number from local change request %s (%s), now %s",
+            obj.number, obj.servicenow_sys_id, holder.id, holder.servicenow_sys_id, local_number
+        )
+        ChangeRequest.objects.filter(id=holder.id).update(number=local_number, updated_at=timezone.now())
+        change_status_cache.invalidate(holder.id)
+        return 1
+
+    @staticmethod
+    def _to_model(record: Dict[str, Any]) -> ChangeRequest:
+        return ChangeRequest(
+            servicenow_sys_id=record['sys_id'],
+            number=record['number'],
+            short_description=(record.get('short_description') or '')[:255],
+            description=record.get('description') or '',
+            state=STATE_LABELS.get(record.get('state'), record.get('state') or '')[:20],
+            priority=record.get('priority') or ''
+        )
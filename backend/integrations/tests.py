@@ -1,3 +1,949 @@
-from django.test import TestCase
+import io
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from chatbot.entities import extract_entities, normalize_change_number
+from . import enrichment, jobs, webhooks
+from .http_cache import ConditionalResponseCache
+from .models import ChangeRequest, HTTPCacheEntry, IntegrationJob, SyncCheckpoint, WebhookEvent
+from .numbering import LOCAL_CHANGE_PREFIX, NumberAllocator, change_number_allocator
+from .ratelimit import RateLimited, RateLimiter, max_wait
+from .status_cache import ChangeStatusCache, change_status_cache
+from .services import JiraService
+from .sync import CHECKPOINT_NAME, ChangeRequestSync
+from .transport import CircuitBreaker, CircuitOpenError, HTTPTransport
+
+
+def make_change_request(number: str, sys_id: str = None, **fields) -> ChangeRequest:
+    """Save a change request with defaults for the required fields"""
+    values = {
+        'servicenow_sys_id': sys_id or uuid.uuid4().hex,
+        'number': number,
+        'short_description': 'Test change',
+        'description': '',
+        'state': 'New',
+        'priority': '3',
+    }
+    values.update(fields)
+    return ChangeRequest.objects.create(**values)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class NumberAllocatorTests(TransactionTestCase):
+    """Concurrent allocation from separate allocators (one per worker process)"""
+
+    WORKERS = 4
+    PER_WORKER = 60
+
+    def tearDown(self):
+        change_number_allocator.discard()
+
+    def test_local_numbers_use_their_own_prefix(self):
+        number = change_number_allocator.allocate()
+        self.assertTrue(number.startswith(LOCAL_CHANGE_PREFIX))
+        self.assertRegex(number, r'^LCHG\d{7}$')
+
+    def test_concurrent_workers_never_share_a_number(self):
+        committed, errors = [], []
+        lock = threading.Lock()
+
+        def worker(seed):
+            allocator = NumberAllocator('change_request', prefix=LOCAL_CHANGE_PREFIX, block_size=7)
+            try:
+                for index in range(self.PER_WORKER):
+                    try:
+                        with transaction.atomic():
+                            number = allocator.allocate()
+                            make_change_request(number)
+                            # Every fifth transaction rolls back after taking a number
+                            if (index + seed) % 5 == 0:
+                                raise _Rollback
+                        with lock:
+                            committed.append(number)
+                    except _Rollback:
+                        pass
+            except IntegrityError as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual([number for number, seen in Counter(committed).items() if seen > 1], [])
+        self.assertEqual(ChangeRequest.objects.count(), len(committed))
+        self.assertEqual(len(committed), self.WORKERS * self.PER_WORKER * 4 // 5)
+
+    def test_rolled_back_block_is_not_handed_out_again(self):
+        allocator = NumberAllocator('change_request', prefix=LOCAL_CHANGE_PREFIX, block_size=5)
+        with self.assertRaises(_Rollback):
+            with transaction.atomic():
+                first = allocator.allocate()
+                raise _Rollback
+
+        other = NumberAllocator('change_request', prefix=LOCAL_CHANGE_PREFIX, block_size=5)
+        with transaction.atomic():
+            taken = other.allocate()
+        self.assertEqual(taken, first)
+        self.assertNotEqual(allocator.allocate(), taken)
+
+
+class ChangeNumberParsingTests(TestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize_change_number('chg12'), 'CHG0000012')
+        self.assertEqual(normalize_change_number('lchg7'), 'LCHG0000007')
+        self.assertEqual(normalize_change_number('INC1'), 'INC1')
+
+    def test_extract_local_number(self):
+        self.assertEqual(extract_entities('check status of lchg0000042')['change_number'], 'LCHG0000042')
+
+
+class FakeServiceNow:
+    """iter_updated_change_requests() over an in-memory table"""
+
+    def __init__(self, records):
+        self.records = sorted(records, key=lambda record: (record['sys_updated_on'], record['sys_id']))
+
+    def iter_updated_change_requests(self, watermark='', last_sys_id='', limit=500, fields=None):
+        after = [
+            record for record in self.records
+            if (record['sys_updated_on'], record['sys_id']) > (watermark, last_sys_id)
+        ]
+        return iter(after[:limit])
+
+
+def remote_change(sys_id: str, number: str, updated: str) -> dict:
+    return {
+        'sys_id': sys_id,
+        'number': number,
+        'short_description': f"Remote {number}",
+        'description': '',
+        'state': '-5',
+        'priority': '3',
+        'sys_updated_on': updated,
+    }
+
+
+class ChangeRequestSyncTests(TestCase):
+    def setUp(self):
+        self.records = [
+            remote_change('a' * 32, 'CHG0030001', '2026-10-01 10:00:00'),
+            remote_change('b' * 32, 'CHG0030002', '2026-10-01 10:00:00'),
+            remote_change('c' * 32, 'CHG0030003', '2026-10-01 11:00:00'),
+        ]
+
+    def checkpoint(self) -> SyncCheckpoint:
+        return SyncCheckpoint.objects.get(name=CHECKPOINT_NAME)
+
+    def test_pages_through_records_sharing_a_timestamp(self):
+        stats = ChangeRequestSync(FakeServiceNow(self.records), page_size=1).run()
+
+        self.assertEqual(stats['records'], 3)
+        self.assertEqual(stats['held'], 0)
+        self.assertEqual(ChangeRequest.objects.get(number='CHG0030002').state, 'New')
+        self.assertEqual(self.checkpoint().last_key, 'c' * 32)
+
+    def test_number_held_by_a_local_row_is_taken_over(self):
+        stale = make_change_request('CHG0030002', sys_id='d' * 32)
+
+        with self.assertLogs('integrations.sync', 'WARNING'):
+            stats = ChangeRequestSync(FakeServiceNow(self.records)).run()
+
+        self.assertEqual(stats, {'pages': 1, 'records': 3, 'rekeyed': 1, 'held': 0})
+        self.assertEqual(ChangeRequest.objects.get(number='CHG0030002').servicenow_sys_id, 'b' * 32)
+        stale.refresh_from_db()
+        self.assertTrue(stale.number.startswith(LOCAL_CHANGE_PREFIX))
+        self.assertEqual(self.checkpoint().last_key, 'c' * 32)
+
+    def test_checkpoint_stops_before_a_record_that_cannot_be_applied(self):
+        make_change_request('CHG0030002', sys_id='d' * 32)
+        sync = ChangeRequestSync(FakeServiceNow(self.records))
+
+        with mock.patch.object(ChangeRequestSync, '_release_number', return_value=0):
+            with self.assertLogs('integrations.sync', 'ERROR'):
+                stats = sync.run()
+
+        self.assertEqual(stats['records'], 1)
+        self.assertEqual(stats['held'], 1)
+        checkpoint = self.checkpoint()
+        self.assertEqual((checkpoint.watermark, checkpoint.last_key), ('2026-10-01 10:00:00', 'a' * 32))
+        self.assertFalse(ChangeRequest.objects.filter(servicenow_sys_id='c' * 32).exists())
+
+        # Once the clash can be resolved the next run picks the record up
+        with self.assertLogs('integrations.sync', 'WARNING'):
+            stats = sync.run()
+        self.assertEqual((stats['records'], stats['held']), (2, 0))
+        self.assertEqual(ChangeRequest.objects.get(number='CHG0030002').servicenow_sys_id, 'b' * 32)
+
+
+class JobQueueTests(TestCase):
+    """enqueue, claim_jobs, run_job and the dead-letter path"""
+
+    def setUp(self):
+        self.results = []
+        self.dead = []
+        jobs.register('test.job', on_dead=self.dead.append)(self.handle)
+        self.addCleanup(jobs.JOB_HANDLERS.pop, 'test.job')
+
+    def handle(self, job):
+        outcome = self.results.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def enqueue(self, **kwargs) -> IntegrationJob:
+        return jobs.enqueue('test.job', {}, **kwargs)
+
+    def test_claim_takes_due_jobs_most_urgent_first(self):
+        low, urgent = self.enqueue(priority=4), self.enqueue(priority=1)
+        self.enqueue(delay=60)
+
+        claimed = jobs.claim_jobs('worker-1', batch_size=10)
+
+        self.assertEqual([job.id for job in claimed], [urgent.id, low.id])
+        self.assertEqual(jobs.claim_jobs('worker-2', batch_size=10), [])
+        urgent.refresh_from_db()
+        self.assertEqual((urgent.status, urgent.locked_by, urgent.attempts), ('running', 'worker-1', 1))
+
+    def test_unknown_kind_is_rejected(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue('test.missing', {})
+
+    def test_failure_is_retried_with_backoff(self):
+        self.enqueue()
+        self.results.append(RuntimeError('timeout'))
+        [job] = jobs.claim_jobs('worker-1', batch_size=1)
+
+        with self.assertLogs('integrations.jobs', 'WARNING'):
+            self.assertFalse(jobs.run_job(job))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'pending')
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(job.last_error, 'RuntimeError: timeout')
+
+    def test_last_attempt_is_dead_lettered(self):
+        job = self.enqueue()
+        IntegrationJob.objects.filter(id=job.id).update(attempts=job.max_attempts - 1)
+        self.results.append(RuntimeError('timeout'))
+        [job] = jobs.claim_jobs('worker-1', batch_size=1)
+
+        with self.assertLogs('integrations.jobs', 'ERROR'):
+            jobs.run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'dead')
+        self.assertEqual([dead.id for dead in self.dead], [job.id])
+
+        self.assertEqual(jobs.requeue(IntegrationJob.objects.all()), 1)
+        self.results.append({'ok': True})
+        [job] = jobs.claim_jobs('worker-1', batch_size=1)
+        self.assertTrue(jobs.run_job(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.result), ('succeeded', 1, {'ok': True}))
+
+    def test_permanent_error_is_not_retried(self):
+        self.enqueue()
+        self.results.append(jobs.PermanentJobError('400 Bad Request'))
+        [job] = jobs.claim_jobs('worker-1', batch_size=1)
+
+        with self.assertLogs('integrations.jobs', 'ERROR'):
+            jobs.run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('dead', 1))
+
+    def test_deferred_job_keeps_its_attempts(self):
+        self.enqueue()
+        self.results.append(jobs.JobDeferred('not yet', delay=30))
+        [job] = jobs.claim_jobs('worker-1', batch_size=1)
+
+        self.assertFalse(jobs.run_job(job))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.last_error), ('pending', 0, ''))
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=20))
+
+    def test_expired_lease_is_released(self):
+        stale, live = self.enqueue(), self.enqueue()
+        jobs.claim_jobs('worker-1', batch_size=2)
+        IntegrationJob.objects.filter(id=stale.id).update(locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(jobs.release_stale_jobs(), 1)
+
+        stale.refresh_from_db()
+        live.refresh_from_db()
+        self.assertEqual((stale.status, stale.attempts), ('pending', 1))
+        self.assertEqual(live.status, 'running')
+
+
+class ConcurrentClaimTests(TransactionTestCase):
+    """Workers claiming from the same queue at once"""
+
+    WORKERS = 4
+    JOBS = 200
+
+    def test_no_job_is_claimed_twice(self):
+        IntegrationJob.objects.bulk_create(
+            IntegrationJob(kind='test.job', payload={}, run_after=timezone.now())
+            for _ in range(self.JOBS)
+        )
+        claimed, errors = [], []
+        lock = threading.Lock()
+
+        def worker(name):
+            try:
+                while True:
+                    batch = jobs.claim_jobs(name, batch_size=7)
+                    if not batch:
+                        return
+                    with lock:
+                        claimed.extend(job.id for job in batch)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(f"worker-{n}",)) for n in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(claimed), self.JOBS)
+        self.assertEqual(len(set(claimed)), self.JOBS)
+        self.assertFalse(IntegrationJob.objects.exclude(attempts=1).exists())
+
+
+class FanOutJobTests(TestCase):
+    """change_request.fan_out with the remote creates replaced"""
+
+    def setUp(self):
+        self.change_request = make_change_request('LCHG0000001', state='Pending')
+        self.job = IntegrationJob.objects.create(
+            kind='change_request.fan_out',
+            payload={'servicenow': {}, 'jira': {}, 'github': {'repo': 'org/app'}},
+            change_request=self.change_request,
+            status=IntegrationJob.STATUS_RUNNING,
+            locked_by='test',
+            run_after=timezone.now()
+        )
+        self.calls = Counter()
+        self.delays = {}
+        self.failures = {}
+
+    def create_remote(self, name, arguments):
+        self.calls[name] += 1
+        time.sleep(self.delays.get(name, 0))
+        if name in self.failures:
+            raise self.failures[name]
+        return {
+            'servicenow': {'servicenow_sys_id': 'f' * 32, 'number': 'CHG0030042', 'state': 'New'},
+            'jira': {'jira_issue_key': 'OPS-7'},
+            'github': {'github_repo': 'org/app', 'github_pr_number': 12},
+        }[name]
+
+    def run_job(self):
+        with mock.patch.object(jobs, '_create_remote', self.create_remote):
+            return jobs.change_request_fan_out(self.job)
+
+    def test_links_every_create(self):
+        self.run_job()
+
+        self.change_request.refresh_from_db()
+        self.assertEqual(self.change_request.number, 'CHG0030042')
+        self.assertEqual(self.change_request.jira_issue_key, 'OPS-7')
+        self.assertEqual(self.change_request.github_pr_number, 12)
+
+    def test_retry_repeats_only_failed_creates(self):
+        self.failures['jira'] = RuntimeError('Jira is down')
+        with self.assertRaises(RuntimeError):
+            self.run_job()
+
+        del self.failures['jira']
+        self.job.refresh_from_db()
+        self.run_job()
+
+        self.assertEqual(self.calls, Counter(servicenow=1, jira=2, github=1))
+        self.change_request.refresh_from_db()
+        self.assertEqual(self.change_request.jira_issue_key, 'OPS-7')
+
+    @override_settings(CHANGE_FAN_OUT={'CALL_TIMEOUT': 0.05})
+    def test_create_past_the_deadline_is_waited_for(self):
+        self.delays['github'] = 0.3
+
+        with self.assertLogs('integrations.jobs', 'WARNING'):
+            self.run_job()
+
+        self.assertEqual(self.calls['github'], 1)
+        self.job.refresh_from_db()
+        self.assertIn('github', self.job.payload['done'])
+        self.change_request.refresh_from_db()
+        self.assertEqual(self.change_request.github_pr_number, 12)
+
+    def test_sync_between_create_and_link_adopts_the_local_row(self):
+        remote = {
+            **remote_change('f' * 32, 'CHG0030042', '2026-10-01 10:00:00'),
+            'correlation_id': self.change_request.number,
+        }
+        update_change_request = jobs._update_change_request
+
+        def sync_first(job, **fields):
+            ChangeRequestSync(FakeServiceNow([remote])).run()
+            update_change_request(job, **fields)
+
+        with mock.patch.object(jobs, '_update_change_request', sync_first):
+            self.run_job()
+
+        self.assertEqual(ChangeRequest.objects.count(), 1)
+        self.change_request.refresh_from_db()
+        self.assertEqual(self.change_request.servicenow_sys_id, 'f' * 32)
+        self.assertEqual(self.change_request.number, 'CHG0030042')
+        self.assertEqual(self.change_request.jira_issue_key, 'OPS-7')
+
+    def test_update_of_a_pending_change_waits_for_the_fan_out(self):
+        self.change_request.short_description = 'Patch nginx today'
+        self.change_request.save()
+        update = jobs.schedule_change_update(self.change_request, {'short_description': 'Patch nginx today'})
+        IntegrationJob.objects.filter(id=update.id).update(run_after=timezone.now())
+        for _ in range(update.max_attempts + 1):
+            [claimed] = jobs.claim_jobs('worker-1', batch_size=1)
+            jobs.run_job(claimed)
+            IntegrationJob.objects.filter(id=update.id).update(run_after=timezone.now())
+
+        update.refresh_from_db()
+        self.assertEqual((update.status, update.attempts), ('pending', 0))
+
+        IntegrationJob.objects.filter(id=update.id).update(run_after=timezone.now() + timedelta(minutes=5))
+        self.run_job()
+
+        update.refresh_from_db()
+        self.assertLessEqual(update.run_after, timezone.now())
+
+    def test_failed_local_update_does_not_repeat_creates(self):
+        with mock.patch.object(jobs, '_update_change_request', side_effect=RuntimeError('database went away')):
+            with self.assertRaises(RuntimeError):
+                self.run_job()
+
+        self.job.refresh_from_db()
+        self.assertEqual(set(self.job.payload['done']), {'servicenow', 'jira', 'github'})
+        self.run_job()
+
+        self.assertEqual(self.calls, Counter(servicenow=1, jira=1, github=1))
+        self.change_request.refresh_from_db()
+        self.assertEqual(self.change_request.number, 'CHG0030042')
+        self.assertEqual(self.change_request.github_pr_number, 12)
+
+
+@override_settings(WEBHOOKS={'SERVICENOW_TOKEN': 'secret'})
+class WebhookTests(TestCase):
+    """POST /api/webhooks/servicenow/ and apply_pending()"""
+
+    url = '/api/webhooks/servicenow/'
+
+    def setUp(self):
+        self.change_request = make_change_request('CHG0030001', sys_id='a' * 32)
+
+    def deliver(self, delivery_id: str, record: dict):
+        return self.client.post(
+            self.url,
+            json.dumps(record),
+            content_type='application/json',
+            HTTP_X_WEBHOOK_TOKEN='secret',
+            HTTP_X_DELIVERY_ID=delivery_id
+        )
+
+    def test_delivery_needs_the_token(self):
+        response = self.client.post(self.url, '{}', content_type='application/json', HTTP_X_WEBHOOK_TOKEN='wrong')
+
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_redelivered_event_is_applied_once(self):
+        record = {'sys_id': 'a' * 32, 'state': '-1', 'sys_updated_on': '2026-10-01 10:00:00'}
+        self.assertEqual(self.deliver('evt-1', record).status_code, 202)
+        self.assertEqual(self.deliver('evt-1', record).status_code, 202)
+
+        self.assertEqual(webhooks.apply_pending(), {'applied': 1, 'duplicate': 1})
+        self.deliver('evt-1', record)
+        self.assertEqual(webhooks.apply_pending(), {'duplicate': 1})
+        self.change_request.refresh_from_db()
+        self.assertEqual(self.change_request.state, 'Implement')
+
+    def test_events_naming_one_change_by_sys_id_and_number_are_merged(self):
+        self.deliver('evt-1', {'sys_id': 'a' * 32, 'state': '-1', 'sys_updated_on': '2026-10-01 10:00:00'})
+        self.deliver('evt-2', {'number': 'CHG0030001', 'priority': '1', 'sys_updated_on': '2026-10-01 10:05:00'})
+
+        self.assertEqual(webhooks.apply_pending(), {'applied': 2})
+        self.change_request.refresh_from_db()
+        self.assertEqual((self.change_request.state, self.change_request.priority), ('Implement', '1'))
+
+
+class ChangeStatusCacheTests(TestCase):
+    """Stale-while-revalidate status cache (background refreshes recorded, not run)"""
+
+    def setUp(self):
+        self.change_request = make_change_request('CHG0030001', sys_id='a' * 32)
+        self.cache = ChangeStatusCache(remote_refresh=False)
+        self.refreshes = []
+        self.cache.refresh_in_background = self.refreshes.append
+
+    def test_miss_reads_the_database_then_serves_from_memory(self):
+        self.assertEqual(self.cache.get(number='CHG0030001')['state'], 'New')
+        self.assertEqual(self.refreshes, [self.change_request.id])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cache.get(number='CHG0030001')['id'], self.change_request.id)
+            self.assertEqual(self.cache.get(sys_id='a' * 32)['id'], self.change_request.id)
+        self.assertEqual(len(self.refreshes), 1)
+
+    def test_stale_entry_is_served_while_it_refreshes(self):
+        self.cache.fresh_ttl = 0
+        self.cache.get(number='CHG0030001')
+        ChangeRequest.objects.filter(id=self.change_request.id).update(state='Implement')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cache.get(number='CHG0030001')['state'], 'New')
+        self.assertEqual(self.refreshes, [self.change_request.id] * 2)
+
+        self.cache.refresh(self.change_request.id)
+        self.assertEqual(self.cache.get(number='CHG0030001')['state'], 'Implement')
+
+    def test_unknown_change_is_not_cached(self):
+        self.assertIsNone(self.cache.get(number='CHG0099999'))
+        self.assertEqual(self.refreshes, [])
+
+    def test_refresh_stores_the_remote_state(self):
+        self.cache.remote_refresh = True
+        service = mock.Mock()
+        service.get_change_request.return_value = {'state': 'Scheduled'}
+
+        with mock.patch('integrations.status_cache.get_servicenow_service', return_value=service):
+            data = self.cache.refresh(self.change_request.id)
+
+        self.assertEqual(data['state'], 'Scheduled')
+        self.change_request.refresh_from_db()
+        self.assertEqual(self.change_request.state, 'Scheduled')
+
+    def test_saving_a_change_request_invalidates_it(self):
+        with mock.patch.object(change_status_cache, 'refresh_in_background'):
+            change_status_cache.get(number='CHG0030001')
+            self.change_request.state = 'Closed'
+            self.change_request.save()
+
+            self.assertEqual(change_status_cache.get(number='CHG0030001')['state'], 'Closed')
+        change_status_cache.invalidate(self.change_request.id)
+
+    def test_concurrent_refreshes_of_one_change_are_coalesced(self):
+        cache = ChangeStatusCache()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def refresh(change_request_id):
+            calls.append(change_request_id)
+            started.set()
+            release.wait(5)
+
+        with mock.patch.object(cache, 'refresh', side_effect=refresh):
+            for _ in range(3):
+                cache.refresh_in_background(7)
+            started.wait(5)
+            release.set()
+            cache._executor.shutdown(wait=True)
+
+        self.assertEqual(calls, [7])
+
+
+def stub_response(status: int, headers: dict = None, body: dict = None) -> requests.Response:
+    """A requests.Response as the session would return it"""
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = json.dumps(body or {}).encode() if status != 304 else b''
+    response.raw = io.BytesIO()
+    response.url = 'https://stub.example.com/'
+    return response
+
+
+class HTTPTransportTests(TestCase):
+    """HTTPTransport with session.request replaced"""
+
+    def transport(self, **kwargs) -> HTTPTransport:
+        kwargs.setdefault('backoff_base', 0)
+        return HTTPTransport('stub', 'https://stub.example.com', **kwargs)
+
+    def test_get_is_retried_until_it_succeeds(self):
+        transport = self.transport(retries=3)
+        answers = [stub_response(503), stub_response(503), stub_response(200)]
+
+        with mock.patch.object(transport.session, 'request', side_effect=answers) as request:
+            self.assertEqual(transport.get('flaky').status_code, 200)
+        self.assertEqual(request.call_count, 3)
+
+    def test_post_is_not_retried(self):
+        transport = self.transport(retries=3)
+
+        with mock.patch.object(transport.session, 'request', return_value=stub_response(503)) as request:
+            with self.assertRaises(requests.HTTPError):
+                transport.post('flaky')
+        self.assertEqual(request.call_count, 1)
+
+    def test_timeouts_are_retried_then_raised(self):
+        transport = self.transport(retries=2)
+
+        with mock.patch.object(transport.session, 'request', side_effect=requests.Timeout('read timed out')) as request:
+            with self.assertRaises(requests.Timeout):
+                transport.get('slow')
+        self.assertEqual(request.call_count, 3)
+        self.assertEqual(request.call_args.kwargs['timeout'], transport.timeout)
+
+    def test_circuit_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker('stub', failure_threshold=3, reset_timeout=60)
+        transport = self.transport(retries=0, breaker=breaker)
+        rejected = 0
+
+        with mock.patch.object(transport.session, 'request', return_value=stub_response(503)) as request:
+            with self.assertLogs('integrations.transport', 'WARNING'):
+                for _ in range(10):
+                    try:
+                        transport.get('down')
+                    except requests.HTTPError:
+                        pass
+                    except CircuitOpenError:
+                        rejected += 1
+
+        self.assertEqual((request.call_count, rejected), (3, 7))
+        self.assertEqual(breaker.state, 'open')
+
+    def test_successful_trial_closes_the_circuit(self):
+        breaker = CircuitBreaker('stub', failure_threshold=1, reset_timeout=0)
+        transport = self.transport(retries=0, breaker=breaker)
+        with self.assertLogs('integrations.transport', 'WARNING'):
+            breaker.record_failure()
+        self.assertEqual(breaker.state, 'half-open')
+
+        with mock.patch.object(transport.session, 'request', return_value=stub_response(200)):
+            transport.get('ok')
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_unexpected_error_ends_a_half_open_trial(self):
+        breaker = CircuitBreaker('stub', failure_threshold=1, reset_timeout=0)
+        transport = self.transport(retries=0, breaker=breaker)
+        with self.assertLogs('integrations.transport', 'WARNING'):
+            breaker.record_failure()
+
+        with mock.patch.object(transport.session, 'request', side_effect=requests.exceptions.InvalidURL('bad url')):
+            with self.assertRaises(requests.exceptions.InvalidURL):
+                transport.get('ok')
+
+        self.assertEqual(breaker.state, 'half-open')
+        with mock.patch.object(transport.session, 'request', return_value=stub_response(200)):
+            self.assertEqual(transport.get('ok').status_code, 200)
+        self.assertEqual(breaker.state, 'closed')
+
+
+class RateLimiterTests(TestCase):
+    """RateLimiter on its own and behind HTTPTransport"""
+
+    def transport(self, limiter: RateLimiter) -> HTTPTransport:
+        return HTTPTransport('stub', 'https://stub.example.com', retries=0, limiter=limiter)
+
+    def test_calls_beyond_the_burst_are_paced(self):
+        limiter = RateLimiter('stub', rate=50, burst=5)
+        sleeps = []
+
+        with mock.patch('integrations.ratelimit.time.sleep', sleeps.append):
+            for _ in range(30):
+                limiter.acquire()
+                limiter.release()
+
+        # Five go at once, the other 25 are spread over half a second
+        self.assertEqual(len(sleeps), 25)
+        self.assertAlmostEqual(sleeps[-1], 25 / 50, delta=0.02)
+
+    def test_empty_bucket_fails_fast_under_max_wait_zero(self):
+        transport = self.transport(RateLimiter('stub', rate=1, burst=2))
+
+        with mock.patch.object(transport.session, 'request', return_value=stub_response(200)) as request:
+            transport.get('ok')
+            transport.get('ok')
+            with max_wait(0):
+                with self.assertRaises(RateLimited) as raised:
+                    transport.get('ok')
+
+        self.assertEqual(request.call_count, 2)
+        self.assertAlmostEqual(raised.exception.retry_after, 1.0)
+
+    def test_not_modified_answers_give_their_token_back(self):
+        transport = self.transport(RateLimiter('stub', rate=1, burst=2))
+
+        with mock.patch.object(transport.session, 'request', return_value=stub_response(304)):
+            with max_wait(0):
+                for _ in range(20):
+                    transport.get('unchanged', raise_for_status=False)
+
+    def test_retry_after_pauses_every_caller_and_halves_concurrency(self):
+        limiter = RateLimiter('stub', rate=100, burst=100, max_concurrency=8)
+        transport = self.transport(limiter)
+
+        with mock.patch.object(transport.session, 'request', return_value=stub_response(429, {'Retry-After': '1'})):
+            with self.assertRaises(requests.HTTPError):
+                transport.get('limited')
+
+        self.assertEqual(limiter.stats()['concurrency_limit'], 4)
+        self.assertGreater(limiter.paused_for(), 0.5)
+        with max_wait(0):
+            with self.assertRaises(RateLimited):
+                limiter.acquire()
+
+    def test_concurrency_grows_back_on_success(self):
+        limiter = RateLimiter('stub', max_concurrency=8)
+        limiter.acquire()
+        limiter.release(overloaded=True)
+        self.assertEqual(limiter.stats()['concurrency_limit'], 4)
+
+        # About one more per round of calls at the current limit (4, then 5)
+        for _ in range(10):
+            limiter.acquire()
+            limiter.release()
+
+        self.assertEqual(limiter.stats()['concurrency_limit'], 6)
+
+
+class FakeJiraTransport:
+    """Jira API stand-in: one project with a Task type, bulk create and search"""
+
+    def __init__(self, existing=()):
+        self.existing = set(existing)
+        self.posts = []
+        self.gets = 0
+
+    def get(self, path, params=None):
+        self.gets += 1
+        if path.endswith('/issuetypes'):
+            return stub_response(200, body={'values': [{'name': 'Task', 'id': '10001'}]})
+        return stub_response(200, body={'values': [{'fieldId': 'summary'}, {'fieldId': 'description'}]})
+
+    def post(self, path, json=None, raise_for_status=True, idempotent=False):
+        self.posts.append((path, json))
+        if path == 'rest/api/2/issue/bulk':
+            updates = json['issueUpdates']
+            bad = [i for i, update in enumerate(updates) if not update['fields']['summary']]
+            offset = sum(len(body['issueUpdates']) for p, body in self.posts[:-1] if p == path)
+            return stub_response(400 if bad else 201, body={
+                'issues': [
+                    {'key': f"OPS-{offset + i}", 'id': str(offset + i)}
+                    for i in range(len(updates)) if i not in bad
+                ],
+                'errors': [
+                    {'failedElementNumber': i, 'status': 400,
+                     'elementErrors': {'errors': {'summary': 'Summary is required'}}}
+                    for i in bad
+                ],
+            })
+        keys = json['jql'][len('key in ('):-1].split(', ')
+        return stub_response(200, body={
+            'issues': [{'key': key, 'fields': {'summary': key}} for key in keys if key in self.existing]
+        })
+
+
+@override_settings(JIRA_ISSUES={'BULK_SIZE': 20})
+class JiraServiceTests(TestCase):
+    """JiraService bulk create and batched search against FakeJiraTransport"""
+
+    def setUp(self):
+        credentials = {'JIRA_URL': 'https://jira.example.com', 'JIRA_EMAIL': 'bot@example.com', 'JIRA_API_TOKEN': 'x'}
+        with mock.patch.dict('os.environ', credentials):
+            self.service = JiraService()
+        self.transport = self.service.transport = FakeJiraTransport()
+
+    def test_bulk_create_sends_chunks_and_keeps_item_order(self):
+        batch = [{'project': 'OPS', 'summary': f"Change {n}", 'description': ''} for n in range(45)]
+        batch[21]['summary'] = ''
+        batch[30]['issue_type'] = 'Epic'
+
+        results = self.service.create_issues(batch)
+
+        sizes = [len(body['issueUpdates']) for _, body in self.transport.posts]
+        self.assertEqual(sizes, [20, 20, 4])
+        self.assertEqual(self.transport.gets, 2)
+        self.assertEqual(results[0], {'key': 'OPS-0', 'id': '0'})
+        self.assertEqual(results[21], {'error': 'summary: Summary is required'})
+        self.assertIn('no issue type', results[30]['error'])
+        self.assertEqual(results[22], {'key': 'OPS-22', 'id': '22'})
+        self.assertEqual(sum('key' in result for result in results), 43)
+
+    def test_search_runs_one_query_per_batch_and_drops_unknown_keys(self):
+        keys = [f"OPS-{n}" for n in range(250)]
+        self.transport.existing = set(keys[:200])
+
+        issues = self.service.search_issues(keys + ['OPS-999'])
+
+        self.assertEqual(len(self.transport.posts), 3)
+        self.assertEqual(len(issues), 200)
+        self.assertEqual(issues['OPS-7'], {'summary': 'OPS-7'})
+        self.assertTrue(all(body['validateQuery'] == 'warn' for _, body in self.transport.posts))
+
+
+class FakeGetTransport:
+    """Returns queued responses to GETs and records the headers sent"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def url(self, path):
+        return f"https://api.example.com/{path}"
+
+    def get(self, url, headers=None, raise_for_status=True):
+        self.sent.append(headers)
+        return self.responses.pop(0)
+
+
+class ConditionalResponseCacheTests(TestCase):
+    """ETag / Last-Modified revalidation of stored GET responses"""
+
+    def setUp(self):
+        self.cache = ConditionalResponseCache('test', max_entries=2)
+
+    def test_304_returns_the_stored_body(self):
+        transport = FakeGetTransport(
+            stub_response(200, {'ETag': '"v1"', 'X-RateLimit-Remaining': '4999'}, {'state': 'open'}),
+            stub_response(304, {'ETag': '"v2"'}),
+            stub_response(304),
+        )
+
+        self.assertEqual(self.cache.get_json(transport, 'pulls/1'), {'state': 'open'})
+        self.assertEqual(self.cache.get_json(transport, 'pulls/1'), {'state': 'open'})
+        self.assertEqual(self.cache.get_json(transport, 'pulls/1'), {'state': 'open'})
+
+        self.assertEqual(transport.sent, [{}, {'If-None-Match': '"v1"'}, {'If-None-Match': '"v2"'}])
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['rate_limit_remaining']), (2, 1, 4999))
+
+    def test_changed_resource_replaces_the_stored_copy(self):
+        transport = FakeGetTransport(
+            stub_response(200, {'Last-Modified': 'Sat, 17 Oct 2026 10:00:00 GMT'}, {'state': 'open'}),
+            stub_response(200, {'ETag': '"v2"'}, {'state': 'closed'}),
+        )
+
+        self.cache.get_json(transport, 'pulls/1')
+        self.assertEqual(self.cache.get_json(transport, 'pulls/1'), {'state': 'closed'})
+
+        self.assertEqual(transport.sent[1], {'If-Modified-Since': 'Sat, 17 Oct 2026 10:00:00 GMT'})
+        entry = HTTPCacheEntry.objects.get()
+        self.assertEqual((entry.etag, entry.last_modified), ('"v2"', ''))
+
+    def test_response_without_validators_is_not_kept(self):
+        transport = FakeGetTransport(
+            stub_response(200, {'ETag': '"v1"'}, {'state': 'open'}),
+            stub_response(200, body={'state': 'open'}),
+        )
+
+        self.cache.get_json(transport, 'pulls/1')
+        self.cache.get_json(transport, 'pulls/1')
+
+        self.assertFalse(HTTPCacheEntry.objects.exists())
+
+    def test_least_recently_used_entry_is_evicted(self):
+        transport = FakeGetTransport(*[stub_response(200, {'ETag': f'"{n}"'}, {'n': n}) for n in range(3)])
+
+        for n in range(3):
+            self.cache.get_json(transport, f"pulls/{n}")
+
+        self.assertEqual(
+            sorted(HTTPCacheEntry.objects.values_list('url', flat=True)),
+            ['https://api.example.com/pulls/1', 'https://api.example.com/pulls/2']
+        )
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+
+class EnrichmentTests(TestCase):
+    """enrich(): batched lookups, the status cache and rate-limit degradation"""
+
+    ROWS = [
+        {'jira_issue_key': 'OPS-1', 'github_repo': 'org/app', 'github_pr_number': 12},
+        {'jira_issue_key': 'OPS-2', 'github_repo': None, 'github_pr_number': None},
+        {'jira_issue_key': 'not a key', 'github_repo': None, 'github_pr_number': None},
+    ]
+
+    def setUp(self):
+        enrichment.clear_cache()
+        self.addCleanup(enrichment.clear_cache)
+        self.searches = []
+        self.pull_request_lookups = []
+
+    def rows(self):
+        return [dict(row) for row in self.ROWS]
+
+    def search_issues(self, keys, fields, batch_size):
+        self.searches.append(keys)
+        return {'OPS-1': {'status': {'name': 'Done'}, 'summary': 'Patch nginx'}}
+
+    def get_pull_requests(self, links, batch_size):
+        self.pull_request_lookups.append(links)
+        return {('org/app', 12): {'state': 'MERGED', 'title': 'Patch nginx'}}
+
+    def enrich(self, rows, jira=None):
+        jira = jira or mock.Mock(search_issues=self.search_issues)
+        github = mock.Mock(get_pull_requests=self.get_pull_requests)
+        with mock.patch.object(enrichment, 'get_jira_service', return_value=jira), \
+                mock.patch.object(enrichment, 'get_github_service', return_value=github):
+            return enrichment.enrich(rows)
+
+    def test_links_are_resolved_once_and_cached(self):
+        first = self.enrich(self.rows())
+        second = self.enrich(self.rows())
+
+        self.assertEqual(second, first)
+        self.assertEqual(self.searches, [['OPS-1', 'OPS-2']])
+        self.assertEqual(self.pull_request_lookups, [[('org/app', 12)]])
+        self.assertEqual(first[0]['jira_issue'], {'status': 'Done', 'summary': 'Patch nginx'})
+        self.assertEqual(first[0]['github_pull_request']['state'], 'MERGED')
+        self.assertIsNone(first[1]['jira_issue'])
+        self.assertIsNone(first[2]['jira_issue'])
+
+        enrichment.forget('jira', 'OPS-1')
+        self.enrich(self.rows())
+        self.assertEqual(self.searches[-1], ['OPS-1'])
+
+    def test_empty_rate_limit_leaves_the_field_empty_without_waiting(self):
+        credentials = {'JIRA_URL': 'https://jira.example.com', 'JIRA_EMAIL': 'bot@example.com', 'JIRA_API_TOKEN': 'x'}
+        with mock.patch.dict('os.environ', credentials):
+            jira = JiraService()
+        limiter = RateLimiter('jira', rate=0.01, burst=1)
+        limiter.acquire()
+        limiter.release()
+        jira.transport = HTTPTransport('jira', 'https://jira.example.com', retries=0, limiter=limiter)
+
+        started = time.monotonic()
+        with mock.patch.object(jira.transport.session, 'request') as request:
+            with self.assertLogs('integrations.enrichment', 'WARNING'):
+                rows = self.enrich(self.rows(), jira=jira)
+
+        self.assertLess(time.monotonic() - started, 1)
+        request.assert_not_called()
+        self.assertIsNone(rows[0]['jira_issue'])
+        self.assertEqual(rows[0]['github_pull_request']['state'], 'MERGED')
+
+        # Nothing was cached, so the next listing tries again
+        self.enrich(self.rows())
+        self.assertEqual(self.searches, [['OPS-1', 'OPS-2']])
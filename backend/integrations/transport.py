@@ -0,0 +1,399 @@
+"""
+Shared HTTP transport for the integration services
+
+Each integration (ServiceNow, Jira, GitHub) gets one HTTPTransport per
+process. It keeps a requests.Session whose urllib3 pools hold keep-alive
+connections per host, so the TCP and TLS setup is paid once rather than on
+every call. Every request has a connect and a read timeout; idempotent
+requests are retried on connection errors, timeouts, 429 and 502-504 with
+jittered exponential backoff; and a circuit breaker stops calling an
+integration that keeps failing until RESET_TIMEOUT has passed.
+
+Every attempt also takes a permit from the integration's RateLimiter
+(integrations/ratelimit.py), which paces calls per credential and backs off
+on 429s.
+
+Options come from INTEGRATION_HTTP, optionally overridden per integration
+(INTEGRATION_HTTP['SERVICENOW'] etc.).
+"""
+import codecs
+import json
+import logging
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from .ratelimit import RateLimiter, credential_key, get_limiter
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+DEFAULTS = {
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 30,
+    'RETRIES': 3,
+    'BACKOFF_BASE': 0.5,
+    'BACKOFF_MAX': 8,
+    'POOL_MAXSIZE': 10,
+    'BREAKER_FAILURES': 5,
+    'BREAKER_RESET': 30,
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an integration whose circuit is open"""
+
+
+def is_client_error(error: Exception) -> bool:
+    """Whether an error is a 4xx response that retrying will not fix"""
+    if not isinstance(error, requests.HTTPError) or error.response is None:
+        return False
+    status = error.response.status_code
+    return 400 <= status < 500 and status not in (408, 429)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    Closed: calls go through. After failure_threshold consecutive failures
+    it opens and rejects calls for reset_timeout seconds; then one trial
+    call is let through (half-open), whose outcome closes or reopens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def before_call(self) -> None:
+        """
+        Admit a call or refuse it
+
+        Raises:
+            CircuitOpenError: The circuit is open, or the half-open trial
+                call is already running
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining > 0 or self._trial_running:
+                raise CircuitOpenError(
+                    f"{self.name} is unavailable (circuit open, retry in {max(remaining, 0):.0f}s)"
+                )
+            self._trial_running = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("Circuit for %s opened after %s failures", self.name, self._failures)
+                self._opened_at = time.monotonic()
+
+
+class HTTPTransport:
+    """
+    Pooled, retrying HTTP client for one integration
+
+    Attributes:
+        name: Integration name (for logs and errors)
+        base_url: Prefix for relative request paths
+        breaker: The integration's CircuitBreaker
+        limiter: RateLimiter every attempt takes a permit from (optional)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        auth: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        connect_timeout: float = DEFAULTS['CONNECT_TIMEOUT'],
+        read_timeout: float = DEFAULTS['READ_TIMEOUT'],
+        retries: int = DEFAULTS['RETRIES'],
+        backoff_base: float = DEFAULTS['BACKOFF_BASE'],
+        backoff_max: float = DEFAULTS['BACKOFF_MAX'],
+        pool_maxsize: int = DEFAULTS['POOL_MAXSIZE'],
+        breaker: Optional[CircuitBreaker] = None,
+        limiter: Optional[RateLimiter] = None
+    ):
+        self.name = name
+        self.base_url = base_url.rstrip('/') + '/'
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker(name)
+        self.limiter = limiter
+
+        # Retries are done here (with the breaker in the loop), not by urllib3
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.auth = auth
+        self.session.headers.update({'Accept': 'application/json'})
+        self.session.headers.update(headers or {})
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        idempotent: Optional[bool] = None,
+        raise_for_status: bool = True,
+        **kwargs
+    ) -> requests.Response:
+        """
+        Send a request, retrying idempotent ones
+
+        Args:
+            method: HTTP method
+            path: URL relative to base_url (or absolute)
+            idempotent: Whether retrying is safe; defaults by method
+            raise_for_status: Raise requests.HTTPError for 4xx/5xx responses
+            **kwargs: Passed to requests (json, params, headers, ...)
+
+        Returns:
+            The response
+
+        Raises:
+            CircuitOpenError: The integration's circuit is open
+            RateLimited: No rate limit permit within the caller's wait
+            requests.RequestException: The request failed for good
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        attempts = 1 + (self.retries if idempotent else 0)
+        url = self.url(path)
+        kwargs.setdefault('timeout', self.timeout)
+
+        for attempt in range(1, attempts + 1):
+            if self.limiter is not None:
+                self.limiter.acquire()
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self._release(overloaded=False)
+                raise
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                self._release(overloaded=True)
+                self.breaker.record_failure()
+                if attempt == attempts:
+                    raise
+                delay = self._backoff(attempt)
+                logger.info("%s %s %s failed (%s), retry %s in %.2fs", self.name, method, path, error, attempt, delay)
+                time.sleep(delay)
+                continue
+            except Exception:
+                # E.g. an invalid URL or a broken body: not retried, but it
+                # counts as a failure so a half-open trial call ends
+                self._release(overloaded=False)
+                self.breaker.record_failure()
+                raise
+
+            pause = self._quota_pause(response)
+            self._release(
+                overloaded=response.status_code >= 500 or response.status_code == 429 or pause is not None,
+                retry_after=pause,
+                free=response.status_code == 304
+            )
+            if response.status_code >= 500 or response.status_code == 429:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
+            if response.status_code in RETRY_STATUSES and attempt < attempts:
+                delay = self._retry_after(response) or self._backoff(attempt)
+                logger.info("%s %s %s returned %s, retry %s in %.2fs",
+                            self.name, method, path, response.status_code, attempt, delay)
+                response.close()
+                time.sleep(delay)
+                continue
+
+            if raise_for_status:
+                response.raise_for_status()
+            return response
+
+    def url(self, path: str) -> str:
+        """Absolute URL of a path relative to base_url"""
+        return urljoin(self.base_url, path.lstrip('/')) if '://' not in path else path
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request('POST', path, **kwargs)
+
+    def patch(self, path: str, **kwargs) -> requests.Response:
+        return self.request('PATCH', path, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _backoff(self, attempt: int) -> float:
+        """Full jitter: uniform(0, min(cap, base * 2^(attempt-1)))"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def _release(self, overloaded: bool, retry_after: Optional[float] = None, free: bool = False) -> None:
+        if self.limiter is not None:
+            self.limiter.release(overloaded, retry_after, free)
+
+    @staticmethod
+    def _quota_pause(response: requests.Response) -> Optional[float]:
+        """Seconds the server asked every caller to hold off, if it did"""
+        headers = response.headers
+        if response.status_code in (429, 503) and headers.get('Retry-After', '').isdigit():
+            return float(headers['Retry-After'])
+        # GitHub's primary rate limit: 403/429 with nothing remaining
+        if response.status_code in (403, 429) and headers.get('X-RateLimit-Remaining') == '0':
+            reset = headers.get('X-RateLimit-Reset', '')
+            if reset.isdigit():
+                return max(0.0, int(reset) - time.time())
+        return None
+
+    def _retry_after(self, response: requests.Response) -> Optional[float]:
+        value = response.headers.get('Retry-After', '')
+        if value.isdigit():
+            return min(float(value), self.backoff_max)
+        return None
+
+
+def iter_json_items(chunks: Iterable[bytes], key: str) -> Iterator[Any]:
+    """
+    Yield the elements of the array under `key` in a JSON object as they arrive
+
+    Only the element being parsed is buffered, so a large response is never
+    held as one string nor as one decoded list.
+
+    Args:
+        chunks: Raw body chunks (e.g. response.iter_content(65536))
+        key: Member holding the array (e.g. 'result')
+
+    Raises:
+        ValueError: The body ends before the array does
+    """
+    chunks = iter(chunks)
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder('utf-8')()
+    start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    buffer = ''
+    exhausted = False
+
+    def read() -> bool:
+        nonlocal buffer, exhausted
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            buffer += text.decode(b'', final=True)
+            return False
+        buffer += text.decode(chunk)
+        return True
+
+    # Find the opening bracket
+    while True:
+        match = start.search(buffer)
+        if match:
+            buffer = buffer[match.end():]
+            break
+        if not read():
+            return
+
+    position = 0
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if position == len(buffer):
+            buffer, position = '', 0
+            if not read():
+                raise ValueError(f"JSON ended inside the {key!r} array")
+            continue
+        if buffer[position] == ']':
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            item, end = None, None
+        # A complete element is followed by ',' or ']'; otherwise read on
+        if end is None or (end == len(buffer) and not exhausted):
+            if not read():
+                if end is None:
+                    raise ValueError(f"JSON ended inside the {key!r} array")
+            continue
+
+        yield item
+        buffer, position = buffer[end:], 0
+
+
+def transport_options(integration: str) -> Dict[str, Any]:
+    """INTEGRATION_HTTP options for one integration, with defaults"""
+    configured = getattr(settings, 'INTEGRATION_HTTP', {})
+    options = {name: configured.get(name, default) for name, default in DEFAULTS.items()}
+    options.update(configured.get(integration.upper(), {}))
+    return options
+
+
+def build_transport(integration: str, base_url: str, auth: Any = None,
+                    headers: Optional[Dict[str, str]] = None) -> HTTPTransport:
+    """
+    Create the transport for an integration from INTEGRATION_HTTP
+
+    Args:
+        integration: 'servicenow', 'jira' or 'github'
+        base_url: API root
+        auth: requests auth (e.g. a (user, password) tuple)
+        headers: Headers sent with every request
+    """
+    options = transport_options(integration)
+    return HTTPTransport(
+        integration,
+        base_url,
+        auth=auth,
+        headers=headers,
+        connect_timeout=options['CONNECT_TIMEOUT'],
+        read_timeout=options['READ_TIMEOUT'],
+        retries=options['RETRIES'],
+        backoff_base=options['BACKOFF_BASE'],
+        backoff_max=options['BACKOFF_MAX'],
+        pool_maxsize=options['POOL_MAXSIZE'],
+        breaker=CircuitBreaker(
+            integration,
+            failure_threshold=options['BREAKER_FAILURES'],
+            reset_timeout=options['BREAKER_RESET']
+        ),
+        limiter=get_limiter(integration, credential_key(auth, headers))
+    )
@@ -1,19 +1,42 @@
 """
 URL configuration for integrations app
 """
+from django.http import JsonResponse
 from django.urls import path
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework import generics
+from .enrichment import enrich
 from .models import ChangeRequest
+from .webhooks import WebhookRejected, receive
 from chatbot.serializers import ChangeRequestSerializer
 
 app_name = 'integrations'
 
 
+def wants_enrichment(request) -> bool:
+    """?enrich=true asks for live GitHub PR and Jira issue status"""
+    return request.query_params.get('enrich', '').lower() in ('1', 'true', 'yes')
+
+
 class ChangeRequestListView(generics.ListAPIView):
-    """List all change requests"""
+    """
+    List all change requests
+
+    With ?enrich=true each row also has github_pull_request and jira_issue,
+    resolved for the whole list in batched calls (integrations/enrichment.py).
+    """
     queryset = ChangeRequest.objects.all()
     serializer_class = ChangeRequestSerializer
 
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if wants_enrichment(request):
+            rows = response.data['results'] if isinstance(response.data, dict) else response.data
+            enrich(rows)
+        return response
+
 
 class ChangeRequestDetailView(generics.RetrieveAPIView):
     """Get a specific change request"""
@@ -21,8 +44,35 @@ class ChangeRequestDetailView(generics.RetrieveAPIView):
     serializer_class = ChangeRequestSerializer
     lookup_field = 'id'
 
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if wants_enrichment(request):
+            enrich([response.data])
+        return response
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class WebhookView(View):
+    """
+    Receive a ServiceNow, Jira or GitHub webhook
+    POST /api/webhooks/<source>/
+
+    Stores the delivery in the inbox and answers 202; apply_webhook_events
+    applies it (integrations/webhooks.py). Plain Django view: no parsing or
+    DRF negotiation on this path.
+    """
+    http_method_names = ['post']
+
+    def post(self, request, source):
+        try:
+            event = receive(source, request.headers, request.body)
+        except WebhookRejected as error:
+            return JsonResponse({'error': str(error)}, status=error.status)
+        return JsonResponse({'id': event.id}, status=202)
+
 
 urlpatterns = [
     path('change-requests/', ChangeRequestListView.as_view(), name='change-request-list'),
     path('change-requests/<int:id>/', ChangeRequestDetailView.as_view(), name='change-request-detail'),
+    path('webhooks/<str:source>/', WebhookView.as_view(), name='webhook'),
 ]
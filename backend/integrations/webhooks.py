@@ -0,0 +1,388 @@
+"""
+Inbound webhooks from ServiceNow, Jira and GitHub
+
+Keeping change requests current by polling costs a remote call per change
+per poll. Instead, each integration pushes events to
+POST /api/webhooks/<source>/. The endpoint only checks the signature (or
+token) and inserts the raw body into the WebhookEvent inbox, then answers
+202; nothing is parsed or applied on the request path, so an event storm
+costs one small INSERT per delivery.
+
+apply_pending() (run by `manage.py apply_webhook_events`) drains the inbox
+in batches, inside one transaction per batch:
+
+1. Deliveries already seen (same source and delivery id) are marked
+   duplicate; senders retry, so this is common.
+2. Each event becomes field changes for one change request. Changes for the
+   same change request are merged in event time order, so ten events about
+   one change cost one row update with the latest values.
+3. The rows are written with one bulk_update, the events are marked
+   processed, and cached status (status cache, listing enrichment) of the
+   touched change requests is dropped.
+
+Authentication:
+- GitHub: X-Hub-Signature-256, HMAC-SHA256 of the body with GITHUB_SECRET
+- Jira: X-Hub-Signature, HMAC-SHA256 of the body with JIRA_SECRET
+- ServiceNow: X-Webhook-Token header equal to SERVICENOW_TOKEN
+A source without a secret is disabled (404).
+"""
+import hashlib
+import hmac
+import json
+import logging
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .enrichment import forget as forget_enrichment
+from .fanout import fan_out_option
+from .models import ChangeRequest, WebhookEvent
+from .status_cache import change_status_cache
+from .sync import STATE_LABELS
+
+logger = logging.getLogger(__name__)
+
+CHANGE_NUMBER_PATTERN = re.compile(r'^(L?CHG\d+)\b')
+
+# Fields a ServiceNow change_request event may set
+SERVICENOW_FIELDS = ('number', 'short_description', 'description', 'state', 'priority')
+
+
+def webhook_option(name: str, default: Any) -> Any:
+    """Read a WEBHOOKS setting"""
+    return getattr(settings, 'WEBHOOKS', {}).get(name, default)
+
+
+# Receiving
+
+def _signature_valid(header: Optional[str], body: bytes, secret: str) -> bool:
+    if not header or not header.startswith('sha256='):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(header[len('sha256='):], expected)
+
+
+# source -> (secret setting, authenticate(headers, body, secret),
+#            delivery id header, event type header)
+SOURCES = {
+    'github': (
+        'GITHUB_SECRET',
+        lambda headers, body, secret: _signature_valid(headers.get('X-Hub-Signature-256'), body, secret),
+        'X-GitHub-Delivery',
+        'X-GitHub-Event',
+    ),
+    'jira': (
+        'JIRA_SECRET',
+        lambda headers, body, secret: _signature_valid(headers.get('X-Hub-Signature'), body, secret),
+        'X-Atlassian-Webhook-Identifier',
+        None,
+    ),
+    'servicenow': (
+        'SERVICENOW_TOKEN',
+        lambda headers, body, secret: hmac.compare_digest(headers.get('X-Webhook-Token', ''), secret),
+        'X-Delivery-Id',
+        None,
+    ),
+}
+
+
+class WebhookRejected(Exception):
+    """A delivery that is not stored; status is the HTTP status to answer"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def receive(source: str, headers, body: bytes) -> WebhookEvent:
+    """
+    Authenticate a delivery and store it in the inbox
+
+    Args:
+        source: servicenow, jira or github
+        headers: Request headers (case-insensitive mapping)
+        body: Raw request body
+
+    Returns:
+        The stored event
+
+    Raises:
+        WebhookRejected: Unknown or disabled source (404), bad signature (401)
+    """
+    if source not in SOURCES:
+        raise WebhookRejected(404, f"Unknown webhook source: {source}")
+    secret_name, authenticate, delivery_header, type_header = SOURCES[source]
+    secret = webhook_option(secret_name, None)
+    if not secret:
+        raise WebhookRejected(404, f"{source} webhooks are not enabled")
+    if not authenticate(headers, body, secret):
+        raise WebhookRejected(401, "Invalid webhook signature")
+
+    delivery_id = headers.get(delivery_header) or hashlib.sha256(body).hexdigest()
+    return WebhookEvent.objects.create(
+        source=source,
+        event_type=(headers.get(type_header, '') if type_header else '')[:100],
+        delivery_id=delivery_id[:100],
+        body=body.decode('utf-8', errors='replace')
+    )
+
+
+# Applying
+
+def apply_pending(batch_size: int = 500) -> Dict[str, int]:
+    """
+    Apply the oldest pending events
+
+    Args:
+        batch_size: Events per batch
+
+    Returns:
+        Number of events per outcome (applied, duplicate, ignored, failed)
+    """
+    touched, forgotten = [], []
+    with transaction.atomic():
+        pending = WebhookEvent.objects.filter(processed_at__isnull=True).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        events = list(pending[:batch_size])
+        if not events:
+            return {}
+
+        outcomes: Dict[int, tuple] = {}
+        fresh = _drop_duplicates(events, outcomes)
+
+        # (lookup field, value) -> [(event time, event id, fields, only_if_unset)]
+        changes: Dict[tuple, List[tuple]] = {}
+        for event in fresh:
+            try:
+                parsed = PARSERS[event.source](event)
+            except Exception as error:
+                outcomes[event.id] = (WebhookEvent.OUTCOME_FAILED, f"{type(error).__name__}: {error}")
+                continue
+            for change in parsed['changes']:
+                changes.setdefault(change['target'], []).append(
+                    (change['at'], event.id, change['fields'], change.get('only_if_unset'))
+                )
+            forgotten.extend(parsed.get('forget', []))
+            outcomes[event.id] = (WebhookEvent.OUTCOME_IGNORED, '')
+
+        _apply_changes(changes, touched, outcomes)
+
+        now = timezone.now()
+        by_outcome: Dict[tuple, List[int]] = {}
+        for event_id, outcome in outcomes.items():
+            by_outcome.setdefault(outcome, []).append(event_id)
+        for (outcome, error), event_ids in by_outcome.items():
+            WebhookEvent.objects.filter(id__in=event_ids).update(processed_at=now, outcome=outcome, error=error)
+
+    for change_request_id in touched:
+        change_status_cache.invalidate(change_request_id)
+    for key in forgotten:
+        forget_enrichment(*key)
+
+    counts: Dict[str, int] = {}
+    for outcome, _ in outcomes.values():
+        counts[outcome] = counts.get(outcome, 0) + 1
+    return counts
+
+
+def _drop_duplicates(events: List[WebhookEvent], outcomes: Dict[int, tuple]) -> List[WebhookEvent]:
+    """Events whose delivery id was not processed before (nor earlier in the batch)"""
+    seen = set(
+        WebhookEvent.objects
+        .filter(
+            processed_at__isnull=False,
+            delivery_id__in={event.delivery_id for event in events}
+        )
+        .values_list('source', 'delivery_id')
+    )
+    fresh = []
+    for event in events:
+        key = (event.source, event.delivery_id)
+        if key in seen:
+            outcomes[event.id] = (WebhookEvent.OUTCOME_DUPLICATE, '')
+        else:
+            seen.add(key)
+            fresh.append(event)
+    return fresh
+
+
+def _apply_changes(changes: Dict[tuple, List[tuple]], touched: List[int], outcomes: Dict[int, tuple]) -> None:
+    """
+    Merge the changes per change request and write them with one bulk_update
+
+    Sets the outcome of every event that changed a change request (applied,
+    or failed when its row could not be written). Events that name the same
+    change request by different fields (sys_id and number, say) are applied
+    to one instance.
+    """
+    lookups: Dict[str, set] = {}
+    for field, value in changes:
+        lookups.setdefault(field, set()).add(value)
+    rows: Dict[int, ChangeRequest] = {}
+    # change request id -> changes of every target that resolved to it
+    row_changes: Dict[int, List[tuple]] = {}
+    for field, values in lookups.items():
+        for change_request in ChangeRequest.objects.select_for_update().filter(**{f"{field}__in": values}):
+            rows.setdefault(change_request.pk, change_request)
+            row_changes.setdefault(change_request.pk, []).extend(changes[(field, getattr(change_request, field))])
+
+    # change request id -> (change request, event ids)
+    updated: Dict[int, tuple] = {}
+    fields_written = set()
+    for pk, pk_changes in row_changes.items():
+        change_request = rows[pk]
+        # Latest event last, so its values win
+        for _, event_id, fields, only_if_unset in sorted(pk_changes, key=lambda change: change[:2]):
+            if only_if_unset and getattr(change_request, only_if_unset):
+                continue
+            for name, value in fields.items():
+                setattr(change_request, name, value)
+            fields_written.update(fields)
+            updated.setdefault(change_request.id, (change_request, []))[1].append(event_id)
+    if not updated:
+        return
+
+    now = timezone.now()
+    for change_request, _ in updated.values():
+        change_request.updated_at = now
+    update_fields = [*sorted(fields_written), 'updated_at']
+    try:
+        with transaction.atomic():
+            ChangeRequest.objects.bulk_update([change_request for change_request, _ in updated.values()], update_fields)
+        written = list(updated)
+    except IntegrityError:
+        # E.g. a number taken by another change request; find the row
+        written = []
+        for change_request_id, (change_request, event_ids) in updated.items():
+            try:
+                with transaction.atomic():
+                    ChangeRequest.objects.bulk_update([change_request], update_fields)
+                written.append(change_request_id)
+            except IntegrityError as error:
+                logger.warning("Could not apply webhook events to %s: %s", change_request.number, error)
+                for event_id in event_ids:
+                    outcomes[event_id] = (WebhookEvent.OUTCOME_FAILED, f"IntegrityError: {error}")
+
+    for change_request_id in written:
+        for event_id in updated[change_request_id][1]:
+            outcomes[event_id] = (WebhookEvent.OUTCOME_APPLIED, '')
+    touched.extend(written)
+
+
+def purge_processed(older_than_days: float) -> int:
+    """Delete events processed more than older_than_days ago"""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = WebhookEvent.objects.filter(processed_at__lt=cutoff).delete()
+    return deleted
+
+
+# Parsers: event -> {'changes': [{'target', 'fields', 'at', 'only_if_unset'}],
+#                     'forget': [enrichment cache keys]}
+
+def _epoch(value: Any, fmt: Optional[str] = None) -> float:
+    """Event time as seconds since the epoch (0 when missing)"""
+    if not value:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return value / 1000  # Jira sends milliseconds
+    if fmt:
+        return datetime.strptime(value, fmt).replace(tzinfo=dt_timezone.utc).timestamp()
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def _parse_servicenow(event: WebhookEvent) -> Dict[str, Any]:
+    """
+    A change_request record, as sent by a business rule or flow
+
+    Accepts the record itself or {"record": {...}}, with raw or display
+    values.
+    """
+    record = json.loads(event.body)
+    record = record.get('record', record)
+    fields = {name: record[name] for name in SERVICENOW_FIELDS if record.get(name) is not None}
+    if 'state' in fields:
+        fields['state'] = STATE_LABELS.get(fields['state'], fields['state'])[:20]
+    if 'short_description' in fields:
+        fields['short_description'] = fields['short_description'][:255]
+
+    target = ('servicenow_sys_id', record['sys_id']) if record.get('sys_id') else ('number', record['number'])
+    return {'changes': [{
+        'target': target,
+        'fields': fields,
+        'at': _epoch(record.get('sys_updated_on'), '%Y-%m-%d %H:%M:%S')
+    }]}
+
+
+def _parse_jira(event: WebhookEvent) -> Dict[str, Any]:
+    """
+    jira:issue_created links a new issue whose summary starts with a CHG
+    number; a key change (issue moved) or jira:issue_deleted updates the link
+    """
+    data = json.loads(event.body)
+    issue = data.get('issue') or {}
+    key = issue.get('key')
+    kind = data.get('webhookEvent', '')
+    at = _epoch(data.get('timestamp'))
+    result = {'changes': [], 'forget': [('jira', key)] if key else []}
+
+    if kind == 'jira:issue_created':
+        match = CHANGE_NUMBER_PATTERN.match((issue.get('fields') or {}).get('summary') or '')
+        if match:
+            result['changes'].append({
+                'target': ('number', match.group(1)),
+                'fields': {'jira_issue_key': key},
+                'at': at,
+                'only_if_unset': 'jira_issue_key'
+            })
+    elif kind == 'jira:issue_deleted':
+        result['changes'].append({'target': ('jira_issue_key', key), 'fields': {'jira_issue_key': None}, 'at': at})
+    elif kind == 'jira:issue_updated':
+        for item in (data.get('changelog') or {}).get('items', []):
+            if item.get('field') == 'Key' and item.get('fromString'):
+                result['changes'].append({
+                    'target': ('jira_issue_key', item['fromString']),
+                    'fields': {'jira_issue_key': key},
+                    'at': at
+                })
+                result['forget'].append(('jira', item['fromString']))
+    return result
+
+
+def _head_pattern() -> re.Pattern:
+    """Branch names made from CHANGE_FAN_OUT['GITHUB_HEAD'], capturing the number"""
+    template = fan_out_option('GITHUB_HEAD', 'change/{number}')
+    return re.compile('^' + re.escape(template).replace(re.escape('{number}'), r'(?P<number>[^/]+)') + '$')
+
+
+def _parse_github(event: WebhookEvent) -> Dict[str, Any]:
+    """
+    pull_request events link the PR whose head branch names a change
+    request (CHANGE_FAN_OUT['GITHUB_HEAD']); others only refresh caches
+    """
+    if event.event_type != 'pull_request':
+        return {'changes': []}
+    data = json.loads(event.body)
+    pull_request = data['pull_request']
+    repo = data['repository']['full_name']
+    result = {'changes': [], 'forget': [('github', (repo, pull_request['number']))]}
+
+    match = _head_pattern().match(pull_request['head']['ref'])
+    if match:
+        result['changes'].append({
+            'target': ('number', match.group('number')),
+            'fields': {'github_repo': repo, 'github_pr_number': pull_request['number']},
+            'at': _epoch(pull_request.get('updated_at'))
+        })
+    return result
+
+
+PARSERS = {
+    'servicenow': _parse_servicenow,
+    'jira': _parse_jira,
+    'github': _parse_github,
+}
@@ -15,6 +15,7 @@ class ChatbotClient:
     def __init__(self, base_url: str = BASE_URL):
         self.base_url = base_url
         self.conversation_id: Optional[str] = None
+        self.next_conversations_url: Optional[str] = None
         self.session = requests.Session()
 
     def send_message(self, message: str) -> dict:
@@ -36,12 +37,16 @@ class ChatbotClient:
 
         return data
 
-    def list_conversations(self) -> list:
-        """List all conversations"""
-        url = f"{self.base_url}/api/chat/conversations/"
+    def list_conversations(self, more: bool = False) -> list:
+        """List conversations, newest first; more=True fetches the next page"""
+        url = self.next_conversations_url if more else f"{self.base_url}/api/chat/conversations/?page_size=10"
+        if not url:
+            return []
         response = self.session.get(url)
         response.raise_for_status()
-        return response.json()
+        page = response.json()
+        self.next_conversations_url = page["next"]
+        return page["results"]
 
     def list_change_requests(self) -> list:
         """List all change requests"""
@@ -86,7 +91,7 @@ def main():
 
 Commands:
   /new         - Start a new conversation
-  /list        - List all conversations
+  /list        - List recent conversations (/more for the next page)
   /changes     - List all change requests
   /quit        - Exit
 
@@ -110,11 +115,13 @@ Examples:
             elif user_input == "/new":
                 client.reset_conversation()
                 continue
-            elif user_input == "/list":
-                conversations = client.list_conversations()
-                print(f"\n✓ Total Conversations: {len(conversations)}")
-                for conv in conversations[:5]:
-                    print(f"  - {conv['id'][:8]}... [{conv['status']}] - {conv['started_at']}")
+            elif user_input in ("/list", "/more"):
+                conversations = client.list_conversations(more=user_input == "/more")
+                print(f"\n✓ Conversations: {len(conversations)}")
+                for conv in conversations:
+                    print(f"  - {conv['id'][:8]}... [{conv['status']}] {conv['intent'] or '-'} - {conv['updated_at']}")
+                if client.next_conversations_url:
+                    print("  (/more for older conversations)")
                 print()
                 continue
             elif user_input == "/changes":
@@ -117,8 +117,8 @@ fi
 # Test 5: List All Conversations
 echo -e "${BLUE}Test 5: List All Conversations${NC}"
 RESPONSE=$(curl -s $BASE_URL/api/chat/conversations/)
-COUNT=$(echo $RESPONSE | python3 -c "import sys, json; print(len(json.load(sys.stdin)))" 2>/dev/null)
-echo -e "${GREEN}Total Conversations: $COUNT${NC}"
+COUNT=$(echo $RESPONSE | python3 -c "import sys, json; print(len(json.load(sys.stdin)['results']))" 2>/dev/null)
+echo -e "${GREEN}Conversations on the first page: $COUNT${NC}"
 echo $RESPONSE | python3 -m json.tool 2>/dev/null | head -30 || echo $RESPONSE
 echo ""
 echo "---"